@@ -0,0 +1,204 @@
+"""Command line interface for Jarvis UI.
+
+>>> CLI
+
+Usage:
+    - ``jarvis_ui start`` or ``python -m jarvis_ui start`` starts Jarvis UI.
+    - ``jarvis_ui status`` reads the status block of a running instance.
+    - ``jarvis_ui commands`` benchmarks matching phrases against the local commands.
+    - ``jarvis_ui load`` generates load against the server, see ``load_test.py`` for the arguments.
+    - ``jarvis_ui stress`` counts the overflows in the audio capture under CPU stress, with and without ``SCHEDULING``.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+from jarvis_ui.modules import status as status_block
+
+
+def status(args: argparse.Namespace) -> int:
+    """Reads the status block from shared memory, without any calls to the running processes.
+
+    Args:
+        args: Parsed arguments.
+
+    Returns:
+        int:
+        Returns the exit code.
+    """
+    block = status_block.StatusBlock()
+    try:
+        block.attach(name=args.name)
+    except FileNotFoundError:
+        print("Jarvis UI is not running")
+        return 1
+    try:
+        values = block.read()
+    finally:
+        block.close()
+    now = time.time()
+    for field, value in values.items():
+        if field == "lock":
+            value = status_block.LockState(value).name
+        elif field == "phase":
+            value = status_block.Phase(value).name
+        elif field == "flags":
+            value = (
+                ", ".join(flag.name for flag in status_block.Flag if value & flag)
+                or "-"
+            )
+        elif field in status_block.TIMESTAMPS:
+            value = (
+                f"{datetime.fromtimestamp(value).isoformat(sep=' ', timespec='seconds')} "
+                f"({now - value:.1f}s ago)"
+                if value
+                else "-"
+            )
+        print(f"{field:<14} {value}")
+    return 0
+
+
+def commands(args: argparse.Namespace) -> int:
+    """Benchmarks matching phrases against the local commands.
+
+    Args:
+        args: Parsed arguments.
+
+    Returns:
+        int:
+        Returns the exit code.
+    """
+    # Built-in commands are registered when the processor is imported
+    from jarvis_ui.executables import processor  # noqa: F401
+    from jarvis_ui.modules.commands import benchmark, local_commands
+
+    phrases = args.phrases or [
+        "set volume to 40",
+        "unmute",
+        "mute the volume on the server",
+        "restart",
+        "what is the weather like in new york tomorrow",
+        "turn on the living room lights and set the thermostat to 72 degrees",
+    ]
+    print(f"Patterns: {local_commands.matcher.pattern}")
+    results = benchmark(
+        registry=local_commands, phrases=phrases, iterations=args.iterations
+    )
+    for phrase, elapsed in results.items():
+        command = local_commands.match(phrase)
+        print(f"{elapsed:8.2f}µs  {command.name if command else '-':<10} {phrase}")
+    return 0
+
+
+def load(args: argparse.Namespace) -> int:
+    """Generates load against the server, without the microphone or the speaker.
+
+    Args:
+        args: Parsed arguments.
+
+    Returns:
+        int:
+        Returns the exit code.
+    """
+    from jarvis_ui.load_test import main as load_test
+
+    load_test(argv=args.unknown)
+    return 0
+
+
+def stress(args: argparse.Namespace) -> int:
+    """Counts the overflows in the audio capture, with the default and the configured scheduling under CPU stress.
+
+    Args:
+        args: Parsed arguments.
+
+    Returns:
+        int:
+        Returns the exit code.
+    """
+    from jarvis_ui.modules.affinity import benchmark
+
+    workers = args.workers or 2 * os.cpu_count()
+    print(
+        f"Reading the microphone for {args.duration}s each, with {workers} busy processes"
+    )
+    results = benchmark(duration=args.duration, workers=workers, device=args.device)
+    print(f"{'Scheduling':<12} {'Frames':>8} {'Overflows':>10} {'Max gap':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<12} {result['frames']:>8} {result['overflows']:>10} {result['gap']:>8.1f}ms"
+        )
+    return 0
+
+
+def start(args: argparse.Namespace) -> int:
+    """Starts Jarvis UI.
+
+    Args:
+        args: Parsed arguments.
+
+    Returns:
+        int:
+        Returns the exit code.
+    """
+    from jarvis_ui.main import start as starter
+
+    starter()
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    """Parses the command line arguments and runs the command.
+
+    Args:
+        argv: Command line arguments.
+
+    Returns:
+        int:
+        Returns the exit code.
+    """
+    parser = argparse.ArgumentParser(
+        prog="jarvis_ui", description=__doc__.splitlines()[0]
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("start", help="Starts Jarvis UI").set_defaults(function=start)
+    status_parser = subparsers.add_parser("status", help="Reads the status block")
+    status_parser.add_argument(
+        "--name", default=status_block.NAME, help="Name of the shared memory segment"
+    )
+    status_parser.set_defaults(function=status)
+    commands_parser = subparsers.add_parser(
+        "commands", help="Benchmarks matching phrases against the local commands"
+    )
+    commands_parser.add_argument("phrases", nargs="*", help="Phrases to be matched")
+    commands_parser.add_argument("--iterations", type=int, default=10_000)
+    commands_parser.set_defaults(function=commands)
+    load_parser = subparsers.add_parser(
+        "load", help="Generates load against the server", add_help=False
+    )
+    load_parser.set_defaults(function=load)
+    stress_parser = subparsers.add_parser(
+        "stress", help="Counts the overflows in the audio capture under CPU stress"
+    )
+    stress_parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds for each scheduling"
+    )
+    stress_parser.add_argument(
+        "--workers", type=int, help="Busy processes, defaults to twice the CPU count"
+    )
+    stress_parser.add_argument("--device", type=int, help="Index of the capture device")
+    stress_parser.set_defaults(function=stress)
+    args, unknown = parser.parse_known_args(argv)
+    # Only the load test takes the arguments that are not declared here
+    if unknown and args.function is not load:
+        parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+    args.unknown = unknown
+    return args.function(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
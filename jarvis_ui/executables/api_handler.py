@@ -4,16 +4,25 @@
 >>> APIHandler
 
 """
+import contextvars
 import json
-from typing import Union
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
 
 import requests
-from pydantic import ValidationError
 from requests.auth import AuthBase
 from requests.models import PreparedRequest
+from urllib3.exceptions import NewConnectionError
 
 from jarvis_ui.logger import logger
-from jarvis_ui.modules.models import env, fileio, get_server_url
+from jarvis_ui.modules import affinity, tracing
+from jarvis_ui.modules.models import env, fileio, get_server_url, get_server_urls
+from jarvis_ui.modules.profiler import profiler
+from jarvis_ui.modules.recorder import RecordType, recorder
+from jarvis_ui.modules.resilience import BreakerState, CircuitBreaker, RetryPolicy
+from jarvis_ui.modules.telemetry import telemetry
 
 
 class BearerAuth(AuthBase):
@@ -34,6 +43,11 @@ class BearerAuth(AuthBase):
         """
         self.token = token
 
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Auth header, for clients other than ``requests``."""
+        return {"authorization": "Bearer " + self.token}
+
     def __call__(self, request: PreparedRequest) -> PreparedRequest:
         """Override built-in.
 
@@ -44,48 +58,512 @@ class BearerAuth(AuthBase):
             PreparedRequest:
             Returns the request after adding the auth header.
         """
-        request.headers["authorization"] = "Bearer " + self.token
+        request.headers.update(self.headers)
         return request
 
 
 session = requests.Session()
 session.auth = BearerAuth(token=env.token)
 session.headers["Accept"] = "application/json"
+# Connections are timed for the breakdown of each request's latency
+session.mount("http://", tracing.TimedAdapter())
+session.mount("https://", tracing.TimedAdapter())
 
+retry_policy = RetryPolicy(
+    attempts=env.request_retries + 1, deadline=env.request_deadline
+)
 
-def make_request(
-    path: str, data: dict = None, method: str = "POST"
-) -> Union[dict, bool]:
-    """Makes a requests call to the API running on the backend to execute a said task.
+
+def build_payload(phrase: str) -> Dict[str, Union[str, bool, int, float]]:
+    """Constructs the payload to send a command to the server.
 
     Args:
-        data: Takes the command to be executed as an argument.
+        phrase: Command to be executed.
+
+    Returns:
+        Dict[str, Union[str, bool, int, float]]:
+        Returns the payload for ``offline-communicator``.
+    """
+    return {
+        "command": phrase,
+        "native_audio": env.native_audio,
+        "speech_timeout": env.speech_timeout,
+    }
+
+
+# Content types of responses that are sent in chunks, as the answer is generated
+STREAM_TYPES = ("application/x-ndjson", "text/event-stream")
+
+# Status codes that indicate the server is temporarily unable to respond
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+# Status codes for which a request is known to be left unprocessed, so that it is safe to retry any method
+UNPROCESSED_STATUS = (429, 503)
+
+
+def is_retryable(method: str, error: Exception = None, status: int = None) -> bool:
+    """Determines if a failed request is transient and safe to retry.
+
+    Args:
+        method: HTTP method of the request.
+        error: Exception raised by the request.
+        status: Status code of the response.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the request can be retried.
+
+    See Also:
+        - ``GET`` requests are retried on any transient failure.
+        - Other methods are retried only when the request couldn't have been processed by the server,
+          to avoid executing a command twice.
+    """
+    idempotent = method.upper() == "GET"
+    if error is not None:
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if isinstance(error, requests.ConnectionError):
+            # Connection was refused, so the request was never sent
+            reason = getattr(error.args[0], "reason", None) if error.args else None
+            return idempotent or isinstance(reason, NewConnectionError)
+        return idempotent and isinstance(error, requests.Timeout)
+    if status in UNPROCESSED_STATUS:
+        return True
+    return idempotent and status in TRANSIENT_STATUS
+
+
+class Backend:
+    """Holds the health and latency of a backend server.
+
+    >>> Backend
+
+    """
+
+    alpha: float = 0.2
+
+    def __init__(self, url: str):
+        """Instantiates the backend with a circuit breaker of its own.
+
+        Args:
+            url: Server URL.
+        """
+        self.url = url
+        self.breaker = CircuitBreaker(name=url)
+        self.ewma: Union[float, None] = None
+        self.latencies = deque(maxlen=200)
+        # Set for a server configured by its host name, whose address may change while the UI is running
+        self.resolver: Union[Callable[[], str], None] = None
+
+    def failure(self) -> None:
+        """Records a failure in the breaker, and resolves the server's host name again if it was configured by one."""
+        self.breaker.failure()
+        if not self.resolver:
+            return
+        try:
+            url = self.resolver()
+        except OSError as error:
+            logger.warning("Failed to resolve %s: %s", env.server_host, error)
+            return
+        if url != self.url:
+            logger.info("%s has moved from %s to %s", env.server_host, self.url, url)
+            self.url = url
+
+    def record(self, latency: float) -> None:
+        """Records the latency of a response in the moving average.
+
+        Args:
+            latency: Time taken for the response in seconds.
+        """
+        self.ewma = (
+            latency
+            if self.ewma is None
+            else self.alpha * latency + (1 - self.alpha) * self.ewma
+        )
+        self.latencies.append(latency)
+        telemetry.gauge(f"backend.{self.url}.ewma", round(self.ewma, 4))
+
+    @property
+    def p95(self) -> Union[float, None]:
+        """95th percentile of the recent latencies, once there are enough samples."""
+        if len(self.latencies) < 20:
+            return
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95)]
+
+    def probe(self) -> bool:
+        """Checks the server's health with a cheap request, before a half open breaker lets a real request through.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the server is healthy.
+        """
+        try:
+            return session.get(url=self.url + "health", timeout=(3, 3)).ok
+        except requests.RequestException as error:
+            logger.debug(error)
+            return False
+
+
+class BackendPool:
+    """Selects the fastest healthy backend server.
+
+    >>> BackendPool
+
+    """
+
+    def __init__(self, urls: List[str]):
+        """Instantiates a backend for each server.
+
+        Args:
+            urls: List of server URLs.
+        """
+        self.backends = [Backend(url=url) for url in urls]
+
+    def ranked(self, exclude: Iterable[Backend] = ()) -> List[Backend]:
+        """Ranks the backends that are not known to be down, by their moving average of latency.
+
+        Args:
+            exclude: Backends to be skipped.
+
+        Returns:
+            List[Backend]:
+            Returns the backends with the fastest one first, untried backends are ranked ahead to be measured.
+        """
+        return sorted(
+            [
+                backend
+                for backend in self.backends
+                if backend not in exclude and backend.breaker.state != BreakerState.open
+            ],
+            key=lambda backend: (
+                backend.breaker.state != BreakerState.closed,
+                backend.ewma or 0,
+            ),
+        )
+
+    def pick(self) -> Union[Backend, None]:
+        """Picks the fastest healthy backend.
+
+        Returns:
+            Backend:
+            Returns the backend to be used, if any is available.
+        """
+        if ranked := self.ranked():
+            return ranked[0]
+
+    @property
+    def breaker_state(self) -> BreakerState:
+        """Best state among the backends, so the pool is open only when all the backends are down."""
+        states = {backend.breaker.state for backend in self.backends}
+        for state in (BreakerState.closed, BreakerState.half_open):
+            if state in states:
+                return state
+        return BreakerState.open
+
+
+pool = BackendPool(urls=get_server_urls())
+if not env.server_url and env.server_host:
+    pool.backends[0].resolver = get_server_url
+hedger = ThreadPoolExecutor(
+    max_workers=2,
+    thread_name_prefix="hedge",
+    initializer=affinity.apply,
+    initargs=("background",),
+)
+
+
+def send(
+    backend: Backend,
+    method: str,
+    path: str,
+    data: dict,
+    deadline: float,
+    stream: bool = False,
+) -> Tuple[Union[requests.Response, None], bool]:
+    """Sends a single request to a backend, and records its outcome in the backend's breaker.
+
+    Args:
+        backend: Backend to send the request to.
+        method: HTTP method.
         path: Path to make the api call.
-        method: HTTP methods, GET/POST.
+        data: Payload for the request.
+        deadline: Monotonic time by which the request should complete.
+        stream: Boolean flag to accept a streamed response, whose body is read by the caller.
 
     Returns:
-        dict:
-        Returns the JSON response if request was successful.
+        Tuple[Union[requests.Response, None], bool]:
+        Returns the response if successful, and a boolean flag to indicate whether a failure can be retried.
     """
-    try:
-        endpoint = get_server_url()
-    except ValidationError as error:
-        logger.critical(error)
-        return False
+    if backend.breaker.state == BreakerState.half_open:
+        if not backend.breaker.allow():
+            return None, True
+        if not backend.probe():
+            backend.failure()
+            logger.error("%s is still unavailable", backend.url)
+            return None, True
+        logger.info("%s has recovered", backend.url)
+    headers = {"traceparent": tracing.traceparent()}
+    if stream:
+        headers["Accept"] = ", ".join(STREAM_TYPES + ("application/json",))
+    timed = tracing.begin()
+    start = time.monotonic()
     try:
         response = session.request(
             method=method,
-            url=endpoint + path,
+            url=backend.url + path,
             json=data,
-            timeout=(3, 30),
-            verify=endpoint.startswith("https"),
+            timeout=(3, max(deadline - start, 1)),
+            verify=backend.url.startswith("https"),
+            stream=stream,
+            headers=headers,
+        )
+        latency = time.monotonic() - start
+        telemetry.observe("api.latency", latency)
+        tracing.report(
+            method=method, path=path, response=response, timed=timed, total=latency
         )
         assert response.ok, f"{response.status_code} - {response.reason}"
-    except (requests.RequestException, AssertionError) as error:
+    except requests.RequestException as error:
+        logger.error(error)
+        backend.failure()
+        return None, is_retryable(method=method, error=error)
+    except AssertionError as error:
+        logger.error(error)
+        # Streamed responses hold on to their pooled connection until closed
+        response.close()
+        if response.status_code in TRANSIENT_STATUS:
+            backend.failure()
+        else:
+            # Server is reachable, the request itself is invalid
+            backend.breaker.success()
+        return None, is_retryable(method=method, status=response.status_code)
+    backend.record(latency=latency)
+    backend.breaker.success()
+    return response, False
+
+
+def hedged_send(
+    backends: List[Backend],
+    method: str,
+    path: str,
+    data: dict,
+    deadline: float,
+    stream: bool = False,
+) -> Tuple[Union[requests.Response, None], bool]:
+    """Sends the request to the fastest backend, and a duplicate to the next one if the first exceeds its p95.
+
+    See Also:
+        - Only ``GET`` requests are hedged, since a command sent to two backends would be executed by both.
+
+    Args:
+        backends: Ranked list of backends.
+        method: HTTP method.
+        path: Path to make the api call.
+        data: Payload for the request.
+        deadline: Monotonic time by which the request should complete.
+        stream: Boolean flag to accept a streamed response, which is never hedged to avoid leaving a stream open.
+
+    Returns:
+        Tuple[Union[requests.Response, None], bool]:
+        Returns the first successful response, and a boolean flag to indicate whether a failure can be retried.
+    """
+    primary = backends[0]
+    if (
+        stream
+        or not env.hedge_requests
+        or method.upper() != "GET"
+        or len(backends) < 2
+        or primary.p95 is None
+    ):
+        return send(primary, method, path, data, deadline, stream)
+    # Context is copied to the hedging threads, to carry the trace ID of the interaction
+    futures = {
+        hedger.submit(
+            profiler.run,
+            contextvars.copy_context().run,
+            send,
+            primary,
+            method,
+            path,
+            data,
+            deadline,
+        ): primary
+    }
+    done, _ = wait(futures, timeout=primary.p95)
+    if not done:
+        telemetry.increment("api.hedged")
+        logger.info("Hedging %s with %s", path, backends[1].url)
+        futures[
+            hedger.submit(
+                profiler.run,
+                contextvars.copy_context().run,
+                send,
+                backends[1],
+                method,
+                path,
+                data,
+                deadline,
+            )
+        ] = backends[1]
+    retryable = False
+    for future in as_completed(futures):
+        response, retry = future.result()
+        if response is not None:
+            if futures[future] is not primary:
+                telemetry.increment("api.hedge_wins")
+            return response, False
+        retryable = retryable or retry
+    return None, retryable
+
+
+def parse_chunk(data: Union[str, bytes]) -> str:
+    """Extracts the text from a chunk of a streamed response.
+
+    Args:
+        data: A line of NDJSON or the data of a server-sent event.
+
+    Returns:
+        str:
+        Returns the ``detail`` of a JSON chunk, or the chunk itself if it is plain text.
+    """
+    try:
+        chunk = json.loads(data)
+    except json.JSONDecodeError:
+        return data.decode() if isinstance(data, bytes) else data
+    return chunk.get("detail", "") if isinstance(chunk, dict) else str(chunk)
+
+
+def iter_chunks(response: requests.Response, path: str, start: float) -> Iterator[str]:
+    """Reads a streamed response, as NDJSON lines or server-sent events.
+
+    Args:
+        response: Response received with ``stream=True``.
+        path: Path of the api call.
+        start: Monotonic time at which the request was made.
+
+    Yields:
+        str:
+        Yields the text of each chunk as it arrives.
+    """
+    response.encoding = "utf-8"
+    if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+        # Lazy import, since the channel uses this module's session
+        from jarvis_ui.executables.channel import parse_events
+
+        events = parse_events(response=response)
+    else:
+        events = (
+            ("message", line)
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True)
+            if line
+        )
+    chunks, offsets = [], []
+    try:
+        with response:
+            for event, data in events:
+                if event in ("done", "end"):
+                    break
+                if event == "error":
+                    logger.error("Stream ended with error: %s", data)
+                    break
+                if event != "message":
+                    continue
+                offsets.append(time.monotonic() - start)
+                if not chunks:
+                    telemetry.observe("api.time_to_first_chunk", offsets[0])
+                chunks.append(parse_chunk(data))
+                yield chunks[-1]
+    except requests.RequestException as error:
         logger.error(error)
-        return False
+    finally:
+        recorder.event(
+            RecordType.response,
+            path=path,
+            ok=True,
+            elapsed=time.monotonic() - start,
+            status=response.status_code,
+            content_type="application/x-ndjson",
+            chunks=chunks,
+            offsets=offsets,
+        )
+
+
+def make_request(
+    path: str,
+    data: dict = None,
+    method: str = "POST",
+    speech_file: str = None,
+    stream: bool = False,
+) -> Union[dict, bool, Iterator[str]]:
+    """Makes a requests call to the API running on the backend to execute a said task.
+
+    Args:
+        data: Takes the command to be executed as an argument.
+        path: Path to make the api call.
+        method: HTTP methods, GET/POST.
+        speech_file: File to store the audio response, defaults to ``speech_wav_file``.
+        stream: Boolean flag to accept a response that is streamed as NDJSON or server-sent events.
+
+    Returns:
+        dict:
+        Returns the JSON response if request was successful, or an iterator over the text of a streamed response.
+
+    See Also:
+        - Each attempt is sent to the fastest healthy backend, based on a moving average of its latency.
+        - Transient failures are retried with a jittered exponential backoff on the next backend, within the deadline.
+        - Backends fail fast while their circuit breaker is open, and a health check is used to probe for recovery.
+    """
+    start = time.monotonic()
+    deadline = start + retry_policy.deadline
+    attempt = 0
+    failed = []
+    recorder.event(RecordType.request, path=path, method=method, data=data)
+    while True:
+        if not (backends := pool.ranked(exclude=failed) or pool.ranked()):
+            telemetry.increment("api.fail_fast")
+            logger.error("All the servers are unavailable")
+            recorder.event(RecordType.response, path=path, ok=False, elapsed=0)
+            return False
+        attempt += 1
+        response, retryable = hedged_send(
+            backends, method, path, data, deadline, stream
+        )
+        if response is not None:
+            break
+        failed.append(backends[0])
+        telemetry.increment("api.failures")
+        delay = retry_policy.backoff(attempt=attempt)
+        if (
+            not retryable
+            or attempt >= retry_policy.attempts
+            or time.monotonic() + delay >= deadline
+        ):
+            recorder.event(
+                RecordType.response,
+                path=path,
+                ok=False,
+                elapsed=time.monotonic() - start,
+            )
+            return False
+        telemetry.increment("api.retries")
+        logger.info("Retrying %s in %.2fs [attempt: %d]", path, delay, attempt)
+        time.sleep(delay)
+    if response.headers.get("Content-Type", "").startswith(STREAM_TYPES):
+        return iter_chunks(response=response, path=path, start=start)
+    if recorder.enabled:
+        audio = response.headers.get("Content-Type") == "application/octet-stream"
+        recorder.event(
+            RecordType.response,
+            path=path,
+            ok=True,
+            elapsed=time.monotonic() - start,
+            attempts=attempt,
+            status=response.status_code,
+            content_type=response.headers.get("Content-Type"),
+            # Audio responses are stored by size only, to keep the session logs compact
+            body=len(response.content) if audio else response.text,
+        )
     if response.headers.get("Content-Type", "NO MATCH") == "application/octet-stream":
-        with open(file=fileio.speech_wav_file, mode="wb") as file:
+        with open(file=speech_file or fileio.speech_wav_file, mode="wb") as file:
             file.write(response.content)
             file.flush()
         return True
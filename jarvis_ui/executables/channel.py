@@ -0,0 +1,136 @@
+# noinspection PyUnresolvedReferences
+"""Maintains a long-lived connection to the server to receive server-sent events.
+
+>>> Channel
+
+"""
+
+import json
+import threading
+from typing import Iterable, Tuple
+
+import requests
+
+from jarvis_ui.executables import api_handler, display, helper
+from jarvis_ui.logger import logger
+from jarvis_ui.modules import config
+from jarvis_ui.modules.models import env
+from jarvis_ui.modules.telemetry import telemetry
+
+
+def parse_events(response: requests.Response) -> Iterable[Tuple[str, str]]:
+    """Parses a stream of server-sent events.
+
+    Args:
+        response: Streaming response from the server.
+
+    Yields:
+        Tuple[str, str]:
+        Yields the event type and its data, comments are yielded as ``ping`` events.
+    """
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith(":"):
+            yield "ping", line[1:].strip()
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+
+
+class PushChannel(threading.Thread):
+    """Receives health, keyword updates and notifications pushed by the server.
+
+    >>> PushChannel
+
+    See Also:
+        - The server is expected to send a comment or ``ping`` event more often than the read timeout.
+        - A disconnect triggers an immediate health check, instead of waiting for the next heart beat.
+        - Heart beat falls back to polling whenever the channel is disconnected.
+        - The channel is abandoned if the server doesn't support it, leaving heart beat as the only health check.
+    """
+
+    read_timeout: int = 60
+    max_backoff: int = 60
+
+    def __init__(self):
+        """Instantiates the channel as a daemon thread."""
+        super().__init__(name="push_channel", daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        """Connects to the server and reconnects with an exponential backoff."""
+        backoff = 1
+        while not self.stopped.is_set():
+            backend = api_handler.pool.pick() or api_handler.pool.backends[0]
+            try:
+                with api_handler.session.get(
+                    url=backend.url + env.push_channel,
+                    headers={"Accept": "text/event-stream"},
+                    stream=True,
+                    timeout=(3, self.read_timeout),
+                ) as response:
+                    if response.status_code in (404, 405, 501):
+                        logger.warning(
+                            "Push channel is not supported by the server, falling back to polling"
+                        )
+                        return
+                    assert response.ok, f"{response.status_code} - {response.reason}"
+                    logger.info("Push channel connected")
+                    helper.PUSH_CHANNEL["connected"] = True
+                    telemetry.gauge("channel.connected", 1)
+                    backoff = 1
+                    for event, data in parse_events(response=response):
+                        self.dispatch(event=event, data=data)
+                        if self.stopped.is_set():
+                            return
+            except (requests.RequestException, AssertionError) as error:
+                logger.error(error)
+            if helper.PUSH_CHANNEL["connected"]:
+                logger.warning("Push channel disconnected")
+                telemetry.increment("channel.disconnects")
+            helper.PUSH_CHANNEL["connected"] = False
+            telemetry.gauge("channel.connected", 0)
+            # Checks health right away, instead of waiting for the next heart beat
+            helper.heart_beat()
+            self.stopped.wait(timeout=backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    @staticmethod
+    def dispatch(event: str, data: str) -> None:
+        """Handles an event received from the server.
+
+        Args:
+            event: Type of the event.
+            data: Data received along with the event.
+        """
+        telemetry.increment(f"channel.events.{event}")
+        if event == "ping":
+            return
+        if event == "keywords":
+            try:
+                keywords = json.loads(data)
+            except json.JSONDecodeError as error:
+                logger.error(error)
+                return
+            if config.config:
+                config.config.keywords = sum([v for _, v in keywords.items()], [])
+                logger.info("keywords have been updated")
+        elif event == "notification":
+            logger.info("Notification: %s", data)
+            display.write_screen(f"Notification: {data}")
+        else:
+            logger.debug("Unhandled event %r: %s", event, data)
+
+    def stop(self) -> None:
+        """Stops reconnecting to the server."""
+        self.stopped.set()
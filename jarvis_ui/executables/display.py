@@ -22,6 +22,16 @@ def write_screen(text: Any) -> None:
     sys.stdout.write(f"\r{text}")
 
 
+def append_screen(text: Any) -> None:
+    """Appends text to what is already on screen, used for responses that arrive in chunks.
+
+    Args:
+        text: Text to be appended.
+    """
+    sys.stdout.write(str(text))
+    sys.stdout.flush()
+
+
 def flush_screen() -> None:
     """Flushes the screen output.
 
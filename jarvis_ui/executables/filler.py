@@ -0,0 +1,150 @@
+# noinspection PyUnresolvedReferences
+"""Plays a short clip from memory when the server is slow to respond, so the user knows the command was heard.
+
+>>> Filler
+
+See Also:
+    - Clip is loaded from ``FILLER_AUDIO``, or synthesized by the speech engine at start up.
+    - Clip is played on a separate thread once the response exceeds ``FILLER_BUDGET``, and the request carries on.
+    - Response is played right after the clip ends, instead of talking over it.
+"""
+
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Union
+
+import pyttsx3
+
+from jarvis_ui.logger import logger
+from jarvis_ui.modules.models import env, fileio
+from jarvis_ui.modules.peripherals import registry
+from jarvis_ui.modules.telemetry import telemetry
+
+TEXT = "One moment."
+
+
+class Clip:
+    """Raw audio of a wave file, held in memory.
+
+    >>> Clip
+
+    """
+
+    def __init__(self, path: str):
+        """Reads the wave file.
+
+        Args:
+            path: Path of the wave file.
+        """
+        with wave.open(str(path), "rb") as file:
+            self.sample_rate = file.getframerate()
+            self.sample_width = file.getsampwidth()
+            self.channels = file.getnchannels()
+            self.audio = file.readframes(file.getnframes())
+
+    @property
+    def duration(self) -> float:
+        """Length of the clip in seconds."""
+        return len(self.audio) / (self.sample_rate * self.sample_width * self.channels)
+
+
+class Filler:
+    """Plays the clip while waiting for the server.
+
+    >>> Filler
+
+    """
+
+    def __init__(self):
+        """Instantiates the filler without a clip, which is loaded as a start up step."""
+        self.clip: Union[Clip, None] = None
+        self.thread: Union[threading.Thread, None] = None
+
+    def load(self, driver: pyttsx3.Engine = None) -> Union[Clip, None]:
+        """Loads the clip into memory, synthesizing it first if a file is not provided.
+
+        Args:
+            driver: Speech engine to synthesize the clip, when ``FILLER_AUDIO`` is not set.
+
+        Returns:
+            Clip:
+            Returns the clip, if it could be loaded.
+        """
+        path = env.filler_audio
+        if not path:
+            path = fileio.filler_wav_file
+            driver.save_to_file(text=TEXT, filename=str(path))
+            driver.runAndWait()
+        try:
+            self.clip = Clip(path=path)
+        except (OSError, EOFError, wave.Error) as error:
+            # Some speech engines save in a format other than wave, regardless of the extension
+            logger.warning("Failed to load filler audio from '%s': %s", path, error)
+            return
+        logger.info("Loaded filler audio of %.2fs", self.clip.duration)
+        return self.clip
+
+    def _play(self) -> None:
+        """Writes the clip to an output stream."""
+        try:
+            stream = registry.open_stream(
+                rate=self.clip.sample_rate,
+                channels=self.clip.channels,
+                format=registry.engine.get_format_from_width(self.clip.sample_width),
+                output=True,
+            )
+        except OSError as error:
+            logger.error(error)
+            return
+        try:
+            stream.write(self.clip.audio)
+        finally:
+            registry.close_stream(stream=stream)
+
+    def play(self) -> None:
+        """Starts playing the clip on a separate thread."""
+        self.thread = threading.Thread(target=self._play, name="filler", daemon=True)
+        self.thread.start()
+
+    def wait(self) -> None:
+        """Waits for the clip to finish playing."""
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def await_response(self, future: Future, submitted: float) -> Any:
+        """Waits for a response, playing the clip if it doesn't arrive within the budget.
+
+        Args:
+            future: Pending request to the server.
+            submitted: Time at which the request was submitted.
+
+        Returns:
+            Any:
+            Returns the result of the request.
+        """
+        if not (env.filler_budget and self.clip):
+            return future.result()
+        budget = env.filler_budget / 1e3
+        try:
+            response = future.result(
+                timeout=max(budget - (time.perf_counter() - submitted), 0)
+            )
+        except FutureTimeout:
+            telemetry.increment("filler.played")
+            self.play()
+            response = future.result()
+            elapsed = time.perf_counter() - submitted
+            telemetry.observe("filler.overrun", elapsed - budget)
+            self.wait()
+        else:
+            elapsed = time.perf_counter() - submitted
+            telemetry.increment("filler.skipped")
+        telemetry.observe("filler.response_time", elapsed)
+        return response
+
+
+filler = Filler()
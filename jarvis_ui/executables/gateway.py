@@ -0,0 +1,266 @@
+# noinspection PyUnresolvedReferences
+"""Accepts text commands from other local clients, and forwards them over the UI's session with the server.
+
+>>> Gateway
+
+See Also:
+    - Binds to the loopback interface only, so the server's token is never handed out to the clients.
+    - Clients identify themselves with the ``X-Client-Id`` header, and each one gets a bounded queue of its own.
+    - Queues are served round-robin, so a chatty client can't starve the others.
+    - A fixed number of workers forward the commands, reusing the pooled connections of ``api_handler.session``.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Tuple, Union
+
+from jarvis_ui.executables import api_handler
+from jarvis_ui.logger import logger
+from jarvis_ui.modules import affinity, tracing
+from jarvis_ui.modules.models import env
+from jarvis_ui.modules.telemetry import telemetry
+
+Pending = Tuple[str, float, Future]
+
+
+class FairQueue:
+    """Holds a queue for each client, and serves the clients round-robin.
+
+    >>> FairQueue
+
+    """
+
+    def __init__(self, size: int):
+        """Instantiates the queues.
+
+        Args:
+            size: Maximum number of pending commands for each client.
+        """
+        self.size = size
+        self.queues: Dict[str, Deque[Pending]] = {}
+        self.order: Deque[Union[str, None]] = deque()
+        self.condition = threading.Condition()
+
+    def put(self, client: str, item: Pending) -> bool:
+        """Adds a command to the client's queue.
+
+        Args:
+            client: Client ID.
+            item: Pending command.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the command was queued, or the client's queue is full.
+        """
+        with self.condition:
+            queue = self.queues.setdefault(client, deque())
+            if len(queue) >= self.size:
+                return False
+            if not queue:
+                self.order.append(client)
+            queue.append(item)
+            self.condition.notify()
+            return True
+
+    def get(self) -> Union[Tuple[str, Pending], None]:
+        """Takes the next command from the client whose turn it is, blocks until one is available.
+
+        Returns:
+            Tuple[str, Pending]:
+            Returns the client ID and the pending command, or ``None`` when the queue has been closed.
+        """
+        with self.condition:
+            while not self.order:
+                self.condition.wait()
+            if (client := self.order.popleft()) is None:
+                return
+            queue = self.queues[client]
+            item = queue.popleft()
+            if queue:
+                # Goes to the back of the line, behind the other clients
+                self.order.append(client)
+            else:
+                del self.queues[client]
+            return client, item
+
+    def depth(self) -> Dict[str, int]:
+        """Number of pending commands for each client."""
+        with self.condition:
+            return {client: len(queue) for client, queue in self.queues.items()}
+
+    def close(self, workers: int) -> None:
+        """Wakes up the workers to exit, after the commands ahead of them.
+
+        Args:
+            workers: Number of workers waiting on the queue.
+        """
+        with self.condition:
+            self.order.extend([None] * workers)
+            self.condition.notify_all()
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """Queues the commands received from the clients, and replies with the server's response.
+
+    >>> GatewayHandler
+
+    """
+
+    server: "Gateway"
+
+    def log_message(self, *args) -> None:
+        """Silences the access logs."""
+
+    def reply(self, status: int, body: Any) -> None:
+        """Sends a JSON response.
+
+        Args:
+            status: Status code.
+            body: Body of the response.
+        """
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    @property
+    def client(self) -> str:
+        """Client ID from the headers, restricted to be safe as a metric name."""
+        client = re.sub(r"[^\w.-]", "_", self.headers.get("X-Client-Id", ""))[:32]
+        return client or "default"
+
+    def do_GET(self) -> None:
+        """Replies with the number of pending commands for each client."""
+        self.reply(200, {"clients": self.server.queue.depth()})
+
+    def do_POST(self) -> None:
+        """Queues the command and waits for the server's response."""
+        try:
+            data = json.loads(
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            )
+            phrase = data["command"].strip()
+            assert phrase
+        except (ValueError, KeyError, TypeError, AttributeError, AssertionError):
+            self.reply(
+                400, {"detail": "Expected a JSON body with a non-empty 'command'"}
+            )
+            return
+        client = self.client
+        telemetry.increment(f"gateway.clients.{client}.requests")
+        future = Future()
+        if not self.server.queue.put(client, (phrase, time.monotonic(), future)):
+            telemetry.increment(f"gateway.clients.{client}.rejected")
+            self.reply(429, {"detail": "Too many pending commands"})
+            return
+        self.server.report_depth(client=client)
+        try:
+            response = future.result(timeout=self.server.wait_timeout)
+        except FutureTimeout:
+            future.cancel()
+            telemetry.increment(f"gateway.clients.{client}.timeouts")
+            self.reply(504, {"detail": "Timed out waiting for the server"})
+            return
+        if response is False or response is None:
+            self.reply(502, {"detail": "Server is unavailable"})
+        elif response is True:
+            self.reply(502, {"detail": "Server replied with audio instead of text"})
+        else:
+            self.reply(200, response)
+
+
+class Gateway(ThreadingHTTPServer):
+    """Serves the local clients on the loopback interface.
+
+    >>> Gateway
+
+    """
+
+    workers: int = 2
+    size: int = 10
+
+    def __init__(self, port: int):
+        """Binds to the port on the loopback interface.
+
+        Args:
+            port: Port number to listen on.
+        """
+        super().__init__(("127.0.0.1", port), GatewayHandler)
+        self.queue = FairQueue(size=self.size)
+        # Time spent in the queue is added to the deadline of the request itself
+        self.wait_timeout = env.request_deadline * (self.size + 1)
+        self.threads = []
+
+    def report_depth(self, client: str) -> None:
+        """Records the number of pending commands, in total and for the client whose queue has changed.
+
+        Args:
+            client: Client ID.
+        """
+        depth = self.queue.depth()
+        telemetry.gauge("gateway.queue_depth", sum(depth.values()))
+        telemetry.gauge(f"gateway.clients.{client}.queue_depth", depth.get(client, 0))
+
+    def forward(self) -> None:
+        """Forwards the queued commands to the server, one at a time."""
+        affinity.apply(role="background")
+        while entry := self.queue.get():
+            client, (phrase, queued, future) = entry
+            self.report_depth(client=client)
+            if not future.set_running_or_notify_cancel():
+                continue  # Client has given up waiting
+            telemetry.observe(
+                f"gateway.clients.{client}.wait", time.monotonic() - queued
+            )
+            trace = tracing.start_trace()
+            logger.info("Forwarding '%s' from %s [trace: %s]", phrase, client, trace)
+            try:
+                # Clients receive text, so synthesis is turned off and a stray audio reply is discarded,
+                # instead of overwriting the file that the UI's speaker may be playing
+                response = api_handler.make_request(
+                    path="offline-communicator",
+                    data=dict(
+                        api_handler.build_payload(phrase=phrase),
+                        native_audio=False,
+                        speech_timeout=0,
+                    ),
+                    speech_file=os.devnull,
+                )
+            # Failure in one command shouldn't stop the worker
+            except Exception as error:
+                logger.error(error)
+                response = False
+            telemetry.observe(
+                f"gateway.clients.{client}.latency", time.monotonic() - queued
+            )
+            if not response:
+                telemetry.increment(f"gateway.clients.{client}.failures")
+            future.set_result(response)
+
+    def start(self) -> None:
+        """Starts serving the clients and forwarding their commands, on daemon threads."""
+        self.threads = [
+            threading.Thread(target=self.forward, name=f"gateway_{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        self.threads.append(
+            threading.Thread(target=self.serve_forever, name="gateway", daemon=True)
+        )
+        for thread in self.threads:
+            thread.start()
+        logger.info("Gateway is listening on http://127.0.0.1:%d", self.server_port)
+
+    def stop(self) -> None:
+        """Stops accepting commands, and lets the workers exit."""
+        self.shutdown()
+        self.server_close()
+        self.queue.close(workers=self.workers)
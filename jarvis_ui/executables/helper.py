@@ -1,62 +1,128 @@
 import os
 import re
 import sys
-from multiprocessing.managers import DictProxy  # noqa
+import threading
+import time
 from typing import NoReturn, Union
 
-import requests
-
+from jarvis_ui.executables import api_handler
 from jarvis_ui.logger import logger
-from jarvis_ui.modules.models import get_server_url, settings
+from jarvis_ui.modules import config
+from jarvis_ui.modules.models import env, settings
+from jarvis_ui.modules.resilience import RestartBudget
+from jarvis_ui.modules.status import Flag, LockState, Phase, status
+from jarvis_ui.modules.telemetry import telemetry
 
 FAILED_HEALTH_CHECK = {"count": 0}
+HEALTH_CHECK = threading.Lock()
+PUSH_CHANNEL = {"connected": False}
+
+
+def enter_degraded(restarts: int) -> None:
+    """Stays up without restarting, and reports the server as unavailable until it recovers.
+
+    Args:
+        restarts: Number of restarts within the window.
+    """
+    logger.critical(
+        "Crash loop detected with %d restarts in %d seconds, staying up in degraded mode",
+        restarts,
+        env.restart_window,
+    )
+    telemetry.increment("supervisor.degraded")
+    status.update(lock=LockState.unlocked, phase=Phase.idle, flags=Flag.degraded)
+
+
+def recovered() -> None:
+    """Leaves degraded mode once the server responds again."""
+    if status.degraded:
+        logger.info("Server has recovered, leaving degraded mode")
+        status.update(flags=0)
 
 
-def linux_restart() -> NoReturn:
-    """Restarts the base script on Linux OS.
+def linux_restart() -> Union[NoReturn, None]:
+    """Restarts the base script on Linux OS, within the restart budget.
 
     See Also:
         - In Linux, it is not possible to trigger port audio on multiple processes.
         - To overcome this problem, JarvisUI on Linux is set to restart from self.
         - Since restarting executable triggers the base script, explicit reload of env vars are not required.
+        - Restart history is carried across in an env var, so the backoff and the budget apply to the new process.
+        - Returns without restarting when the budget is exhausted, after switching to degraded mode.
 
     Raises:
         - KeyboardInterrupt: To stop the current process to avoid recursion.
     """
+    budget = RestartBudget.load_env(
+        budget=env.restart_budget, window=env.restart_window
+    )
+    if not budget.allow():
+        enter_degraded(restarts=budget.recent)
+        return
+    delay = budget.record()
+    logger.info("Restarting in %.1f seconds", delay)
+    time.sleep(delay)
+    budget.save_env()
     os.execv(sys.executable, ["python"] + sys.argv)
     raise KeyboardInterrupt
 
 
-def heart_beat(status_manager: DictProxy = None) -> None:
-    """Initiate health check with the server.
+def request_restart() -> None:
+    """Requests a restart from the supervisor, and waits for it to either restart or decline.
 
-    Args:
-        status_manager: Shared multiprocessing dict to update in case of failed health check.
+    See Also:
+        - On Linux, the process is its own supervisor and restarts itself.
+        - Elsewhere, the main process terminates this one, or declines by unlocking when out of budget.
+    """
+    status.update(lock=LockState.restart, phase=Phase.restarting)
+    if settings.operating_system == "Linux":
+        linux_restart()
+        return
+    while status.lock == LockState.restart:
+        time.sleep(0.1)
+
+
+def heart_beat() -> None:
+    """Initiate health check with the server.
 
     See Also:
         - Heart beat should be set no lesser than 5 seconds to avoid throttling and no longer than an hour.
         - Maintains a consecutive failure threshold of 5, as a single failed health check doesn't warrant a restart.
+        - Polling is skipped while the push channel is connected, since the open stream itself is proof of liveness.
+        - Keywords are reloaded when the server recovers, as they may have failed to load during the outage.
+        - Every backend is checked, and the result is recorded in its circuit breaker.
+        - Push channel checks health as soon as it disconnects, alongside the scheduled checks.
     """
-    try:
-        response = requests.get(url=get_server_url() + "health", timeout=(3, 3))
-    except requests.RequestException as error:
-        logger.error(error)
-    else:
-        if response.ok:
+    # Runs on the scheduler and on the push channel, so the failure count and the restart are checked one at a time
+    with HEALTH_CHECK:
+        if PUSH_CHANNEL["connected"]:
+            FAILED_HEALTH_CHECK["count"] = 0
+            return
+        healthy = False
+        for backend in api_handler.pool.backends:
+            if backend.probe():
+                backend.breaker.success()
+                healthy = True
+            else:
+                backend.failure()
+        if healthy:
+            recovered()
             if FAILED_HEALTH_CHECK["count"]:
                 logger.info("Resetting failure count")
                 FAILED_HEALTH_CHECK["count"] = 0
+                if config.config:
+                    config.config.keywords = config.load_keywords()
             return
-    FAILED_HEALTH_CHECK["count"] += 1
-    if FAILED_HEALTH_CHECK["count"] >= 5:
-        while True:
+        logger.error("Health check failed for all the servers")
+        FAILED_HEALTH_CHECK["count"] += 1
+        # Restarting won't help in degraded mode, which is left once the server recovers
+        if FAILED_HEALTH_CHECK["count"] >= 5 and not status.degraded:
             # Awaits any ongoing request/response to go through before restarting
-            if not status_manager["LOCKED"]:
-                break
-        logger.critical("Heart beat failed for 5 times in row, restarting...")
-        if settings.operating_system == "Linux":
-            linux_restart()
-        status_manager["LOCKED"] = None
+            while status.lock == LockState.locked:
+                time.sleep(0.1)
+            logger.critical("Heart beat failed for 5 times in row, restarting...")
+            FAILED_HEALTH_CHECK["count"] = 0
+            request_restart()
 
 
 def extract_nos(input_: str, method: type = float) -> Union[int, float]:
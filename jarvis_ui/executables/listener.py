@@ -5,11 +5,16 @@
 
 """
 
+import json
+import os
+import time
 from typing import Union
 
 import requests
+from pyaudio import Stream
 from pydantic import PositiveFloat, PositiveInt
 from speech_recognition import (
+    AudioSource,
     Microphone,
     Recognizer,
     RequestError,
@@ -19,10 +24,31 @@ from speech_recognition import (
 
 from jarvis_ui.executables import display
 from jarvis_ui.logger import logger
-from jarvis_ui.modules.models import env
+from jarvis_ui.modules.dsp import (
+    AutomaticGain,
+    HighPass,
+    NoiseFloor,
+    Pipeline,
+    SpectralGate,
+)
+from jarvis_ui.modules.models import env, fileio
+from jarvis_ui.modules.peripherals import registry
+from jarvis_ui.modules.recognition import HedgedRecognizer
+from jarvis_ui.modules.recorder import RecordType, recorder
+from jarvis_ui.modules.telemetry import telemetry
 
 recognizer = Recognizer()  # initiates recognizer object
-microphone = Microphone()  # initiates microphone object
+microphone: Union[Microphone, None] = None  # initiated as a start up step
+pipeline: Union[Pipeline, None] = None  # initiated along with the microphone
+hedged = (
+    HedgedRecognizer(
+        specs=env.recognizers,
+        threshold=env.recognizer_confidence,
+        timeout=env.listener_phrase_limit * 2,
+    )
+    if env.recognizers
+    else None
+)
 
 recognizer.energy_threshold = env.recognizer_settings.energy_threshold
 recognizer.pause_threshold = env.recognizer_settings.pause_threshold
@@ -31,28 +57,326 @@ recognizer.dynamic_energy_threshold = env.recognizer_settings.dynamic_energy_thr
 recognizer.non_speaking_duration = env.recognizer_settings.non_speaking_duration
 
 
+class PipelineStream:
+    """Wraps the stream opened by ``Microphone``, to condition the frames read by the recognizer.
+
+    >>> PipelineStream
+
+    """
+
+    def __init__(self, stream: Microphone.MicrophoneStream):
+        """Holds the wrapped stream.
+
+        Args:
+            stream: Stream opened by the microphone.
+        """
+        self.stream = stream
+
+    def read(self, size: int) -> bytes:
+        """Reads a frame and runs it through the pipeline.
+
+        Args:
+            size: Number of samples to read.
+
+        Returns:
+            bytes:
+            Returns the conditioned frame.
+        """
+        return pipeline.process(self.stream.read(size))
+
+    def close(self) -> None:
+        """Closes the wrapped stream."""
+        self.stream.close()
+
+
+class StreamReader:
+    """Reads frames from a PyAudio stream that is owned by someone else.
+
+    >>> StreamReader
+
+    """
+
+    def __init__(self, stream: Stream):
+        """Holds the stream.
+
+        Args:
+            stream: Stream opened by the activator.
+        """
+        self.stream = stream
+
+    def read(self, size: int) -> bytes:
+        """Reads a frame, running it through the pipeline if there is one.
+
+        Args:
+            size: Number of samples to read.
+
+        Returns:
+            bytes:
+            Returns the raw frame.
+        """
+        frame = self.stream.read(size, exception_on_overflow=False)
+        return pipeline.process(frame) if pipeline else frame
+
+
+class StreamSource(AudioSource):
+    """Audio source for the recognizer, backed by the stream that is already open for the wake word detector.
+
+    >>> StreamSource
+
+    See Also:
+        - Leaving the source doesn't close the stream, so it can be used for the next turn and then the wake word.
+        - Frames captured while a response was played back are flushed, before listening for the next turn.
+    """
+
+    def __init__(self, stream: Stream, sample_rate: int, frame_length: int):
+        """Instantiates the source.
+
+        Args:
+            stream: 16-bit mono stream opened by the activator.
+            sample_rate: Sample rate of the stream.
+            frame_length: Number of samples in each frame.
+        """
+        self.audio_stream = stream
+        self.stream: Union[StreamReader, None] = None
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = frame_length
+
+    def __enter__(self) -> "StreamSource":
+        """Starts reading from the stream."""
+        self.stream = StreamReader(stream=self.audio_stream)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Stops reading, leaving the stream open."""
+        self.stream = None
+
+    def flush(self) -> None:
+        """Discards the frames that were buffered while no one was reading."""
+        if available := self.audio_stream.get_read_available():
+            self.audio_stream.read(available, exception_on_overflow=False)
+
+
+class PipelineMicrophone(Microphone):
+    """Microphone that reads frames of the same size as the wake word detector, and conditions them.
+
+    >>> PipelineMicrophone
+
+    """
+
+    def __enter__(self) -> "PipelineMicrophone":
+        """Opens the stream and wraps it."""
+        super().__enter__()
+        if self.stream:
+            self.stream = PipelineStream(stream=self.stream)
+        return self
+
+
+def build_pipeline(sample_rate: int, frame_length: int) -> Union[Pipeline, None]:
+    """Builds the audio pipeline with the stages configured in ``AUDIO_PIPELINE``.
+
+    Args:
+        sample_rate: Sample rate of the frames.
+        frame_length: Number of samples in each frame.
+
+    Returns:
+        Pipeline:
+        Returns the pipeline, if any stages are configured.
+    """
+    settings = env.audio_pipeline
+    stages = []
+    for name in settings.stages:
+        if name == "high_pass":
+            stages.append(
+                HighPass(
+                    budget=settings.budget,
+                    cutoff=settings.cutoff,
+                    sample_rate=sample_rate,
+                )
+            )
+        elif name == "gain":
+            stages.append(
+                AutomaticGain(
+                    budget=settings.budget,
+                    target=settings.target,
+                    max_gain=settings.max_gain,
+                )
+            )
+        elif name == "spectral_gate":
+            stages.append(
+                SpectralGate(
+                    budget=settings.budget,
+                    frame_length=frame_length,
+                    ratio=settings.gate_ratio,
+                )
+            )
+    if stages:
+        logger.info("Audio pipeline: %s", " -> ".join(settings.stages))
+        return Pipeline(stages=stages)
+
+
+def load_microphone(sample_rate: int, frame_length: int) -> Microphone:
+    """Instantiates the microphone object, invoked as a start up step.
+
+    Args:
+        sample_rate: Sample rate of the wake word detector.
+        frame_length: Number of samples in each frame of the wake word detector.
+
+    Returns:
+        Microphone:
+        Returns the microphone object.
+
+    See Also:
+        - With an audio pipeline, the microphone reads frames of the same rate and size as the wake word detector.
+        - Listener and the detector read the stream in turns, so they share the pipeline's state like the noise.
+    """
+    global microphone, pipeline
+    if pipeline := build_pipeline(sample_rate=sample_rate, frame_length=frame_length):
+        microphone = PipelineMicrophone(
+            sample_rate=sample_rate, chunk_size=frame_length
+        )
+    else:
+        microphone = Microphone()
+    return microphone
+
+
+class Calibrator:
+    """Keeps the recognizer's energy threshold calibrated to the noise floor of the capture device.
+
+    >>> Calibrator
+
+    See Also:
+        - Fed with every frame read by the wake word detector, so calibration doesn't need a separate stream.
+        - The noise level for each device is persisted, so that the threshold is calibrated right after a restart.
+        - Threshold drift is logged and recorded as telemetry whenever the threshold moves by more than 5%.
+    """
+
+    drift_tolerance: float = 0.05
+    save_interval: int = 60
+    minimum_threshold: int = 100
+
+    def __init__(self, frame_length: int):
+        """Loads the persisted noise profile for the capture device.
+
+        Args:
+            frame_length: Number of samples in each frame.
+        """
+        self.device = registry.capture_name or "default"
+        self.profile = self.load_profile()
+        self.noise_floor = NoiseFloor(
+            frame_length=frame_length, level=self.profile.get(self.device)
+        )
+        self.baseline = env.recognizer_settings.energy_threshold
+        self.saved_at = time.monotonic()
+        if self.noise_floor.level:
+            logger.info(
+                "Loaded noise level %.2f for %r", self.noise_floor.level, self.device
+            )
+            self.apply(level=self.noise_floor.level)
+
+    @staticmethod
+    def load_profile() -> dict:
+        """Loads the noise profiles stored for all devices.
+
+        Returns:
+            dict:
+            Returns the noise level keyed by device name.
+        """
+        if not os.path.isfile(fileio.noise_profile):
+            return {}
+        try:
+            with open(fileio.noise_profile) as file:
+                return json.load(file)
+        except (OSError, json.JSONDecodeError) as error:
+            logger.error(error)
+            return {}
+
+    def save_profile(self) -> None:
+        """Persists the current noise level for the capture device."""
+        if self.noise_floor.level is None:
+            return
+        self.profile[self.device] = round(self.noise_floor.level, 2)
+        with open(fileio.noise_profile, "w") as file:
+            json.dump(self.profile, file, indent=2)
+            file.flush()
+        self.saved_at = time.monotonic()
+
+    def feed(self, frame: bytes) -> None:
+        """Updates the noise floor with a frame, and calibrates the recognizer when the estimate changes.
+
+        Args:
+            frame: Raw frame read from the audio stream.
+        """
+        if (level := self.noise_floor.update(frame)) is not None:
+            self.apply(level=level)
+
+    def apply(self, level: float) -> None:
+        """Sets the energy threshold as a ratio of the noise level.
+
+        Args:
+            level: Current noise level.
+        """
+        threshold = max(self.minimum_threshold, round(level * env.noise_ratio))
+        telemetry.gauge("noise.level", round(level, 2))
+        current = recognizer.energy_threshold
+        if abs(threshold - current) <= current * self.drift_tolerance:
+            return
+        recognizer.energy_threshold = threshold
+        telemetry.gauge("recognizer.energy_threshold", threshold)
+        telemetry.observe("recognizer.threshold_drift", threshold - self.baseline)
+        logger.info(
+            "Energy threshold calibrated from %d to %d [noise level: %.2f, drift from baseline: %+d]",
+            current,
+            threshold,
+            level,
+            threshold - self.baseline,
+        )
+        if time.monotonic() - self.saved_at > self.save_interval:
+            self.save_profile()
+
+
 def listen(
     timeout: Union[PositiveInt, PositiveFloat] = env.listener_timeout,
     phrase_time_limit: Union[PositiveInt, PositiveFloat] = env.listener_phrase_limit,
+    source: Union[StreamSource, None] = None,
 ) -> Union[str, None]:
     """Function to activate listener and get the user input.
 
     Args:
         timeout: Time in seconds to wait for a phrase/sound to begin.
         phrase_time_limit: Time in seconds to await user input. Anything spoken beyond this limit will be excluded.
+        source: Stream that is already open, defaults to opening the microphone.
 
     Returns:
         str:
         Returns the recognized statement listened via microphone.
     """
     return_val = None
-    with microphone as source:
+    if source is None:
+        # Follows the capture device bound by the activator, since its index may change when re-plugged
+        microphone.device_index = registry.capture_index
+    with source or microphone as source:
         display.write_screen(f"Listener activated [{timeout}: {phrase_time_limit}]")
         try:
             listened = recognizer.listen(
                 source=source, timeout=timeout, phrase_time_limit=phrase_time_limit
             )
-            return_val = recognizer.recognize_google(audio_data=listened)
+            recorder.utterance(
+                audio=listened.get_raw_data(),
+                sample_rate=listened.sample_rate,
+                sample_width=listened.sample_width,
+            )
+            start = time.perf_counter()
+            if hedged:
+                return_val = hedged.recognize(recognizer=recognizer, audio=listened)
+            else:
+                return_val = recognizer.recognize_google(audio_data=listened)
+            if return_val:
+                recorder.event(
+                    RecordType.text,
+                    text=return_val,
+                    elapsed=time.perf_counter() - start,
+                )
         except (UnknownValueError, WaitTimeoutError, RequestError) as error:
             logger.debug(error)
         except requests.exceptions.RequestException as error:
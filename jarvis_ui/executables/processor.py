@@ -1,16 +1,144 @@
+import contextvars
 import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Process
-from multiprocessing.managers import DictProxy  # noqa
 from threading import Timer
-from typing import Union
+from typing import Iterator, List, Union
 
 import pyvolume
 from playsound import playsound
 
 from jarvis_ui.executables import api_handler, display, helper, listener, speaker
+from jarvis_ui.executables.filler import filler
 from jarvis_ui.logger import logger
-from jarvis_ui.modules.config import config
+from jarvis_ui.modules import affinity, tracing
+from jarvis_ui.modules.commands import local_commands
+from jarvis_ui.modules.config import config, load_keywords
 from jarvis_ui.modules.models import env, fileio, settings
+from jarvis_ui.modules.profiler import profiler
+from jarvis_ui.modules.recorder import RecordType, recorder
+from jarvis_ui.modules.resilience import BreakerState
+from jarvis_ui.modules.status import Phase, status
+from jarvis_ui.modules.telemetry import telemetry
+
+CONNECTIVES = re.compile(r"\s+(and then|and|then)\s+", flags=re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+requester = ThreadPoolExecutor(
+    max_workers=4,
+    thread_name_prefix="request",
+    initializer=affinity.apply,
+    initargs=("background",),
+)
+
+
+@local_commands.register(name="restart", triggers=["restart"], terminal=True)
+def restart(phrase: str) -> str:
+    """Restarts Jarvis UI.
+
+    Args:
+        phrase: Takes the phrase spoken as an argument.
+
+    Returns:
+        str:
+        Returns the action to be taken.
+    """
+    logger.info("User requested to restart.")
+    playsound(sound=fileio.restart)
+    display.write_screen("Restarting...")
+    return "RESTART"
+
+
+@local_commands.register(name="stop", triggers=["stop running"], terminal=True)
+def stop(phrase: str) -> str:
+    """Stops Jarvis UI.
+
+    Args:
+        phrase: Takes the phrase spoken as an argument.
+
+    Returns:
+        str:
+        Returns the action to be taken.
+    """
+    logger.info("User requested to stop.")
+    playsound(sound=fileio.shutdown)
+    display.write_screen("Shutting down")
+    return "STOP"
+
+
+@local_commands.register(
+    name="volume", triggers=["volume", "mute"], excludes=["server"]
+)
+def volume(phrase: str) -> None:
+    """Sets the volume on the host, volume of the server is left to the server.
+
+    Args:
+        phrase: Takes the phrase spoken as an argument.
+    """
+    phrase_lower = phrase.lower()
+    if "unmute" in phrase_lower:
+        level = env.volume
+    elif "mute" in phrase_lower:
+        level = 0
+    elif "max" in phrase_lower or "full" in phrase_lower:
+        level = 100
+    else:
+        level = helper.extract_nos(input_=phrase, method=int)
+    pyvolume.custom(level, logger)
+
+
+def split_phrase(phrase: str) -> List[str]:
+    """Splits a compound phrase into commands.
+
+    Args:
+        phrase: Takes the phrase spoken as an argument.
+
+    Returns:
+        List[str]:
+        Returns the list of commands.
+
+    See Also:
+        - Only the commands that can be handled locally are split apart.
+        - Contiguous parts for the server are joined back, so phrases like "rock and roll" are sent as spoken.
+    """
+    parts = CONNECTIVES.split(phrase)
+    commands = []
+    remote = False
+    for index in range(0, len(parts), 2):
+        if not (part := parts[index].strip()):
+            continue
+        if local_commands.match(part):
+            commands.append(part)
+            remote = False
+        elif remote:
+            commands[-1] = f"{commands[-1]} {parts[index - 1]} {part}"
+        else:
+            commands.append(part)
+            remote = True
+    return commands or [phrase]
+
+
+def request_server(phrase: str, speech_file: str) -> Union[dict, bool, Iterator[str]]:
+    """Sends a command to the server.
+
+    Args:
+        phrase: Command to be executed.
+        speech_file: File to store the audio response.
+
+    Returns:
+        Union[dict, bool, Iterator[str]]:
+        Returns the response from the server, or an iterator over the text when the response is streamed.
+    """
+    status.update(counter="requests", timestamp="last_request")
+    return api_handler.make_request(
+        path="offline-communicator",
+        data=api_handler.build_payload(phrase=phrase),
+        speech_file=speech_file,
+        stream=env.stream_responses,
+    )
 
 
 def process_request(phrase: str) -> Union[str, None]:
@@ -22,33 +150,38 @@ def process_request(phrase: str) -> Union[str, None]:
     Returns:
         str:
         Returns the appropriate action to be taken.
+
+    See Also:
+        - Compound phrases are split, and the commands for the server are sent concurrently.
+        - Local commands are executed right away, except terminal ones like restart which wait for the ones before them.
+        - Commands after a terminal one are skipped, so nothing is sent to the server that won't be played back.
+        - A failed command is reported and the rest carry on, restarts are left to the breaker and heart beat.
+        - Responses are played back in the order they were spoken.
     """
-    logger.info("Request: %s", phrase)
+    trace = tracing.start_trace()
+    logger.info("Request: %s [trace: %s]", phrase, trace)
     display.write_screen(f"Request: {phrase}")
-    phrase_lower = phrase.lower()
-    if "restart" in phrase_lower:
-        logger.info("User requested to restart.")
-        playsound(sound=fileio.restart)
-        display.write_screen("Restarting...")
-        return "RESTART"
-    if "stop running" in phrase_lower:
-        logger.info("User requested to stop.")
-        playsound(sound=fileio.shutdown)
-        display.write_screen("Shutting down")
-        return "STOP"
-    if (
-        "volume" in phrase_lower or "mute" in phrase_lower
-    ) and "server" not in phrase_lower:
-        if "unmute" in phrase_lower:
-            level = env.volume
-        elif "mute" in phrase_lower:
-            level = 0
-        elif "max" in phrase_lower or "full" in phrase_lower:
-            level = 100
-        else:
-            level = helper.extract_nos(input_=phrase, method=int)
-        pyvolume.custom(level, logger)
-    if not config.keywords:
+    commands = [
+        (command, local_commands.match(command)) for command in split_phrase(phrase)
+    ]
+    if len(commands) > 1:
+        logger.info("Split into: %s", [command for command, _ in commands])
+    for end, (command, local) in enumerate(commands, start=1):
+        if local and local.terminal:
+            # Commands after a terminal one would never be played back
+            if skipped := [command for command, _ in commands[end:]]:
+                logger.warning("Skipping commands after '%s': %s", command, skipped)
+            commands = commands[:end]
+            break
+    remote = [index for index, (_, local) in enumerate(commands) if not local]
+    if remote and not config.keywords and status.degraded:
+        # Restarts have been given up on, so the keywords are fetched right here
+        if not (keywords := load_keywords()):
+            playsound(sound=fileio.failed)
+            display.write_screen("Server is unavailable")
+            return
+        config.keywords = keywords
+    if remote and not config.keywords:
         logger.warning("keywords are not loaded yet, restarting")
         if os.path.isfile("failed_command"):
             logger.critical("Consecutive failure")
@@ -63,64 +196,165 @@ def process_request(phrase: str) -> Union[str, None]:
     if os.path.isfile("failed_command"):
         logger.info("Recovered after a recent failure, deleting placeholder file.")
         os.remove("failed_command")
-    if response := api_handler.make_request(
-        path="offline-communicator",
-        data={
-            "command": phrase,
-            "native_audio": env.native_audio,
-            "speech_timeout": env.speech_timeout,
-        },
-    ):
-        process_response(response)
-    else:
+    status.update(phase=Phase.processing)
+    # Audio responses are stored in separate files, when the requests are sent concurrently
+    base, extension = os.path.splitext(fileio.speech_wav_file)
+    speech_files = {
+        index: f"{base}-{index}{extension}" if len(remote) > 1 else None
+        for index in remote
+    }
+    submitted = time.perf_counter()
+    futures = {
+        # Context is copied to the request threads, to carry the trace ID of the interaction
+        index: requester.submit(
+            profiler.run,
+            contextvars.copy_context().run,
+            request_server,
+            commands[index][0],
+            speech_files[index],
+        )
+        for index in remote
+    }
+    for command, local in commands:
+        if local and not local.terminal:
+            local.handler(command)
+    for index, (command, local) in enumerate(commands):
+        if local:
+            if local.terminal:
+                return local.handler(command)
+            continue
+        # Filler covers the wait for the first response, the others are usually ready by the time it is spoken
+        if index == remote[0]:
+            response = filler.await_response(future=futures[index], submitted=submitted)
+        else:
+            response = futures[index].result()
+        if response:
+            helper.recovered()
+            status.update(timestamp="last_response", phase=Phase.speaking)
+            start = time.perf_counter()
+            process_response(
+                response=response,
+                speech_file=speech_files[index],
+                submitted=submitted,
+            )
+            recorder.event(
+                RecordType.playback,
+                elapsed=time.perf_counter() - start,
+                audio=response is True,
+            )
+            continue
+        status.update(counter="failures")
         playsound(sound=fileio.failed)
-        return "RESTART"
+        # A single failure doesn't warrant a restart, breaker and heart beat decide when the server is down
+        if status.degraded or api_handler.pool.breaker_state != BreakerState.closed:
+            display.write_screen("Server is unavailable")
+        else:
+            display.write_screen(f"Failed to process: {command}")
+
+
+def speak_stream(chunks: Iterator[str], submitted: float) -> None:
+    """Writes the chunks of a streamed response as they arrive, and speaks each sentence once it is complete.
+
+    Args:
+        chunks: Text of the response as it arrives.
+        submitted: Time at which the request was submitted, to measure the time to first word.
+
+    See Also:
+        - Chunks are read on a separate thread, so the display keeps up while a sentence is being spoken.
+        - Sentences are spoken on the calling thread, as some speech engines are bound to the main thread.
+    """
+    sentences = queue.Queue()
+
+    def read() -> None:
+        """Reads the chunks and queues the complete sentences."""
+        affinity.apply(role="background")
+        text, pending = "", ""
+        display.write_screen("Response: ")
+        try:
+            for chunk in chunks:
+                display.append_screen(chunk)
+                text += chunk
+                *complete, pending = SENTENCE_END.split(pending + chunk)
+                for sentence in complete:
+                    sentences.put(sentence)
+            if pending.strip():
+                sentences.put(pending)
+        finally:
+            sentences.put(None)
+            logger.info("Response: %s", text)
+
+    threading.Thread(
+        target=profiler.run, args=(read,), name="stream", daemon=True
+    ).start()
+    first = True
+    while (sentence := sentences.get()) is not None:
+        if first:
+            telemetry.observe(
+                "response.time_to_first_word", time.perf_counter() - submitted
+            )
+            first = False
+        speaker.speak(text=sentence)
 
 
-def process_response(response: Union[dict, bool]) -> None:
+def process_response(
+    response: Union[dict, bool, Iterator[str]],
+    speech_file: str = None,
+    submitted: float = None,
+) -> None:
     """Processes response from the server.
 
     Args:
-        response: Takes either a boolean flag or a dictionary from the server as an argument.
+        response: Takes either a boolean flag, a dictionary or a streamed response from the server as an argument.
+        speech_file: File in which the audio response was stored, defaults to ``speech_wav_file``.
+        submitted: Time at which the request was submitted, to measure the time to first word.
     """
+    submitted = submitted or time.perf_counter()
+    if not isinstance(response, (dict, bool)):
+        speak_stream(chunks=response, submitted=submitted)
+        return
+    speech_file = speech_file or fileio.speech_wav_file
     if response is True:
         logger.info("Response received as audio.")
         display.write_screen("Response received as audio.")
         # Because Windows runs into PermissionError if audio file is open when file is removed
         if settings.operating_system == "Windows":
-            player = Process(target=playsound, kwargs={"sound": fileio.speech_wav_file})
+            player = Process(target=playsound, kwargs={"sound": speech_file})
             player.start()
             player.join()
             if player.is_alive():
                 player.terminate()
                 player.kill()
-            Timer(
-                interval=3, function=os.remove, args=(fileio.speech_wav_file,)
-            ).start()
+            Timer(interval=3, function=os.remove, args=(speech_file,)).start()
         else:
-            playsound(sound=fileio.speech_wav_file)
-            os.remove(fileio.speech_wav_file)
+            playsound(sound=speech_file)
+            os.remove(speech_file)
         return
     response = response.get("detail", "")
     logger.info("Response: %s", response)
     display.write_screen(f"Response: {response}")
+    telemetry.observe("response.time_to_first_word", time.perf_counter() - submitted)
     speaker.speak(text=response)
 
 
-def process(phrase: str = None, status_manager: DictProxy = None) -> None:
+def process(
+    phrase: str = None, source: listener.StreamSource = None
+) -> Union[str, None]:
     """Handles request and response.
 
     Args:
         phrase: Takes existing phrase as an argument in case a previous failure is pending tobe addressed.
-        status_manager: Multiprocessing dictionary to set restarts.
+        source: Stream that is already open for the listener, defaults to opening the microphone.
+
+    Returns:
+        str:
+        Returns the phrase that was processed, if any.
     """
-    if phrase := (phrase or listener.listen()):
+    if phrase := (phrase or listener.listen(source=source)):
         processed = process_request(phrase)
+        recorder.event(RecordType.decision, phrase=phrase, action=processed)
         if processed == "STOP":
             raise KeyboardInterrupt
         if processed == "RESTART":
-            if settings.operating_system == "Linux":
-                helper.linux_restart()
-            status_manager["LOCKED"] = None
-            while True:
-                pass  # To ensure the listener doesn't end so that, the main process can kill and restart
+            # Returns only when the restart is declined, otherwise the process is replaced or terminated
+            helper.request_restart()
+    return phrase
@@ -5,9 +5,25 @@
 
 """
 
+from typing import Union
+
+import pyttsx3
+
 from jarvis_ui.executables import audio_driver
 
-driver = audio_driver.instantiate_audio_driver()
+driver: Union[pyttsx3.Engine, None] = None
+
+
+def load_driver() -> Union[pyttsx3.Engine, None]:
+    """Instantiates the audio driver, invoked as a start up step.
+
+    Returns:
+        pyttsx3.Engine:
+        Returns instance of audio engine.
+    """
+    global driver
+    driver = audio_driver.instantiate_audio_driver()
+    return driver
 
 
 def speak(text: str) -> None:
@@ -8,22 +8,24 @@
 import os
 import string
 import struct
+import time
 from importlib import metadata
-from multiprocessing.managers import DictProxy  # noqa
 from typing import Dict, List, Union
 
 import pvporcupine
 from packaging.version import Version
 from playsound import playsound
-from pyaudio import PyAudio, Stream, paInt16
+from pyaudio import Stream, paInputOverflowed, paInt16
 
-from jarvis_ui.executables import display, processor, speaker
+from jarvis_ui.executables import display, listener, processor
 from jarvis_ui.logger import logger
-from jarvis_ui.modules import exceptions, models
-
-assert (
-    speaker.driver or models.env.speech_timeout
-), "Cannot proceed without both audio drivers and speech timeout."
+from jarvis_ui.modules import affinity, exceptions, models
+from jarvis_ui.modules.dsp import EnergyGate
+from jarvis_ui.modules.peripherals import registry
+from jarvis_ui.modules.profiler import profiler
+from jarvis_ui.modules.recorder import recorder
+from jarvis_ui.modules.status import LockState, Phase, status
+from jarvis_ui.modules.telemetry import telemetry
 
 WAKE_WORD_DETECTOR = metadata.version(pvporcupine.__name__)
 
@@ -69,9 +71,12 @@ class Activator:
         - After processing the phrase, the converted text is sent as response to the API.
     """
 
-    def __init__(self):
+    def __init__(self, detector: pvporcupine.Porcupine = None):
         """Initiates Porcupine object for hot word detection.
 
+        Args:
+            detector: Porcupine object created during start up, created here if not provided.
+
         See Also:
             - Instantiates an instance of Porcupine object and monitors audio stream for occurrences of keywords.
             - A higher sensitivity results in fewer misses at the cost of increasing the false alarm rate.
@@ -80,9 +85,22 @@ class Activator:
         References:
             - `Audio Overflow <https://people.csail.mit.edu/hubert/pyaudio/docs/#pyaudio.Stream.read>`__ handling.
         """
-        self.py_audio = PyAudio()
-        self.detector = pvporcupine.create(**constructor())
+        self.detector = detector or pvporcupine.create(**constructor())
+        registry.bind(index=models.env.microphone_index)
         self.audio_stream = self.open_stream()
+        if models.env.noise_calibration:
+            self.calibrator = listener.Calibrator(
+                frame_length=self.detector.frame_length
+            )
+        else:
+            self.calibrator = None
+        if models.env.energy_gate:
+            self.gate = EnergyGate(
+                frame_length=self.detector.frame_length, ratio=models.env.energy_gate
+            )
+        else:
+            self.gate = None
+        self.cpu = 0.0
         label = ", ".join(
             [
                 f"{string.capwords(wake)!r}: {sens}"
@@ -100,10 +118,12 @@ class Activator:
             - Releases port audio resources.
         """
         self.detector.delete()
-        if self.audio_stream and self.audio_stream.is_active():
-            self.py_audio.close(stream=self.audio_stream)
-            self.audio_stream.close()
-        self.py_audio.terminate()
+        if self.calibrator:
+            self.calibrator.save_profile()
+        recorder.close()
+        if self.audio_stream:
+            registry.close_stream(stream=self.audio_stream)
+        registry.terminate()
 
     def open_stream(self) -> Stream:
         """Initializes an audio stream.
@@ -112,34 +132,163 @@ class Activator:
             Stream:
             PyAudio stream.
         """
-        return self.py_audio.open(
+        return registry.open_stream(
             rate=self.detector.sample_rate,
             channels=1,
             format=paInt16,
             input=True,
             frames_per_buffer=self.detector.frame_length,
-            input_device_index=models.env.microphone_index,
+            input_device_index=registry.capture_index,
+        )
+
+    def rebind_stream(self) -> None:
+        """Awaits the capture device to re-appear and reopens the audio stream.
+
+        See Also:
+            - Invoked when the capture device disappears, which is usually a USB microphone being unplugged.
+            - The device is located by its name, since the index assigned by port audio may change once re-plugged.
+        """
+        logger.warning("Capture device %r is unavailable", registry.capture_name)
+        display.write_screen(f"Awaiting microphone: {registry.capture_name}")
+        if self.audio_stream:
+            registry.close_stream(stream=self.audio_stream)
+            self.audio_stream = None
+        while True:
+            if registry.rebind():
+                try:
+                    self.audio_stream = self.open_stream()
+                except OSError as error:
+                    logger.debug(error)
+                else:
+                    break
+            time.sleep(models.env.device_rescan or 2)
+        logger.info(
+            "Capture device %r rebound to index %s",
+            registry.capture_name,
+            registry.capture_index,
         )
+        display.write_screen(self.label)
+
+    def read_frame(self) -> bytes:
+        """Reads a frame from the audio stream, rebinding the stream if the device disappears.
 
-    def executor(self, status_manager: DictProxy = None):
+        Returns:
+            bytes:
+            Returns the raw audio frame.
+
+        See Also:
+            - Overflows are counted and the frame is read again, so dropped frames show up in telemetry.
+            - PyAudio discards the frame read along with an overflow, which adds a frame (32 ms at 512 samples and
+              16 kHz) to the audio already lost by port audio. This cost is counted as ``audio.dropped_ms``.
+            - Reading without the exception would keep the frame, but leaves no way to tell that an overflow happened.
+        """
+        while True:
+            try:
+                return self.audio_stream.read(
+                    num_frames=self.detector.frame_length,
+                    exception_on_overflow=True,
+                )
+            except OSError as error:
+                # Frames dropped by port audio, when the loop has fallen behind the device
+                if error.errno == paInputOverflowed:
+                    telemetry.increment("audio.overflows")
+                    telemetry.increment(
+                        "audio.dropped_ms",
+                        1e3 * self.detector.frame_length / self.detector.sample_rate,
+                    )
+                    continue
+                logger.error(error)
+                self.rebind_stream()
+
+    def detect(self, frame: bytes) -> int:
+        """Feeds a frame to the wake word detector.
+
+        Args:
+            frame: Raw audio frame.
+
+        Returns:
+            int:
+            Returns the index of the wake word detected, or a negative value.
+        """
+        start = time.process_time()
+        result = self.detector.process(
+            pcm=struct.unpack_from("h" * self.detector.frame_length, frame)
+        )
+        self.cpu += time.process_time() - start
+        return -1 if result is False else result
+
+    def report_gate(self) -> None:
+        """Records the share of frames skipped by the energy gate, and the detector's CPU time it saves per hour."""
+        processed = self.gate.frames - self.gate.skipped
+        if not processed:
+            return
+        frames_per_hour = 3_600 * self.detector.sample_rate / self.detector.frame_length
+        telemetry.gauge("gate.skipped", round(self.gate.savings, 4))
+        telemetry.gauge(
+            "gate.cpu_saved_per_hour",
+            round(self.cpu / processed * frames_per_hour * self.gate.savings, 2),
+        )
+
+    def converse(self) -> None:
+        """Listens on the open audio stream, and keeps listening for follow ups after each response.
+
+        See Also:
+            - Follow ups within the window go straight to recognition, without the wake word or reopening the device.
+            - Conversation ends when nothing is heard within the window, and the wake word detector takes over.
+        """
+        source = listener.StreamSource(
+            stream=self.audio_stream,
+            sample_rate=self.detector.sample_rate,
+            frame_length=self.detector.frame_length,
+        )
+        phrase = processor.process(source=source)
+        while phrase:
+            # Discards what was heard while the response was played back
+            source.flush()
+            status.update(phase=Phase.listening)
+            # What is heard is only recorded once it turns out to be a follow up
+            recorder.hold()
+            if phrase := listener.listen(timeout=models.env.follow_up, source=source):
+                # Marks the start of an interaction in the session log, like a wake word would
+                recorder.wake(keyword=-1)
+                telemetry.increment("follow_up.turns")
+                processor.process(phrase=phrase)
+            else:
+                recorder.discard()
+        source.flush()
+
+    def executor(self):
         """Closes the audio stream and calls the processor."""
-        if status_manager:
-            status_manager["LOCKED"] = True
-            logger.debug("Restart locked")
+        status.update(
+            counter="wakes",
+            timestamp="last_wake",
+            lock=LockState.locked,
+            phase=Phase.listening,
+        )
+        logger.debug("Restart locked")
         playsound(sound=models.fileio.acknowledgement, block=False)
-        self.py_audio.close(stream=self.audio_stream)
+        if models.env.follow_up:
+            self.converse()
+            status.update(lock=LockState.unlocked, phase=Phase.idle)
+            logger.debug("Restart released")
+            display.write_screen(self.label)
+            return
+        registry.close_stream(stream=self.audio_stream)
         try:
-            processor.process(status_manager=status_manager)
+            processor.process()
         except KeyboardInterrupt:
             self.audio_stream = None
             raise KeyboardInterrupt
-        if status_manager:
-            status_manager["LOCKED"] = False
-            logger.debug("Restart released")
-        self.audio_stream = self.open_stream()
+        status.update(lock=LockState.unlocked, phase=Phase.idle)
+        logger.debug("Restart released")
+        try:
+            self.audio_stream = self.open_stream()
+        except OSError as error:
+            logger.error(error)
+            self.rebind_stream()
         display.write_screen(self.label)
 
-    def start(self, status_manager: DictProxy = None) -> None:
+    def start(self) -> None:
         """Runs ``audio_stream`` in a forever loop and calls ``initiator`` when the phrase ``Jarvis`` is heard."""
         logger.info(
             "Starting wake word detector with sensitivity: %s", models.env.sensitivity
@@ -147,18 +296,32 @@ class Activator:
         if os.path.isfile("failed_command"):
             with open("failed_command") as file:
                 existing = file.read().strip()
-            processor.process(phrase=existing, status_manager=status_manager)
+            processor.process(phrase=existing)
+        # Capture and detection run on this thread, requests and streamed responses are handled by background threads
+        affinity.apply(role="audio")
         display.write_screen(self.label)
         while True:
-            result = self.detector.process(
-                pcm=struct.unpack_from(
-                    "h" * self.detector.frame_length,
-                    self.audio_stream.read(
-                        num_frames=self.detector.frame_length,
-                        exception_on_overflow=False,
-                    ),
-                )
-            )
-            if result is False or result < 0:
+            if profiler.requested:
+                profiler.toggle_profile()
+            frame = self.read_frame()
+            # Everything downstream, including the session recording, sees the conditioned audio
+            if listener.pipeline:
+                frame = listener.pipeline.process(frame)
+            if self.calibrator:
+                self.calibrator.feed(frame)
+            if recorder.enabled:
+                recorder.frame(frame)
+            if self.gate:
+                frames = self.gate.feed(frame)
+                if self.gate.frames % 1_000 == 0:
+                    self.report_gate()
+            else:
+                frames = (frame,)
+            for frame in frames:
+                if (result := self.detect(frame)) >= 0:
+                    break
+            else:
                 continue
-            self.executor(status_manager=status_manager)
+            recorder.wake(keyword=result)
+            with affinity.relaxed():
+                self.executor()
@@ -0,0 +1,291 @@
+"""Generates load against the Jarvis API, with the same auth and payload as the UI.
+
+>>> LoadTest
+
+See Also:
+    - Requests arrive at a fixed average rate with exponential gaps, regardless of how fast the server responds.
+    - Latency is measured from the time a request was due, so a backed up client doesn't hide the server's delay.
+    - Each request is a simulated client, and the number of open connections is capped by ``--clients``.
+    - Several rates can be given to step up the load, and each step is reported separately.
+    - Requires ``aiohttp`` module, installed with the ``load`` extra.
+    - Runs headless without the UI's env config, so the server and token are taken from the arguments,
+      or the ``SERVER_URL`` and ``TOKEN`` env vars.
+
+Usage:
+    python load_test.py --phrases phrases.txt --rates 10 50 100 --duration 60
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple, Union
+
+import aiohttp
+import numpy
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(logging.StreamHandler())
+
+DEFAULT_PHRASES = [
+    "what is the weather like today",
+    "what time is it",
+    "tell me a joke",
+    "turn on the living room lights",
+    "what is on my calendar today",
+]
+
+
+def parse_mix(mix: List[str]) -> Dict[str, float]:
+    """Parses the share of requests for each endpoint.
+
+    Args:
+        mix: List of ``endpoint=weight`` strings.
+
+    Returns:
+        Dict[str, float]:
+        Returns the normalized weights for each endpoint.
+    """
+    weights = {}
+    for item in mix:
+        endpoint, _, weight = item.partition("=")
+        weights[endpoint.strip("/")] = float(weight or 1)
+    total = sum(weights.values())
+    return {endpoint: weight / total for endpoint, weight in weights.items()}
+
+
+class LoadTest:
+    """Runs open-loop load against the server and collects the results.
+
+    >>> LoadTest
+
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        phrases: List[str],
+        mix: Dict[str, float],
+        timeout: float,
+        options: Dict[str, Union[bool, float]],
+    ):
+        """Instantiates the load test.
+
+        Args:
+            url: Base URL of the server.
+            token: Token for bearer auth.
+            phrases: Phrases sent to ``offline-communicator``.
+            mix: Share of requests for each endpoint.
+            timeout: Seconds to wait for each response.
+            options: Options sent along with each phrase, as the UI sends them.
+        """
+        self.url = url
+        self.token = token
+        self.options = options
+        self.phrases = phrases
+        self.mix = mix
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.results: List[Tuple[str, float, Union[int, str]]] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def request(
+        self, client: aiohttp.ClientSession, endpoint: str, due: float
+    ) -> None:
+        """Sends a request and records its latency and outcome.
+
+        Args:
+            client: HTTP client.
+            endpoint: Endpoint to call.
+            due: Monotonic time at which the request was due.
+        """
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if endpoint == "offline-communicator":
+                call = client.post(
+                    self.url + endpoint,
+                    json=dict(command=random.choice(self.phrases), **self.options),
+                )
+            else:
+                call = client.get(self.url + endpoint)
+            async with call as response:
+                await response.read()
+                outcome = response.status
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except aiohttp.ClientError as error:
+            # Connection errors, disconnects and malformed responses are bucketed by type
+            outcome = type(error).__name__
+        finally:
+            self.in_flight -= 1
+        self.results.append((endpoint, time.monotonic() - due, outcome))
+
+    async def run(self, rate: float, duration: float, clients: int) -> float:
+        """Sends requests with exponential gaps at an average rate.
+
+        Args:
+            rate: Average number of requests per second.
+            duration: Seconds to generate the load.
+            clients: Maximum number of open connections.
+
+        Returns:
+            float:
+            Returns the seconds taken for all the requests to complete.
+        """
+        endpoints, weights = zip(*self.mix.items())
+        headers = {
+            "Accept": "application/json",
+            "authorization": "Bearer " + self.token,
+        }
+        connector = aiohttp.TCPConnector(limit=clients)
+        async with aiohttp.ClientSession(
+            connector=connector, headers=headers, timeout=self.timeout
+        ) as client:
+            tasks = set()
+            start = time.monotonic()
+            due = start
+            while (due := due + random.expovariate(rate)) < start + duration:
+                if (delay := due - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                endpoint = random.choices(endpoints, weights)[0]
+                task = asyncio.create_task(self.request(client, endpoint, due))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+            return time.monotonic() - start
+
+    def report(self, rate: float, elapsed: float) -> None:
+        """Logs throughput, latency percentiles and errors for each endpoint.
+
+        Args:
+            rate: Average number of requests per second that were offered.
+            elapsed: Seconds taken for all the requests to complete.
+        """
+        by_endpoint = defaultdict(list)
+        for endpoint, latency, outcome in self.results:
+            by_endpoint[endpoint].append((latency, outcome))
+        logger.info(
+            "Offered %.1f req/s, peak in flight: %d, elapsed: %.1fs",
+            rate,
+            self.peak,
+            elapsed,
+        )
+        logger.info(
+            "%-22s %-8s %-10s %-10s %-10s %-10s %-10s %s",
+            "Endpoint",
+            "Count",
+            "OK/s",
+            "p50 ms",
+            "p90 ms",
+            "p99 ms",
+            "max ms",
+            "Errors",
+        )
+        for endpoint, results in sorted(by_endpoint.items()):
+            latencies = numpy.array([latency for latency, _ in results]) * 1e3
+            ok = sum(
+                1
+                for _, outcome in results
+                if isinstance(outcome, int) and outcome < 400
+            )
+            errors = Counter(
+                str(outcome)
+                for _, outcome in results
+                if not isinstance(outcome, int) or outcome >= 400
+            )
+            logger.info(
+                "%-22s %-8d %-10.1f %-10.1f %-10.1f %-10.1f %-10.1f %s",
+                endpoint,
+                len(results),
+                ok / elapsed,
+                *numpy.percentile(latencies, [50, 90, 99]),
+                latencies.max(),
+                dict(errors) or "-",
+            )
+
+
+def main(argv: List[str] = None) -> None:
+    """Steps through the rates and reports each one.
+
+    Args:
+        argv: Command line arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--url",
+        default=os.environ.get("SERVER_URL"),
+        help="Defaults to the SERVER_URL env var",
+    )
+    parser.add_argument(
+        "--token", default=os.environ.get("TOKEN"), help="Defaults to the TOKEN env var"
+    )
+    parser.add_argument(
+        "--native-audio",
+        action="store_true",
+        help="Requests the responses as audio, like NATIVE_AUDIO",
+    )
+    parser.add_argument(
+        "--speech-timeout",
+        type=float,
+        default=0,
+        help="Speech timeout sent with each command, like SPEECH_TIMEOUT",
+    )
+    parser.add_argument(
+        "--phrases", help="File with a phrase on each line, sent as commands"
+    )
+    parser.add_argument(
+        "--rates",
+        nargs="+",
+        type=float,
+        default=[10],
+        help="Average requests per second, for each step",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60, help="Seconds to run each step"
+    )
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=["offline-communicator=8", "keywords=1", "health=1"],
+        help="Share of requests for each endpoint",
+    )
+    parser.add_argument(
+        "--clients", type=int, default=1_000, help="Maximum open connections"
+    )
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args(argv)
+    if not args.url or not args.token:
+        parser.error("server URL and token are required, as arguments or env vars")
+
+    if args.phrases:
+        with open(args.phrases) as file:
+            phrases = [line.strip() for line in file if line.strip()]
+    else:
+        phrases = DEFAULT_PHRASES
+    url = args.url if args.url.endswith("/") else args.url + "/"
+    for rate in args.rates:
+        load_test = LoadTest(
+            url=url,
+            token=args.token,
+            phrases=phrases,
+            mix=parse_mix(args.mix),
+            timeout=args.timeout,
+            options=dict(
+                native_audio=args.native_audio, speech_timeout=args.speech_timeout
+            ),
+        )
+        elapsed = asyncio.run(
+            load_test.run(rate=rate, duration=args.duration, clients=args.clients)
+        )
+        load_test.report(rate=rate, elapsed=elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ Disables loggers from imported modules, while using the root logger without havi
 import importlib
 import logging
 import os
+from datetime import datetime
 from logging.config import dictConfig
 
 from jarvis_ui.modules.models import env, fileio
@@ -60,4 +61,21 @@ def console_logger() -> logging.Logger:
     return logging.getLogger(__name__)
 
 
+def rotate() -> None:
+    """Switches the file handler to a new log file when the date changes."""
+    filename = datetime.now().strftime(os.path.join("logs", "jarvis_%d-%m-%Y.log"))
+    if filename == str(fileio.base_log_file):
+        return
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.acquire()
+            try:
+                handler.close()
+                handler.baseFilename = os.path.abspath(filename)
+                handler.stream = handler._open()
+            finally:
+                handler.release()
+    fileio.base_log_file = filename
+
+
 logger = file_logger()
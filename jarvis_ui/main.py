@@ -1,43 +1,165 @@
+import os
 import pathlib
 import time
-from multiprocessing import Manager, Process
-from multiprocessing.managers import DictProxy  # noqa
+from multiprocessing import Process
 
 import pyvolume
 
 from jarvis_ui.logger import logger
+from jarvis_ui.modules.resilience import RestartBudget
+from jarvis_ui.modules.status import Flag, LockState, Phase, status
 
 
-def initiator(status_manager: DictProxy = None) -> None:
+def initiator(status_name: str = None, restarted_at: float = None) -> None:
     """Starts main process to activate Jarvis and process requests via API calls.
 
     Args:
-        status_manager: Shared multiprocessing dict to update in case of failed health check.
+        status_name: Name of the shared memory status block created by the main process.
+        restarted_at: Time at which the process was restarted, to measure the time taken to be ready.
     """
+    import pvporcupine
+
+    from jarvis_ui.executables import listener, speaker
+    from jarvis_ui.executables.channel import PushChannel
+    from jarvis_ui.executables.filler import filler
+    from jarvis_ui.executables.gateway import Gateway
     from jarvis_ui.executables.helper import heart_beat
-    from jarvis_ui.executables.starter import Activator
-    from jarvis_ui.modules.models import env
-    from jarvis_ui.modules.timer import RepeatedTimer
+    from jarvis_ui.executables.starter import Activator, constructor
+    from jarvis_ui.logger import rotate
+    from jarvis_ui.modules import config
+    from jarvis_ui.modules.bootstrap import Bootstrap, Step
+    from jarvis_ui.modules.models import env, settings
+    from jarvis_ui.modules.peripherals import channel_type, registry
+    from jarvis_ui.modules.profiler import profiler
+    from jarvis_ui.modules.recorder import recorder
+    from jarvis_ui.modules.telemetry import telemetry
+    from jarvis_ui.modules.timer import scheduler
+
+    if status_name:
+        status.attach(name=status_name)
+    status.update(pid=os.getpid(), phase=Phase.starting)
+
+    def load_keywords() -> None:
+        """Loads the keywords from the server into the config."""
+        config.config.keywords = config.load_keywords()
+
+    filler_steps = []
+    if env.filler_budget and env.filler_audio:
+        filler_steps.append(Step(name="filler", function=filler.load, critical=False))
+    elif env.filler_budget:
+        # Speech engine is only needed to synthesize the filler, when a clip isn't provided
+        filler_steps.append(
+            Step(
+                name="filler",
+                function=lambda audio_driver: filler.load(driver=audio_driver),
+                requires=("audio_driver",),
+                critical=False,
+                main_thread=settings.operating_system == "Darwin",
+            )
+        )
+    bootstrap = Bootstrap(
+        steps=[
+            Step(name="keywords", function=load_keywords, critical=False),
+            Step(
+                name="devices",
+                function=lambda: registry.devices(channels=channel_type.input_channels),
+            ),
+            Step(name="detector", function=lambda: pvporcupine.create(**constructor())),
+            # NSSpeechSynthesizer is bound to the main thread on macOS
+            Step(
+                name="audio_driver",
+                function=speaker.load_driver,
+                critical=not env.speech_timeout,
+                main_thread=settings.operating_system == "Darwin",
+            ),
+            *filler_steps,
+            # PortAudio's initialization is not thread safe, so waits for the device scan
+            Step(
+                name="microphone",
+                function=lambda devices, detector: listener.load_microphone(
+                    sample_rate=detector.sample_rate,
+                    frame_length=detector.frame_length,
+                ),
+                requires=("devices", "detector"),
+            ),
+            # Microphone initializes and terminates a port audio instance of its own, so the stream waits for it
+            Step(
+                name="activator",
+                function=lambda devices, detector, microphone: Activator(
+                    detector=detector
+                ),
+                requires=("devices", "detector", "microphone"),
+            ),
+        ]
+    )
+    activator = bootstrap.run()["activator"]
+    if env.record_sessions:
+        logger.info("Recording sessions within %d MB", env.record_sessions)
+        recorder.start(
+            size=env.record_sessions * 1024 * 1024,
+            sample_rate=activator.detector.sample_rate,
+            frame_length=activator.detector.frame_length,
+            wake_words=env.wake_words,
+            sensitivity=env.sensitivity,
+            follow_up=env.follow_up,
+            recognizer_settings=env.recognizer_settings.model_dump(),
+        )
 
     if env.heart_beat:
         logger.info(
             "Initiating heart beat with an interval of %d seconds", env.heart_beat
         )
-        timer = RepeatedTimer(
-            function=heart_beat, interval=env.heart_beat, args=(status_manager,)
+        scheduler.add(
+            name="heart_beat",
+            function=heart_beat,
+            interval=env.heart_beat,
+            jitter=env.heart_beat * 0.1,
+            timeout=env.heart_beat,
         )
-        timer.start()
+    if env.device_rescan:
+        logger.info(
+            "Initiating device rescan with an interval of %d seconds", env.device_rescan
+        )
+        scheduler.add(
+            name="device_rescan", function=registry.rescan, interval=env.device_rescan
+        )
+    if env.telemetry:
+        scheduler.add(
+            name="telemetry",
+            function=telemetry.dump,
+            interval=env.telemetry,
+            args=(os.path.join("logs", "telemetry.json"),),
+        )
+    scheduler.add(name="log_rotation", function=rotate, interval=60)
+    if env.profiling and not profiler.install():
+        scheduler.add(name="profiler", function=profiler.check_triggers, interval=5)
+    scheduler.start()
+    if env.push_channel:
+        logger.info("Initiating push channel at '/%s'", env.push_channel)
+        channel = PushChannel()
+        channel.start()
+    else:
+        channel = None
+    if env.gateway_port:
+        gateway = Gateway(port=env.gateway_port)
+        gateway.start()
     else:
-        timer = None
-    activator = Activator()
+        gateway = None
+    if restarted_at:
+        elapsed = time.time() - restarted_at
+        logger.info("Ready in %.2f seconds after restart", elapsed)
+        telemetry.observe("supervisor.restart_to_ready", elapsed)
     try:
-        if status_manager:
-            status_manager["LOCKED"] = False
-        activator.start(status_manager=status_manager)
+        status.update(lock=LockState.unlocked, phase=Phase.idle)
+        activator.start()
     except KeyboardInterrupt:
-        if timer:
-            timer.stop()
+        scheduler.stop()
+        if channel:
+            channel.stop()
+        if gateway:
+            gateway.stop()
     finally:
+        status.update(phase=Phase.stopped)
         activator.at_exit()
 
 
@@ -63,28 +185,82 @@ def terminator(process: Process) -> None:
             logger.error(error)
 
 
+def supervise(process: Process, budget: RestartBudget) -> bool:
+    """Watches the child process until it has to be restarted.
+
+    Args:
+        process: Child process.
+        budget: Restart budget.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the process should be restarted.
+
+    See Also:
+        - Restarts requested by the child are declined once the budget is exhausted, leaving it in degraded mode.
+        - A child that crashed is restarted within the budget, and one that exited cleanly ends the loop.
+    """
+    while True:
+        if not process.is_alive():
+            if process.exitcode == 0:
+                logger.info("Process %s [%d] has stopped", process.name, process.pid)
+                return False
+            logger.error(
+                "Process %s [%d] died with exit code %s",
+                process.name,
+                process.pid,
+                process.exitcode,
+            )
+            if budget.allow():
+                return True
+            logger.critical("Crash loop detected, giving up on restarts")
+            return False
+        if status.lock == LockState.restart:
+            if budget.allow():
+                logger.info("Lock status was set to restart")
+                terminator(process=process)
+                return True
+            logger.critical(
+                "Crash loop detected with %d restarts in %d seconds, staying up in degraded mode",
+                budget.recent,
+                budget.window,
+            )
+            status.update(
+                lock=LockState.unlocked, phase=Phase.idle, flags=Flag.degraded
+            )
+        time.sleep(1)
+
+
 def start() -> None:
-    """Initiates Jarvis as a child process."""
+    """Initiates Jarvis as a child process, and restarts it with a backoff within the restart budget."""
     # Import within a function to be called repeatedly
     from jarvis_ui.modules.models import env, settings  # noqa: F401
 
+    if not status.attached:
+        status.create()
     if settings.operating_system == "Linux":
-        initiator()
+        # Process restarts itself, so the restart history is carried in an env var
+        budget = RestartBudget.load_env(
+            budget=env.restart_budget, window=env.restart_window
+        )
+        status.update(restarts=budget.recent)
+        try:
+            initiator(restarted_at=budget.last)
+        finally:
+            status.close(unlink=True)
         return
-    status_manager = Manager().dict()
-    status_manager["LOCKED"] = False  # Instantiate DictProxy
-    process = Process(target=initiator, args=(status_manager,))
-    process.name = pathlib.Path(__file__).stem
-    process.start()
-    pyvolume.custom(env.volume, logger)
-    logger.info("Initiating as %s [%d]", process.name, process.pid)
+    budget = RestartBudget(budget=env.restart_budget, window=env.restart_window)
     while True:
-        if not process.is_alive():  # Terminated
-            logger.info("Process %s [%d] died. Ending loop.", process.name, process.pid)
+        status.update(lock=LockState.unlocked, phase=Phase.starting)
+        process = Process(target=initiator, args=(status.name, budget.last))
+        process.name = pathlib.Path(__file__).stem
+        process.start()
+        pyvolume.custom(env.volume, logger)
+        logger.info("Initiating as %s [%d]", process.name, process.pid)
+        if not supervise(process=process, budget=budget):
+            status.close(unlink=True)
             return
-        if status_manager["LOCKED"] is None:  # Neither locked nor unlocked, so restart
-            logger.info("Lock status was set to None")
-            terminator(process=process)
-            break
-        time.sleep(1)
-    start()
+        delay = budget.record()
+        logger.info("Restarting in %.1f seconds", delay)
+        time.sleep(delay)
+        status.update(counter="restarts")
@@ -0,0 +1,287 @@
+"""Places the threads on CPUs and sets their scheduling priority, to keep the audio capture ahead of everything else.
+
+>>> Affinity
+
+See Also:
+    - ``audio`` role is for the thread that reads the microphone and runs the wake word detector.
+    - ``background`` role is for the threads that talk to the server, stream responses and recognize speech.
+    - CPU affinity and real-time policies are only available on Linux. Elsewhere niceness applies to the whole process,
+      so it is only applied for the ``audio`` role.
+    - Audio thread drops to normal scheduling while it processes a command, which waits on recognition, the server
+      and speech.
+    - Settings are applied to the calling thread, so each thread applies its own role when it starts.
+    - Real-time policies are set to reset on fork, so the threads and processes spawned by the audio thread don't
+      inherit them.
+    - Real-time policies and negative niceness require privileges, and fall back to the default when denied.
+    - ``benchmark`` counts the overflows in the audio capture with and without the settings, under CPU stress.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Literal, Union
+
+import numpy
+
+from jarvis_ui.logger import logger
+from jarvis_ui.modules.models import env
+
+POLICIES = dict(
+    fifo=getattr(os, "SCHED_FIFO", None),
+    rr=getattr(os, "SCHED_RR", None),
+    other=getattr(os, "SCHED_OTHER", None),
+)
+# Same as the frames fed to the wake word detector
+SAMPLE_RATE = 16_000
+FRAME_LENGTH = 512
+
+
+def set_cpus(cpus: List[int]) -> bool:
+    """Pins the calling thread to the CPUs.
+
+    Args:
+        cpus: CPU indices.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the affinity was set.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        logger.warning("CPU affinity is not supported on this platform")
+        return False
+    try:
+        # PID 0 refers to the calling thread on Linux
+        os.sched_setaffinity(0, cpus)
+    except OSError as error:
+        logger.warning("Failed to set CPU affinity to %s: %s", cpus, error)
+        return False
+    return True
+
+
+def nice_target() -> int:
+    """Identifies the calling thread for the niceness calls.
+
+    Returns:
+        int:
+        Returns the thread's ID on Linux where niceness is per thread, and 0 for the whole process elsewhere.
+    """
+    return threading.get_native_id() if sys.platform == "linux" else 0
+
+
+def set_nice(nice: int) -> bool:
+    """Sets the niceness of the calling thread.
+
+    Args:
+        nice: Niceness from -20 (highest priority) to 19 (lowest priority).
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the niceness was set.
+    """
+    if not hasattr(os, "setpriority"):
+        logger.warning("Niceness is not supported on this platform")
+        return False
+    try:
+        os.setpriority(os.PRIO_PROCESS, nice_target(), nice)
+    except OSError as error:
+        logger.warning("Failed to set niceness to %d: %s", nice, error)
+        return False
+    return True
+
+
+def set_policy(policy: Literal["fifo", "rr", "other"], priority: int) -> bool:
+    """Sets the scheduling policy of the calling thread.
+
+    Args:
+        policy: Scheduling policy.
+        priority: Static priority for the real-time policies, from 1 to 99.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate whether the policy was set.
+    """
+    if not hasattr(os, "sched_setscheduler") or POLICIES[policy] is None:
+        logger.warning("Scheduling policy %r is not supported on this platform", policy)
+        return False
+    if policy == "other":
+        flags, priority = POLICIES[policy], 0
+    else:
+        flags = POLICIES[policy] | getattr(os, "SCHED_RESET_ON_FORK", 0)
+    try:
+        os.sched_setscheduler(0, flags, os.sched_param(priority))
+    except OSError as error:
+        logger.warning(
+            "Failed to set %r scheduling with priority %d: %s", policy, priority, error
+        )
+        return False
+    return True
+
+
+def apply(role: Literal["audio", "background"]) -> Dict[str, bool]:
+    """Applies the settings configured for a role to the calling thread.
+
+    Args:
+        role: Role of the calling thread.
+
+    Returns:
+        Dict[str, bool]:
+        Returns the settings that were attempted, and whether each one was applied.
+    """
+    settings = env.scheduling
+    applied = {}
+    cpus: List[int] = getattr(settings, f"{role}_cpus")
+    nice: Union[int, None] = getattr(settings, f"{role}_nice")
+    if cpus:
+        applied["cpus"] = set_cpus(cpus)
+    if role == "audio" and settings.audio_policy != "other":
+        applied["policy"] = set_policy(settings.audio_policy, settings.audio_priority)
+    if nice is not None and role == "background" and sys.platform != "linux":
+        # Niceness would apply to the whole process, including the audio thread
+        logger.info("Niceness for %s threads is only applied on Linux", role)
+    elif nice is not None:
+        applied["nice"] = set_nice(nice)
+    if applied:
+        logger.info(
+            "Scheduling for %s thread %r: %s",
+            role,
+            threading.current_thread().name,
+            applied,
+        )
+    return applied
+
+
+@contextmanager
+def relaxed() -> Iterator[None]:
+    """Drops the real-time policy and niceness of the audio thread for the duration, and restores them after.
+
+    Yields:
+        None:
+        Yields control to run the block with normal scheduling.
+
+    See Also:
+        - Only the settings that are in effect are dropped, since they were applied with the privileges to restore them.
+        - Niceness is left alone unless a negative one is in effect, as lowering it again requires privileges.
+    """
+    settings = env.scheduling
+    policy = (
+        settings.audio_policy != "other"
+        and hasattr(os, "sched_getscheduler")
+        and os.sched_getscheduler(0) != POLICIES["other"]
+    )
+    nice = (
+        settings.audio_nice is not None
+        and settings.audio_nice < 0
+        and hasattr(os, "getpriority")
+        and os.getpriority(os.PRIO_PROCESS, nice_target()) == settings.audio_nice
+    )
+    if policy:
+        set_policy("other", 0)
+    if nice:
+        set_nice(max(settings.background_nice or 0, 0))
+    try:
+        yield
+    finally:
+        if policy:
+            set_policy(settings.audio_policy, settings.audio_priority)
+        if nice:
+            set_nice(settings.audio_nice)
+
+
+def burn(stop: multiprocessing.Event) -> None:
+    """Keeps a CPU busy until stopped.
+
+    Args:
+        stop: Event to stop burning.
+    """
+    while not stop.is_set():
+        sum(range(10_000))
+
+
+def capture(
+    duration: float, tuned: bool, device: Union[int, None] = None
+) -> Dict[str, float]:
+    """Reads the microphone like the wake word loop does, and counts the overflows.
+
+    Args:
+        duration: Seconds to read the microphone.
+        tuned: Boolean flag to apply the settings for the audio role.
+        device: Index of the capture device, defaults to the system default.
+
+    Returns:
+        Dict[str, float]:
+        Returns the number of frames read, the overflows and the longest gap between reads in milliseconds.
+    """
+    # Lazy import, since the module is also used by the threads that only talk to the server
+    import pyaudio
+
+    if tuned:
+        apply(role="audio")
+    audio = pyaudio.PyAudio()
+    stream = audio.open(
+        rate=SAMPLE_RATE,
+        channels=1,
+        format=pyaudio.paInt16,
+        input=True,
+        frames_per_buffer=FRAME_LENGTH,
+        input_device_index=device,
+    )
+    frames, overflows, gap = 0, 0, 0.0
+    last = start = time.perf_counter()
+    try:
+        while (now := time.perf_counter()) - start < duration:
+            gap, last = max(gap, now - last), now
+            try:
+                frame = stream.read(FRAME_LENGTH, exception_on_overflow=True)
+            except OSError as error:
+                if error.errno != pyaudio.paInputOverflowed:
+                    raise
+                overflows += 1
+                continue
+            # Stands in for the wake word detector's work on each frame
+            numpy.abs(numpy.fft.rfft(numpy.frombuffer(frame, dtype=numpy.int16)))
+            frames += 1
+    finally:
+        stream.stop_stream()
+        stream.close()
+        audio.terminate()
+    return dict(frames=frames, overflows=overflows, gap=gap * 1e3)
+
+
+def benchmark(
+    duration: float, workers: int, device: Union[int, None] = None
+) -> Dict[str, Dict[str, float]]:
+    """Counts the overflows with the default and the configured scheduling, while other processes load the CPUs.
+
+    Args:
+        duration: Seconds to read the microphone with each scheduling.
+        workers: Number of processes that keep a CPU busy.
+        device: Index of the capture device, defaults to the system default.
+
+    Returns:
+        Dict[str, Dict[str, float]]:
+        Returns the results of ``capture`` for each scheduling.
+    """
+    results = {}
+    stop = multiprocessing.Event()
+    burners = [
+        multiprocessing.Process(target=burn, args=(stop,), daemon=True)
+        for _ in range(workers)
+    ]
+    for burner in burners:
+        burner.start()
+    try:
+        for name, tuned in (("default", False), ("configured", True)):
+            # Each run gets a new thread, so the configured scheduling doesn't stick to the calling thread
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                results[name] = executor.submit(
+                    capture, duration=duration, tuned=tuned, device=device
+                ).result()
+    finally:
+        stop.set()
+        for burner in burners:
+            burner.join()
+    return results
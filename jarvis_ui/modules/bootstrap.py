@@ -0,0 +1,193 @@
+"""Runs the start up steps concurrently, based on the dependencies between them.
+
+>>> Bootstrap
+
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List
+
+from jarvis_ui.logger import logger
+from jarvis_ui.modules.telemetry import telemetry
+
+
+class Step:
+    """Instantiates Step object to hold an initialization function and its dependencies.
+
+    >>> Step
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable,
+        requires: Iterable[str] = (),
+        critical: bool = True,
+        main_thread: bool = False,
+    ):
+        """Holds the function and its dependencies.
+
+        Args:
+            name: Name of the step.
+            function: Function to trigger, which receives the results of the required steps as keyword arguments.
+            requires: Names of the steps that should complete before this one.
+            critical: Boolean flag to abort the start up if the step fails.
+            main_thread: Boolean flag to run the step on the calling thread, for libraries bound to the main thread.
+        """
+        self.name = name
+        self.function = function
+        self.requires = tuple(requires)
+        self.critical = critical
+        self.main_thread = main_thread
+        self.started: float = 0
+        self.elapsed: float = 0
+        self.thread: str = ""
+
+    def run(self, **kwargs) -> Any:
+        """Triggers the target function and records its timing.
+
+        Returns:
+            Any:
+            Returns the result of the target function.
+        """
+        self.started = time.perf_counter()
+        self.thread = threading.current_thread().name
+        try:
+            return self.function(**kwargs)
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+
+
+class Bootstrap:
+    """Runs independent start up steps on a thread pool, and fails fast on critical errors.
+
+    >>> Bootstrap
+
+    See Also:
+        - A step is started as soon as all the steps it requires have completed.
+        - Failure of a critical step cancels the pending steps and raises the error.
+        - Failure of a non-critical step is logged, and the steps that require it are skipped.
+        - Time to complete the start up is bounded by the slowest chain of dependent steps, instead of the sum of all.
+    """
+
+    def __init__(self, steps: List[Step], workers: int = 4):
+        """Validates the dependencies between the steps.
+
+        Args:
+            steps: Steps to be run.
+            workers: Number of threads to run the steps.
+
+        Raises:
+            ValueError:
+            If a step requires an unknown step.
+        """
+        self.steps = {step.name: step for step in steps}
+        for step in steps:
+            if unknown := set(step.requires) - set(self.steps):
+                raise ValueError(f"{step.name!r} requires unknown steps: {unknown}")
+        self.workers = workers
+
+    def run(self) -> Dict[str, Any]:
+        """Runs all the steps and logs a timing breakdown.
+
+        Returns:
+            Dict[str, Any]:
+            Returns the results of the steps that succeeded, keyed by their names.
+        """
+        start = time.perf_counter()
+        results: Dict[str, Any] = {}
+        failed = set()
+        pending = dict(self.steps)
+        running: Dict[Future, Step] = {}
+        executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="bootstrap"
+        )
+        try:
+            while pending or running:
+                ready = []
+                for name, step in list(pending.items()):
+                    if failed.intersection(step.requires):
+                        logger.warning("Skipping %r, a required step failed", name)
+                        failed.add(name)
+                        del pending[name]
+                    elif all(requirement in results for requirement in step.requires):
+                        del pending[name]
+                        ready.append(step)
+                # Steps on the pool are submitted first, so they run alongside the ones on the calling thread
+                for step in sorted(ready, key=lambda item: item.main_thread):
+                    kwargs = {key: results[key] for key in step.requires}
+                    if step.main_thread:
+                        running[self.run_inline(step=step, kwargs=kwargs)] = step
+                    else:
+                        running[executor.submit(step.run, **kwargs)] = step
+                if not running:
+                    if pending:
+                        raise ValueError(
+                            f"Circular dependency between: {', '.join(pending)}"
+                        )
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    if error := future.exception():
+                        if step.critical:
+                            logger.critical(
+                                "Start up failed at %r: %s", step.name, error
+                            )
+                            raise error
+                        logger.error("Start up step %r failed: %s", step.name, error)
+                        failed.add(step.name)
+                    else:
+                        results[step.name] = future.result()
+        finally:
+            # Doesn't wait for steps that are still running, when failing fast
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.report(elapsed=time.perf_counter() - start, origin=start)
+        return results
+
+    @staticmethod
+    def run_inline(step: Step, kwargs: Dict[str, Any]) -> Future:
+        """Runs a step on the calling thread.
+
+        Args:
+            step: Step to be run.
+            kwargs: Results of the required steps.
+
+        Returns:
+            Future:
+            Returns a completed future, so that the outcome is handled along with the steps on the pool.
+        """
+        future = Future()
+        try:
+            future.set_result(step.run(**kwargs))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    def report(self, elapsed: float, origin: float) -> None:
+        """Logs the timing breakdown for each step.
+
+        Args:
+            elapsed: Total time taken for the start up.
+            origin: Time at which the start up began.
+        """
+        total = 0
+        for step in sorted(self.steps.values(), key=lambda item: item.started or 0):
+            if not step.started:
+                continue
+            total += step.elapsed
+            telemetry.observe(f"bootstrap.{step.name}", step.elapsed)
+            logger.info(
+                "Start up step %-14s started at +%.3fs, took %.3fs [%s]",
+                repr(step.name),
+                step.started - origin,
+                step.elapsed,
+                step.thread,
+            )
+        telemetry.observe("bootstrap.total", elapsed)
+        logger.info(
+            "Start up completed in %.3fs, sum of all the steps: %.3fs", elapsed, total
+        )
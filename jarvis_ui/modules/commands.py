@@ -0,0 +1,164 @@
+"""Registry for commands that are executed locally, without a round trip to the server.
+
+>>> Commands
+
+See Also:
+    - Commands declare the words that trigger them, and the words that should hand the phrase to the server instead.
+    - Triggers and excludes of all the commands are compiled into a single regular expression with named groups.
+    - A phrase is scanned once, and the first registered command that was triggered and not excluded is picked.
+"""
+
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Union
+
+
+class Command:
+    """Instantiates Command object to hold a local command and its triggers.
+
+    >>> Command
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[str], Union[str, None]],
+        triggers: Iterable[str],
+        excludes: Iterable[str] = (),
+        terminal: bool = False,
+    ):
+        """Holds the handler and its triggers.
+
+        Args:
+            name: Name of the command, should be a valid identifier.
+            handler: Function that receives the phrase, and returns the action to be taken if any.
+            triggers: Regular expressions that trigger the command.
+            excludes: Regular expressions that prevent the command from being triggered.
+            terminal: Boolean flag to run the command only after the ones spoken before it have completed.
+        """
+        self.name = name
+        self.handler = handler
+        self.triggers = list(triggers)
+        self.excludes = list(excludes)
+        self.terminal = terminal
+
+    @property
+    def pattern(self) -> str:
+        """Named groups for the triggers and the excludes of the command."""
+        pattern = f"(?P<{self.name}>{'|'.join(self.triggers)})"
+        if self.excludes:
+            pattern += f"|(?P<{self.name}__exclude>{'|'.join(self.excludes)})"
+        return pattern
+
+
+class CommandRegistry:
+    """Holds the local commands and matches a phrase against all of them at once.
+
+    >>> CommandRegistry
+
+    """
+
+    def __init__(self):
+        """Instantiates an empty registry."""
+        self.commands: Dict[str, Command] = {}
+        self._matcher: Union[re.Pattern, None] = None
+
+    def register(
+        self,
+        name: str,
+        triggers: Iterable[str],
+        excludes: Iterable[str] = (),
+        terminal: bool = False,
+    ) -> Callable:
+        """Decorator to register a function as a local command.
+
+        Args:
+            name: Name of the command, should be a valid identifier.
+            triggers: Regular expressions that trigger the command.
+            excludes: Regular expressions that prevent the command from being triggered.
+            terminal: Boolean flag to run the command only after the ones spoken before it have completed.
+
+        Returns:
+            Callable:
+            Returns the decorator.
+        """
+
+        def decorator(handler: Callable[[str], Union[str, None]]) -> Callable:
+            """Registers the handler and invalidates the compiled matcher."""
+            if not name.isidentifier():
+                raise ValueError(f"{name!r} is not a valid command name")
+            self.commands[name] = Command(
+                name=name,
+                handler=handler,
+                triggers=triggers,
+                excludes=excludes,
+                terminal=terminal,
+            )
+            self._matcher = None
+            return handler
+
+        return decorator
+
+    @property
+    def matcher(self) -> re.Pattern:
+        """Combined regular expression for all the commands, compiled when first used."""
+        if self._matcher is None:
+            patterns = "|".join(command.pattern for command in self.commands.values())
+            self._matcher = re.compile(patterns or "(?!)", flags=re.IGNORECASE)
+        return self._matcher
+
+    def match(self, phrase: str) -> Union[Command, None]:
+        """Finds the command triggered by a phrase.
+
+        Args:
+            phrase: Takes the phrase spoken as an argument.
+
+        Returns:
+            Command:
+            Returns the command if the phrase triggers one.
+        """
+        found = {match.lastgroup for match in self.matcher.finditer(phrase)}
+        for name, command in self.commands.items():
+            if name in found and f"{name}__exclude" not in found:
+                return command
+
+    def dispatch(self, phrase: str) -> Union[str, None]:
+        """Executes the command triggered by a phrase.
+
+        Args:
+            phrase: Takes the phrase spoken as an argument.
+
+        Returns:
+            str:
+            Returns the action to be taken.
+        """
+        if command := self.match(phrase):
+            return command.handler(phrase)
+
+
+def benchmark(
+    registry: CommandRegistry, phrases: List[str], iterations: int = 10_000
+) -> Dict[str, float]:
+    """Measures the time taken to match phrases against the registry.
+
+    Args:
+        registry: Registry with the commands.
+        phrases: Phrases to be matched.
+        iterations: Number of times each phrase is matched.
+
+    Returns:
+        Dict[str, float]:
+        Returns the average time in microseconds to match each phrase.
+    """
+    _ = registry.matcher  # Compiles ahead of the measurement
+    results = {}
+    for phrase in phrases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            registry.match(phrase)
+        results[phrase] = (time.perf_counter() - start) / iterations * 1e6
+    return results
+
+
+local_commands = CommandRegistry()
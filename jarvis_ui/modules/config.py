@@ -7,7 +7,7 @@ import os
 import platform
 import warnings
 from multiprocessing import current_process
-from typing import Callable
+from typing import Callable, List
 
 import pvporcupine
 from pydantic import PositiveInt
@@ -23,8 +23,21 @@ add_ss_extn: Callable = (
 )
 
 
+def load_keywords() -> List[str]:
+    """Gets the keywords from the server.
+
+    Returns:
+        List[str]:
+        Returns a flat list of keywords that are processed by the server.
+    """
+    if keywords := make_request(path="keywords", method="GET"):
+        logger.info("keywords have been loaded")
+        return sum([v for _, v in keywords.items()], [])
+    return []
+
+
 class Config:
-    """Gets keywords during start up. Runs custom validations on env-vars.
+    """Runs custom validations on env-vars. Keywords are loaded as a start up step.
 
     >>> Config
 
@@ -41,11 +54,7 @@ class Config:
 
     if isinstance(env.sensitivity, float) or isinstance(env.sensitivity, PositiveInt):
         env.sensitivity = [env.sensitivity] * len(env.wake_words)
-    if keywords := make_request(path="keywords", method="GET"):
-        logger.info("keywords have been loaded")
-
-    if keywords:
-        keywords = sum([v for _, v in keywords.items()], [])
+    keywords: List[str] = []
 
     if env.speech_timeout and env.native_audio:
         warnings.warn(
@@ -0,0 +1,449 @@
+"""Vectorized signal processing over the raw frames read from the microphone.
+
+>>> DSP
+
+See Also:
+    - Only depends on ``numpy`` at import, so that offline tools like ``wake_word_sweep.py`` can load it on its own.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, List, Union
+
+import numpy
+
+
+def frame_rms(frames: numpy.ndarray) -> numpy.ndarray:
+    """Computes the root-mean-square energy for each frame.
+
+    Args:
+        frames: Two-dimensional array of 16-bit samples, with a frame on each row.
+
+    Returns:
+        numpy.ndarray:
+        Returns a one-dimensional array with the energy of each frame.
+    """
+    samples = frames.astype(numpy.float32)
+    return numpy.sqrt(numpy.mean(samples * samples, axis=-1))
+
+
+class NoiseFloor:
+    """Tracks the background noise level from a continuous stream of frames.
+
+    >>> NoiseFloor
+
+    See Also:
+        - Frames are collected into blocks, and the energy of an entire block is computed in a single pass.
+        - The lower percentile of each block is the block's noise estimate, as speech only occupies the upper range.
+        - The level falls quickly and rises slowly, so that a long utterance doesn't get mistaken for noise.
+    """
+
+    def __init__(
+        self,
+        frame_length: int,
+        block_frames: int = 32,
+        percentile: float = 20,
+        rise: float = 0.05,
+        fall: float = 0.5,
+        level: Union[float, None] = None,
+    ):
+        """Instantiates the estimator.
+
+        Args:
+            frame_length: Number of samples in each frame.
+            block_frames: Number of frames to collect before updating the estimate.
+            percentile: Percentile of the frame energies that is considered noise.
+            rise: Smoothing factor when the noise level is increasing.
+            fall: Smoothing factor when the noise level is decreasing.
+            level: Previously persisted noise level to start with.
+        """
+        self.block = numpy.zeros((block_frames, frame_length), dtype=numpy.int16)
+        self.filled = 0
+        self.percentile = percentile
+        self.rise = rise
+        self.fall = fall
+        self.level = level
+
+    def update(self, frame: bytes) -> Union[float, None]:
+        """Adds a frame to the current block and updates the estimate once the block is full.
+
+        Args:
+            frame: Raw 16-bit frame read from the audio stream.
+
+        Returns:
+            float:
+            Returns the updated noise level when a block is complete.
+        """
+        self.block[self.filled] = numpy.frombuffer(frame, dtype=numpy.int16)
+        self.filled += 1
+        if self.filled < len(self.block):
+            return
+        self.filled = 0
+        estimate = float(numpy.percentile(frame_rms(self.block), self.percentile))
+        if self.level is None:
+            self.level = estimate
+        else:
+            factor = self.fall if estimate < self.level else self.rise
+            self.level += factor * (estimate - self.level)
+        return self.level
+
+
+class EnergyGate:
+    """Holds back the frames from the wake word detector while the room is silent.
+
+    >>> EnergyGate
+
+    See Also:
+        - The gate opens when a frame's energy exceeds the adaptive noise floor by the given ratio.
+        - Frames heard just before the gate opens are replayed, so the onset of a wake word isn't missed.
+        - The gate stays open for a hangover period after the energy drops, to cover the trailing syllables.
+        - All frames pass through until the noise floor has been estimated.
+    """
+
+    def __init__(
+        self,
+        frame_length: int,
+        ratio: float,
+        lookback: int = 16,
+        hangover: int = 32,
+        minimum: float = 50,
+    ):
+        """Instantiates the gate in closed state.
+
+        Args:
+            frame_length: Number of samples in each frame.
+            ratio: Ratio of a frame's energy to the noise floor, that opens the gate.
+            lookback: Number of frames replayed when the gate opens.
+            hangover: Number of frames the gate stays open after the energy drops.
+            minimum: Lowest energy that opens the gate, for a noise floor close to digital silence.
+        """
+        self.noise_floor = NoiseFloor(frame_length=frame_length)
+        self.ratio = ratio
+        self.minimum = minimum
+        self.hangover = hangover
+        self.history: Deque[bytes] = deque(maxlen=lookback)
+        self.remaining = 0
+        self.frames = 0
+        self.skipped = 0
+
+    @property
+    def threshold(self) -> Union[float, None]:
+        """Energy that opens the gate, once the noise floor is known."""
+        if self.noise_floor.level is None:
+            return
+        return max(self.noise_floor.level * self.ratio, self.minimum)
+
+    @property
+    def savings(self) -> float:
+        """Fraction of frames that were held back from the detector."""
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def feed(self, frame: bytes) -> List[bytes]:
+        """Adds a frame and returns the frames to be fed to the detector.
+
+        Args:
+            frame: Raw 16-bit frame read from the audio stream.
+
+        Returns:
+            List[bytes]:
+            Returns nothing while the gate is closed, and the lookback frames followed by the current one when it opens.
+        """
+        self.frames += 1
+        self.noise_floor.update(frame)
+        threshold = self.threshold
+        samples = numpy.frombuffer(frame, dtype=numpy.int16)
+        if threshold is None or frame_rms(samples) > threshold:
+            opening = self.remaining == 0
+            self.remaining = self.hangover
+            if opening and self.history:
+                frames = list(self.history)
+                frames.append(frame)
+                self.history.clear()
+                # Replayed frames were skipped when they were heard, and are processed now
+                self.skipped -= len(frames) - 1
+                return frames
+            return [frame]
+        if self.remaining:
+            self.remaining -= 1
+            return [frame]
+        self.history.append(frame)
+        self.skipped += 1
+        return []
+
+
+class Stage(ABC):
+    """Base class for a stage in the audio pipeline, which conditions one frame at a time.
+
+    >>> Stage
+
+    """
+
+    name: str = "stage"
+
+    def __init__(self, budget: float):
+        """Instantiates the stage with its timing counters.
+
+        Args:
+            budget: CPU time in milliseconds the stage is allowed to spend on each frame.
+        """
+        self.budget = budget
+        self.elapsed = 0.0
+        self.frames = 0
+        self.over_budget = 0
+
+    @abstractmethod
+    def process(self, samples: numpy.ndarray) -> numpy.ndarray:
+        """Conditions a frame.
+
+        Args:
+            samples: One-dimensional array of samples as floats.
+
+        Returns:
+            numpy.ndarray:
+            Returns the conditioned samples, with the same length.
+        """
+
+
+class HighPass(Stage):
+    """First order high-pass filter, which also removes the DC offset of cheap microphones.
+
+    >>> HighPass
+
+    See Also:
+        - The recursion ``y[n] = a * y[n - 1] + x[n] - x[n - 1]`` is solved in closed form with a cumulative sum.
+        - Frames are split into short blocks, so that the powers of the pole stay within the precision of a float.
+    """
+
+    name: str = "high_pass"
+    block: int = 128
+
+    def __init__(self, budget: float, cutoff: float, sample_rate: int):
+        """Instantiates the filter.
+
+        Args:
+            budget: CPU time in milliseconds the stage is allowed to spend on each frame.
+            cutoff: Cutoff frequency in Hz.
+            sample_rate: Sample rate of the frames.
+        """
+        super().__init__(budget=budget)
+        pole = numpy.exp(-2 * numpy.pi * cutoff / sample_rate)
+        exponents = numpy.arange(self.block)
+        self.powers = pole**exponents
+        self.inverse = pole**-exponents
+        self.next_power = pole * self.powers
+        self.last_input = 0.0
+        self.last_output = 0.0
+
+    def process(self, samples: numpy.ndarray) -> numpy.ndarray:
+        """Filters a frame, carrying the filter's state over to the next one."""
+        output = numpy.empty_like(samples)
+        for start in range(0, len(samples), self.block):
+            end = min(start + self.block, len(samples))
+            chunk = samples[start:end]
+            length = end - start
+            difference = numpy.diff(chunk, prepend=self.last_input)
+            filtered = self.powers[:length] * numpy.cumsum(
+                difference * self.inverse[:length]
+            )
+            filtered += self.next_power[:length] * self.last_output
+            output[start:end] = filtered
+            self.last_input, self.last_output = chunk[-1], filtered[-1]
+        return output
+
+
+class AutomaticGain(Stage):
+    """Brings the level of speech towards a target, so that distant and close speakers sound alike.
+
+    >>> AutomaticGain
+
+    See Also:
+        - The gain is held while the frame is quieter than the noise gate, so that silence isn't amplified.
+        - The gain falls quickly and rises slowly, and is ramped across the frame to avoid clicks.
+    """
+
+    name: str = "gain"
+
+    def __init__(
+        self,
+        budget: float,
+        target: float,
+        max_gain: float,
+        noise_gate: float = 100,
+        rise: float = 0.05,
+        fall: float = 0.5,
+    ):
+        """Instantiates the gain control at unity gain.
+
+        Args:
+            budget: CPU time in milliseconds the stage is allowed to spend on each frame.
+            target: RMS level to bring speech to.
+            max_gain: Maximum gain applied to quiet speech.
+            noise_gate: RMS level below which the gain is held.
+            rise: Smoothing factor when the gain is increasing.
+            fall: Smoothing factor when the gain is decreasing.
+        """
+        super().__init__(budget=budget)
+        self.target = target
+        self.max_gain = max_gain
+        self.noise_gate = noise_gate
+        self.rise = rise
+        self.fall = fall
+        self.gain = 1.0
+
+    def process(self, samples: numpy.ndarray) -> numpy.ndarray:
+        """Applies the gain, ramping from the previous frame's gain to the updated one."""
+        previous = self.gain
+        if (level := frame_rms(samples)) > self.noise_gate:
+            desired = min(self.target / level, self.max_gain)
+            factor = self.fall if desired < self.gain else self.rise
+            self.gain += factor * (desired - self.gain)
+        ramp = numpy.linspace(previous, self.gain, len(samples), endpoint=False)
+        return numpy.clip(samples * ramp, -32_768, 32_767)
+
+
+class SpectralGate(Stage):
+    """Suppresses stationary noise, such as fans and hum, in the frequency domain.
+
+    >>> SpectralGate
+
+    See Also:
+        - Each window spans the previous and the current frame, with 50% overlap and a square-root Hann window.
+        - Noise in each bin is tracked like the noise floor, falling quickly and rising slowly.
+        - Bins are attenuated by the share of their magnitude that is noise, down to a floor to limit artifacts.
+        - Overlap-add delays the output by one frame.
+    """
+
+    name: str = "spectral_gate"
+
+    def __init__(
+        self,
+        budget: float,
+        frame_length: int,
+        ratio: float,
+        floor: float = 0.1,
+        rise: float = 0.01,
+        fall: float = 0.3,
+    ):
+        """Instantiates the gate.
+
+        Args:
+            budget: CPU time in milliseconds the stage is allowed to spend on each frame.
+            frame_length: Number of samples in each frame.
+            ratio: Multiple of the noise estimate that is subtracted from each bin.
+            floor: Lowest gain applied to a bin.
+            rise: Smoothing factor when the noise in a bin is increasing.
+            fall: Smoothing factor when the noise in a bin is decreasing.
+        """
+        super().__init__(budget=budget)
+        self.window = numpy.sqrt(numpy.hanning(2 * frame_length + 1)[:-1])
+        self.previous = numpy.zeros(frame_length)
+        self.tail = numpy.zeros(frame_length)
+        self.noise: Union[numpy.ndarray, None] = None
+        self.ratio = ratio
+        self.floor = floor
+        self.rise = rise
+        self.fall = fall
+
+    def process(self, samples: numpy.ndarray) -> numpy.ndarray:
+        """Gates a window of the previous and current frames, and returns the completed half of the overlap."""
+        spectrum = numpy.fft.rfft(
+            numpy.concatenate((self.previous, samples)) * self.window
+        )
+        self.previous = samples
+        magnitude = numpy.abs(spectrum)
+        if self.noise is None:
+            self.noise = magnitude
+        else:
+            factor = numpy.where(magnitude < self.noise, self.fall, self.rise)
+            self.noise += factor * (magnitude - self.noise)
+        gain = numpy.maximum(
+            1 - self.ratio * self.noise / numpy.maximum(magnitude, 1e-9), self.floor
+        )
+        window = numpy.fft.irfft(spectrum * gain) * self.window
+        length = len(samples)
+        output = self.tail + window[:length]
+        self.tail = window[length:]
+        return output
+
+
+class Pipeline:
+    """Runs the stages in order on each frame, and keeps the CPU time spent by each stage.
+
+    >>> Pipeline
+
+    See Also:
+        - Frames are converted to floats once, and back to 16-bit samples after the last stage.
+        - Stages are stateful, so a single pipeline is shared by the consumers that read the same stream in turns.
+        - Timing is summarized into telemetry after a number of frames, to keep the overhead to a clock read per stage.
+        - A stage that exceeds its budget on most of the frames is logged, as it may hold up the audio stream.
+    """
+
+    def __init__(self, stages: List[Stage], report_every: int = 1_000):
+        """Instantiates the pipeline.
+
+        Args:
+            stages: Stages to run in order.
+            report_every: Number of frames after which the timing is summarized.
+        """
+        self.stages = stages
+        self.report_every = report_every
+        self.frames = 0
+
+    def process(self, frame: bytes) -> bytes:
+        """Conditions a raw frame.
+
+        Args:
+            frame: Raw 16-bit frame read from the audio stream.
+
+        Returns:
+            bytes:
+            Returns the conditioned frame, in the same format.
+        """
+        samples = numpy.frombuffer(frame, dtype=numpy.int16).astype(numpy.float64)
+        for stage in self.stages:
+            start = time.thread_time()
+            samples = stage.process(samples)
+            elapsed = (time.thread_time() - start) * 1e3
+            stage.elapsed += elapsed
+            stage.frames += 1
+            stage.over_budget += elapsed > stage.budget
+        self.frames += 1
+        if self.frames % self.report_every == 0:
+            self.report()
+        return numpy.clip(samples, -32_768, 32_767).astype(numpy.int16).tobytes()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Summarizes and resets the timing of each stage.
+
+        Returns:
+            Dict[str, Dict[str, float]]:
+            Returns the mean CPU time in milliseconds and the share of frames over budget, for each stage.
+        """
+        summary = {}
+        for stage in self.stages:
+            if not stage.frames:
+                continue
+            summary[stage.name] = dict(
+                mean=stage.elapsed / stage.frames,
+                over_budget=stage.over_budget / stage.frames,
+            )
+            stage.elapsed, stage.frames, stage.over_budget = 0.0, 0, 0
+        return summary
+
+    def report(self) -> None:
+        """Records the timing of each stage, and logs the stages that are over their budget."""
+        # Lazy import, since the logger loads the env config for the whole app
+        from jarvis_ui.logger import logger
+        from jarvis_ui.modules.telemetry import telemetry
+
+        for name, timing in self.summary().items():
+            telemetry.observe(f"dsp.{name}.cpu_ms", timing["mean"])
+            telemetry.gauge(f"dsp.{name}.over_budget", round(timing["over_budget"], 4))
+            if timing["over_budget"] > 0.5:
+                logger.warning(
+                    "%s is over its budget on %.0f%% of the frames [mean: %.3f ms]",
+                    name,
+                    timing["over_budget"] * 100,
+                    timing["mean"],
+                )
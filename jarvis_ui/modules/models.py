@@ -8,17 +8,18 @@ import socket
 import string
 import sys
 import warnings
-from collections import ChainMap
 from datetime import datetime
 from enum import Enum
 from ipaddress import IPv4Address
-from typing import Dict, List, Union
+from typing import Dict, List, Literal, Union
 
 from packaging.version import parse as parser
 from pydantic import (
+    BaseModel,
     Field,
     FilePath,
     HttpUrl,
+    NonNegativeInt,
     PositiveFloat,
     PositiveInt,
     ValidationError,
@@ -29,7 +30,7 @@ from pydantic_settings import BaseSettings
 
 from jarvis_ui import indicators
 from jarvis_ui.modules.exceptions import UnsupportedOS
-from jarvis_ui.modules.peripherals import channel_type, get_audio_devices
+from jarvis_ui.modules.peripherals import channel_type, registry
 
 if os.getcwd().endswith("doc_generator"):
     os.chdir(os.path.dirname(os.getcwd()))
@@ -101,6 +102,36 @@ class RecognizerSettings(BaseSettings):
     non_speaking_duration: Union[PositiveInt, float] = 1
 
 
+class AudioPipeline(BaseModel):
+    """Settings for the stages that condition the audio, before the wake word detector and speech recognition.
+
+    >>> AudioPipeline
+
+    """
+
+    stages: List[Literal["high_pass", "gain", "spectral_gate"]] = []
+    budget: PositiveFloat = 1
+    cutoff: PositiveFloat = 80
+    target: PositiveFloat = 3_000
+    max_gain: PositiveFloat = 8
+    gate_ratio: PositiveFloat = 1.5
+
+
+class Scheduling(BaseModel):
+    """Settings for CPU affinity and scheduling priority, for the audio thread and the background threads.
+
+    >>> Scheduling
+
+    """
+
+    audio_cpus: List[NonNegativeInt] = []
+    audio_nice: Union[int, None] = Field(None, ge=-20, le=19)
+    audio_policy: Literal["fifo", "rr", "other"] = "other"
+    audio_priority: int = Field(10, ge=1, le=99)
+    background_cpus: List[NonNegativeInt] = []
+    background_nice: Union[int, None] = Field(None, ge=-20, le=19)
+
+
 class EnvConfig(BaseSettings):
     """Configure all env vars and validate using ``pydantic`` to share across modules.
 
@@ -116,14 +147,56 @@ class EnvConfig(BaseSettings):
     server_ip: Union[IPv4Address, None] = None
     server_host: Union[str, None] = None
     server_port: Union[PositiveInt, None] = None
+    server_urls: List[HttpUrl] = []
+    hedge_requests: bool = False
+
+    # Retries within a deadline for requests to the server
+    request_retries: int = Field(2, ge=0, le=10)
+    request_deadline: PositiveFloat = 30
+
+    # Accept responses streamed as NDJSON or server-sent events, to be spoken as they arrive
+    stream_responses: bool = False
+
+    # Milliseconds to wait for a response before a filler clip is played
+    filler_budget: Union[PositiveInt, None] = None
+    filler_audio: Union[FilePath, None] = None
 
     # Heart beat
     heart_beat: Union[int, None] = Field(None, le=3_600, ge=5)
 
+    # Restarts allowed within a window, before staying up in degraded mode
+    restart_budget: int = Field(5, ge=1, le=100)
+    restart_window: int = Field(600, ge=60, le=86_400)
+
+    # Path for server-sent events with health, keyword updates and notifications
+    push_channel: Union[str, None] = None
+
+    # Port on the loopback interface to accept commands from other local clients
+    gateway_port: Union[int, None] = Field(None, le=65_535, ge=1_024)
+
+    # Interval to rescan audio devices when idle
+    device_rescan: Union[int, None] = Field(None, le=3_600, ge=5)
+
+    # Interval to write metrics into the logs directory
+    telemetry: Union[int, None] = Field(None, le=3_600, ge=5)
+
+    # Size budget in MB to record sessions into the logs directory
+    record_sessions: Union[int, None] = Field(None, le=1_024, ge=1)
+
     # Speech recognition settings
     recognizer_settings: RecognizerSettings = RecognizerSettings()
+    noise_calibration: bool = False
+    noise_ratio: PositiveFloat = 1.5
+    audio_pipeline: AudioPipeline = AudioPipeline()
+
+    # Ratio above the noise floor that wakes the wake word detector, which is skipped in a silent room
+    energy_gate: Union[PositiveFloat, None] = None
+
+    # CPU placement and priority, to keep the audio capture from overflowing under load
+    scheduling: Scheduling = Scheduling()
 
     debug: bool = False
+    profiling: bool = False
     microphone_index: Union[int, PositiveInt, None] = Field(None, ge=0)
 
     speech_timeout: Union[int, PositiveFloat, PositiveInt] = 0
@@ -140,6 +213,10 @@ class EnvConfig(BaseSettings):
 
     listener_timeout: Union[float, PositiveInt] = 2
     listener_phrase_limit: Union[float, PositiveInt] = 5
+    follow_up: Union[float, None] = Field(None, gt=0, le=60)
+    # Engines raced on the same audio, the first confident result wins
+    recognizers: List[str] = []
+    recognizer_confidence: float = Field(0.8, ge=0, le=1)
     if settings.legacy:
         wake_words: List[str] = ["alexa"]
     else:
@@ -162,6 +239,12 @@ class EnvConfig(BaseSettings):
                 url = f"{url}/"
             return url
 
+    # noinspection PyMethodParameters
+    @field_validator("server_urls", mode="after")
+    def parse_server_urls(cls, urls: List[HttpUrl]) -> List[str]:
+        """Validate server_urls and return as a list of strings."""
+        return [url if url.endswith("/") else f"{url}/" for url in map(str, urls)]
+
     # noinspection PyMethodParameters
     @field_validator("microphone_index", mode="before")
     def parse_microphone_index(
@@ -170,25 +253,13 @@ class EnvConfig(BaseSettings):
         """Validate microphone index."""
         if not idx:
             return
-        if int(idx) in list(
-            map(
-                lambda tag: tag["index"],
-                get_audio_devices(channels=channel_type.input_channels),
-            )
-        ):
+        if registry.get(index=int(idx), channels=channel_type.input_channels):
             return idx
-        else:
-            complicated = dict(
-                ChainMap(
-                    *list(
-                        map(
-                            lambda tag: {tag["index"]: tag["name"]},
-                            get_audio_devices(channels=channel_type.input_channels),
-                        )
-                    )
-                )
-            )
-            raise ValueError(f"value should be one of {complicated}")
+        available = {
+            tag["index"]: tag["name"]
+            for tag in registry.devices(channels=channel_type.input_channels)
+        }
+        raise ValueError(f"value should be one of {available}")
 
 
 env = EnvConfig()
@@ -228,6 +299,20 @@ def get_server_url() -> str:
     )
 
 
+def get_server_urls() -> List[str]:
+    """Lists all the backend servers, starting with the one constructed by ``get_server_url``.
+
+    Returns:
+        List[str]:
+        Returns a list of unique server URLs.
+    """
+    urls = [get_server_url()]
+    for url in env.server_urls:
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
 # Startup validation
 _ = get_server_url()
 
@@ -264,9 +349,11 @@ class FileIO(BaseSettings):
     )
 
     speech_wav_file: Union[FilePath, str] = os.path.join(path, "speech-synthesis.wav")
+    filler_wav_file: Union[FilePath, str] = os.path.join(path, "filler.wav")
     base_log_file: Union[FilePath, str] = datetime.now().strftime(
         os.path.join("logs", "jarvis_%d-%m-%Y.log")
     )
+    noise_profile: Union[FilePath, str] = "noise_profile.json"
 
 
 fileio = FileIO()
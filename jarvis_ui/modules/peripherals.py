@@ -1,20 +1,13 @@
 import json
 import platform
+import threading
 from enum import Enum
-from typing import Dict, Iterable, Union
+from typing import Dict, Iterable, List, Union
 
 import pyaudio
 
 from jarvis_ui.modules.exceptions import no_alsa_err
 
-if platform.system() == "Linux":
-    with no_alsa_err():
-        audio_engine = pyaudio.PyAudio()
-else:
-    audio_engine = pyaudio.PyAudio()
-# audio_engine.open(output_device_index=6, output=True, channels=1, format=pyaudio.paInt16, rate=16000)
-_device_range = audio_engine.get_device_count()
-
 
 class ChannelType(str, Enum):
     """Allowed values for channel types.
@@ -30,8 +23,216 @@ class ChannelType(str, Enum):
 channel_type = ChannelType
 
 
+def _engine() -> pyaudio.PyAudio:
+    """Instantiates a new ``PyAudio`` object, suppressing ALSA warnings on Linux.
+
+    Returns:
+        pyaudio.PyAudio:
+        Returns a freshly initialized port audio engine.
+    """
+    if platform.system() == "Linux":
+        with no_alsa_err():
+            return pyaudio.PyAudio()
+    return pyaudio.PyAudio()
+
+
+class DeviceRegistry:
+    """Enumerates audio devices once and caches their capabilities.
+
+    >>> DeviceRegistry
+
+    See Also:
+        - PortAudio only rebuilds its device list when it is re-initialized, so a rescan terminates the engine.
+        - Rescans are skipped while a stream opened through the registry is active, unless forced.
+        - The capture device is tracked by name, so that a stream can be rebound after a USB device is re-plugged.
+    """
+
+    def __init__(self):
+        """Instantiates the registry without touching the audio engine."""
+        self._lock = threading.RLock()
+        self._engine: Union[pyaudio.PyAudio, None] = None
+        self._devices: List[Dict[str, Union[str, int, float]]] = []
+        self._streams: List[pyaudio.Stream] = []
+        self.capture_name: Union[str, None] = None
+        self.capture_index: Union[int, None] = None
+
+    @property
+    def engine(self) -> pyaudio.PyAudio:
+        """Port audio engine shared across the process, initialized on first access."""
+        with self._lock:
+            if self._engine is None:
+                self.rescan(force=True)
+            return self._engine
+
+    def rescan(self, force: bool = False) -> bool:
+        """Re-initializes the audio engine and refreshes the cached devices.
+
+        Args:
+            force: Boolean flag to re-initialize the engine even when streams are open.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the device list has changed.
+        """
+        with self._lock:
+            if self._streams and not force:
+                return False
+            if self._engine is not None:
+                for stream in self._streams:
+                    self._close(stream)
+                self._streams.clear()
+                self._engine.terminate()
+            self._engine = _engine()
+            devices = [
+                self._engine.get_device_info_by_index(device_index=index)
+                for index in range(self._engine.get_device_count())
+            ]
+            before = {device["name"] for device in self._devices}
+            after = {device["name"] for device in devices}
+            self._devices = devices
+        if not before or before == after:
+            return False
+        # Imported within the function, since the logger depends on models which depend on this module
+        from jarvis_ui.logger import logger
+
+        if added := after - before:
+            logger.info("Audio devices added: %s", ", ".join(added))
+        if removed := before - after:
+            logger.warning("Audio devices removed: %s", ", ".join(removed))
+        return True
+
+    def devices(self, channels: str) -> List[Dict[str, Union[str, int, float]]]:
+        """Lists the cached devices that have the requested channel type.
+
+        Args:
+            channels: Takes an argument to determine whether to list input or output devices.
+
+        Returns:
+            List[Dict[str, Union[str, int, float]]]:
+            Returns a list of device information dictionaries.
+        """
+        if self._engine is None:
+            _ = self.engine
+        return [device for device in self._devices if device.get(channels, 0) > 0]
+
+    def get(
+        self, index: int, channels: str
+    ) -> Union[Dict[str, Union[str, int, float]], None]:
+        """Looks up a cached device by its index.
+
+        Args:
+            index: Index of the device.
+            channels: Channel type the device is expected to support.
+
+        Returns:
+            Dict[str, Union[str, int, float]]:
+            Returns the device information if found.
+        """
+        for device in self.devices(channels=channels):
+            if device["index"] == index:
+                return device
+
+    def find(
+        self, name: str, channels: str
+    ) -> Union[Dict[str, Union[str, int, float]], None]:
+        """Looks up a cached device by its name.
+
+        Args:
+            name: Name of the device.
+            channels: Channel type the device is expected to support.
+
+        Returns:
+            Dict[str, Union[str, int, float]]:
+            Returns the device information if found.
+        """
+        for device in self.devices(channels=channels):
+            if device["name"] == name:
+                return device
+
+    def bind(self, index: Union[int, None]) -> None:
+        """Binds the capture device, so it can be located by name after a rescan.
+
+        Args:
+            index: Index of the input device, defaults to the system's default input device.
+        """
+        if index is None:
+            try:
+                device = self.engine.get_default_input_device_info()
+            except OSError:
+                device = None
+        else:
+            device = self.get(index=index, channels=channel_type.input_channels)
+        self.capture_index = index
+        self.capture_name = device["name"] if device else None
+
+    def rebind(self) -> bool:
+        """Rescans the devices and resolves the capture device's new index by its name.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the capture device is available.
+        """
+        self.rescan()
+        if not self.capture_name:
+            return bool(self.devices(channels=channel_type.input_channels))
+        if device := self.find(
+            name=self.capture_name, channels=channel_type.input_channels
+        ):
+            if self.capture_index is not None:
+                self.capture_index = device["index"]
+            return True
+        return False
+
+    def open_stream(self, **kwargs) -> pyaudio.Stream:
+        """Opens a stream on the shared engine and tracks it to defer rescans.
+
+        Keyword Args:
+            Arguments for ``PyAudio.open``
+
+        Returns:
+            pyaudio.Stream:
+            Returns the opened stream.
+        """
+        with self._lock:
+            stream = self.engine.open(**kwargs)
+            self._streams.append(stream)
+            return stream
+
+    def close_stream(self, stream: pyaudio.Stream) -> None:
+        """Closes a stream opened through the registry.
+
+        Args:
+            stream: Stream to be closed.
+        """
+        with self._lock:
+            if stream in self._streams:
+                self._streams.remove(stream)
+            self._close(stream)
+
+    @staticmethod
+    def _close(stream: pyaudio.Stream) -> None:
+        """Closes a stream ignoring errors from a device that has already disappeared."""
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+    def terminate(self) -> None:
+        """Closes all the streams and releases port audio resources."""
+        with self._lock:
+            for stream in self._streams:
+                self._close(stream)
+            self._streams.clear()
+            if self._engine is not None:
+                self._engine.terminate()
+                self._engine = None
+
+
+registry = DeviceRegistry()
+
+
 def get_audio_devices(channels: str) -> Iterable[Dict[str, Union[str, int, float]]]:
-    """Iterates over all devices and yields the device that has input channels.
+    """Iterates over the cached devices and yields the device that has the requested channels.
 
     Args:
         channels: Takes an argument to determine whether to yield input or output channels.
@@ -40,10 +241,7 @@ def get_audio_devices(channels: str) -> Iterable[Dict[str, Union[str, int, float
         Iterable:
         Yields a dictionary with all the input devices available.
     """
-    for index in range(_device_range):
-        device_info = audio_engine.get_device_info_by_index(device_index=index)
-        if device_info.get(channels, 0) > 0:
-            yield device_info
+    yield from registry.devices(channels=channels)
 
 
 if __name__ == "__main__":
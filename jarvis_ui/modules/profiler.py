@@ -0,0 +1,207 @@
+"""On-demand CPU profiles and memory snapshots, for an instance that has been running for a long time.
+
+>>> Profiler
+
+See Also:
+    - ``SIGUSR1`` starts a ``cProfile`` session, and the next one stops it and writes the report into ``logs``.
+    - ``SIGUSR2`` writes the difference in allocations since the previous snapshot into ``logs``.
+    - Signal handlers run on the main thread, which runs the wake word loop and the request path.
+    - Requests, hedges, recognition engines and streamed responses run on worker threads, which ``cProfile`` doesn't
+      follow, so each of their tasks is profiled on its own and merged into the report.
+    - Windows doesn't have these signals, so the files ``logs/profile`` and ``logs/memory`` are used as triggers.
+    - Reports are written on a separate thread, so the wake word loop isn't held up.
+"""
+
+import cProfile
+import os
+import pstats
+import signal
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, List, Union
+
+from jarvis_ui.logger import logger
+
+
+class Profiler:
+    """Toggles profiling sessions and takes memory snapshots without stopping the assistant.
+
+    >>> Profiler
+
+    """
+
+    frames: int = 10
+    limit: int = 50
+
+    def __init__(self, directory: str = "logs"):
+        """Instantiates the profiler.
+
+        Args:
+            directory: Directory to store the reports.
+        """
+        self.directory = directory
+        self.profile: Union[cProfile.Profile, None] = None
+        self.workers: List[cProfile.Profile] = []
+        self.snapshot: Union[tracemalloc.Snapshot, None] = None
+        self.requested = False
+        self._lock = threading.Lock()
+
+    def filename(self, prefix: str, extension: str = "txt") -> str:
+        """Constructs a filename for a report.
+
+        Args:
+            prefix: Type of the report.
+            extension: Extension of the report.
+
+        Returns:
+            str:
+            Returns the path of the report.
+        """
+        return os.path.join(
+            self.directory,
+            f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+        )
+
+    def toggle_profile(self, *args) -> None:
+        """Starts a profiling session on the calling thread, or stops the current one and writes its report."""
+        self.requested = False
+        if self.profile is None:
+            logger.info("Starting profiler on %s", threading.current_thread().name)
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            return
+        with self._lock:
+            profile, self.profile = self.profile, None
+            workers, self.workers = self.workers, []
+        profile.disable()
+        threading.Thread(
+            target=self.write_profile,
+            args=(profile, workers),
+            name="profiler",
+            daemon=True,
+        ).start()
+
+    def run(self, function: Callable, *args, **kwargs) -> Any:
+        """Runs a task on a worker thread, and profiles it while a session is active.
+
+        Args:
+            function: Task to be run.
+            *args: Positional arguments for the task.
+            **kwargs: Keyword arguments for the task.
+
+        Returns:
+            Any:
+            Returns the result of the task.
+
+        See Also:
+            - Tasks that are still running when the session stops are left out of the report.
+        """
+        if (session := self.profile) is None:
+            return function(*args, **kwargs)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                if self.profile is session:
+                    self.workers.append(profile)
+
+    def write_profile(
+        self, profile: cProfile.Profile, workers: List[cProfile.Profile] = ()
+    ) -> None:
+        """Writes the stats sorted by cumulative time, and the raw stats to be loaded with ``pstats`` or ``snakeviz``.
+
+        Args:
+            profile: Profiling session that was stopped.
+            workers: Profiles of the tasks run on worker threads during the session.
+        """
+        filename = self.filename(prefix="profile")
+        with open(filename, "w") as file:
+            stats = pstats.Stats(profile, stream=file)
+            for worker in workers:
+                stats.add(worker)
+            stats.dump_stats(filename.replace(".txt", ".prof"))
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.limit)
+        logger.info(
+            "Profile has been stored in %s, with %d tasks from worker threads",
+            filename,
+            len(workers),
+        )
+
+    def snapshot_memory(self, *args) -> None:
+        """Takes a memory snapshot on a separate thread."""
+        threading.Thread(
+            target=self.write_snapshot, name="profiler", daemon=True
+        ).start()
+
+    @staticmethod
+    def take_snapshot() -> tracemalloc.Snapshot:
+        """Takes a snapshot, excluding the allocations made by ``tracemalloc`` itself."""
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+
+    def write_snapshot(self) -> None:
+        """Writes the difference in allocations since the previous snapshot, tracing starts with the first one."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self.snapshot = self.take_snapshot()
+                logger.info(
+                    "Memory tracing started, next snapshot will be compared to this one"
+                )
+                return
+            snapshot = self.take_snapshot()
+            differences = snapshot.compare_to(self.snapshot, "lineno")
+            self.snapshot = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+            filename = self.filename(prefix="memory")
+            with open(filename, "w") as file:
+                file.write(
+                    f"Traced memory: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB\n\n"
+                )
+                for difference in differences[: self.limit]:
+                    file.write(f"{difference}\n")
+                if differences:
+                    file.write("\nLargest growth:\n")
+                    file.write("\n".join(differences[0].traceback.format()))
+            logger.info("Memory snapshot has been stored in %s", filename)
+
+    def check_triggers(self) -> None:
+        """Looks for trigger files, used where the signals are not available."""
+        if os.path.isfile(trigger := os.path.join(self.directory, "profile")):
+            os.remove(trigger)
+            # Profiling session has to be toggled on the thread that runs the wake word loop
+            self.requested = True
+        if os.path.isfile(trigger := os.path.join(self.directory, "memory")):
+            os.remove(trigger)
+            self.snapshot_memory()
+
+    def install(self) -> bool:
+        """Installs the signal handlers, should be called from the main thread.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the signals are available.
+        """
+        if not hasattr(signal, "SIGUSR1"):
+            logger.info(
+                "Profiler is triggered by creating the files %s and %s",
+                os.path.join(self.directory, "profile"),
+                os.path.join(self.directory, "memory"),
+            )
+            return False
+        signal.signal(signal.SIGUSR1, self.toggle_profile)
+        signal.signal(signal.SIGUSR2, self.snapshot_memory)
+        logger.info(
+            "Profiler is triggered with 'kill -USR1 %d' and 'kill -USR2 %d'",
+            os.getpid(),
+            os.getpid(),
+        )
+        return True
+
+
+profiler = Profiler()
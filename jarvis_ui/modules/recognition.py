@@ -0,0 +1,228 @@
+"""Runs speech recognition engines concurrently on the same audio, and takes the first confident result.
+
+>>> Recognition
+
+See Also:
+    - Engines are named as ``google``, ``sphinx``, ``vosk``, ``whisper`` or a custom one as ``module:function``.
+    - Custom engines receive the captured audio, and return the text or a tuple of the text and its confidence.
+    - A result at or above the confidence threshold is taken right away, and the engines still running are abandoned.
+    - Results without a confidence, or below the threshold, are compared once all the engines have finished.
+    - Winning engine and its lead over the others are recorded as telemetry, a negative lead means a faster engine
+      lost on confidence.
+"""
+
+import importlib
+import json
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import as_completed
+from typing import Callable, Dict, List, Tuple, Union
+
+from speech_recognition import AudioData, Recognizer, RequestError, UnknownValueError
+
+from jarvis_ui.logger import logger
+from jarvis_ui.modules import affinity
+from jarvis_ui.modules.profiler import profiler
+from jarvis_ui.modules.telemetry import telemetry
+
+Result = Tuple[str, Union[float, None]]
+Engine = Callable[[Recognizer, AudioData], Result]
+
+# Recognizers that run locally without a network connection
+LOCAL_ENGINES = dict(
+    sphinx="recognize_sphinx",  # Requires pocketsphinx module
+    whisper="recognize_whisper",  # Requires openai-whisper module
+)
+
+
+def google(recognizer: Recognizer, audio: AudioData) -> Result:
+    """Recognizes speech with Google's speech API, along with the confidence of the top result.
+
+    Args:
+        recognizer: Recognizer object.
+        audio: Captured audio.
+
+    Returns:
+        Result:
+        Returns the recognized text and its confidence.
+    """
+    if not (result := recognizer.recognize_google(audio_data=audio, show_all=True)):
+        raise UnknownValueError()
+    best = result["alternative"][0]
+    return best["transcript"], best.get("confidence")
+
+
+def vosk(recognizer: Recognizer, audio: AudioData) -> Result:
+    """Recognizes speech with Vosk, which returns the recognizer's raw JSON instead of the text.
+
+    Args:
+        recognizer: Recognizer object.
+        audio: Captured audio.
+
+    Returns:
+        Result:
+        Returns the recognized text, Vosk doesn't report a confidence.
+    """
+    result = recognizer.recognize_vosk(audio_data=audio)
+    # Returned in place of the result, when the model is missing from the current directory
+    if result.startswith("Please download the model"):
+        raise RequestError(result)
+    try:
+        text = json.loads(result).get("text")
+    except (json.JSONDecodeError, AttributeError):
+        text = None
+    if not text:
+        raise UnknownValueError()
+    return text, None
+
+
+def load_engine(spec: str) -> Engine:
+    """Loads a recognition engine.
+
+    Args:
+        spec: Name of a built-in engine or a custom one as ``module:function``.
+
+    Returns:
+        Engine:
+        Returns a function that takes the recognizer and the captured audio, and returns the text and its confidence.
+    """
+    if spec == "google":
+        return google
+    if spec == "vosk":
+        return vosk  # Requires vosk module and a model
+    if spec in LOCAL_ENGINES:
+        method = LOCAL_ENGINES[spec]
+
+        def local(recognizer: Recognizer, audio: AudioData) -> Result:
+            """Recognizes speech with a built-in engine, which doesn't report a confidence."""
+            return getattr(recognizer, method)(audio_data=audio), None
+
+        return local
+    module, function = spec.split(":")
+    custom = getattr(importlib.import_module(module), function)
+
+    def engine(recognizer: Recognizer, audio: AudioData) -> Result:
+        """Recognizes speech with a custom engine."""
+        result = custom(audio)
+        return result if isinstance(result, tuple) else (result, None)
+
+    return engine
+
+
+class HedgedRecognizer:
+    """Races the recognition engines against each other.
+
+    >>> HedgedRecognizer
+
+    """
+
+    def __init__(self, specs: List[str], threshold: float, timeout: float = 10):
+        """Loads the engines.
+
+        Args:
+            specs: Engines to race.
+            threshold: Confidence at which a result is taken without waiting for the other engines.
+            timeout: Seconds to wait for the engines.
+        """
+        # Names are restricted to be safe as metric names
+        self.engines: Dict[str, Engine] = {
+            re.sub(r"[^\w.-]", "_", spec): load_engine(spec) for spec in specs
+        }
+        self.threshold = threshold
+        self.timeout = timeout
+        # Abandoned engines keep their workers until they return, so there is room for a second round
+        self.executor = ThreadPoolExecutor(
+            max_workers=2 * len(self.engines),
+            thread_name_prefix="recognizer",
+            initializer=affinity.apply,
+            initargs=("background",),
+        )
+
+    @staticmethod
+    def run(
+        name: str, engine: Engine, recognizer: Recognizer, audio: AudioData
+    ) -> Union[Result, None]:
+        """Runs an engine, and records its latency and failures.
+
+        Args:
+            name: Name of the engine.
+            engine: Engine to run.
+            recognizer: Recognizer object.
+            audio: Captured audio.
+
+        Returns:
+            Result:
+            Returns the recognized text and its confidence, if the engine succeeded.
+        """
+        start = time.perf_counter()
+        try:
+            text, confidence = engine(recognizer, audio)
+        # Engines raise their own errors
+        except Exception as error:
+            logger.debug("%s: %s", name, error)
+            telemetry.increment(f"recognition.{name}.failures")
+            return
+        finally:
+            telemetry.observe(
+                f"recognition.{name}.latency", time.perf_counter() - start
+            )
+        if not text:
+            return
+        return text, confidence
+
+    def recognize(self, recognizer: Recognizer, audio: AudioData) -> Union[str, None]:
+        """Recognizes the audio with all the engines, and takes the first confident result.
+
+        Args:
+            recognizer: Recognizer object.
+            audio: Captured audio.
+
+        Returns:
+            str:
+            Returns the recognized text, if any engine succeeded.
+        """
+        futures: Dict[Future, str] = {
+            self.executor.submit(
+                profiler.run, self.run, name, engine, recognizer, audio
+            ): name
+            for name, engine in self.engines.items()
+        }
+        finished: Dict[str, float] = {}
+        best: Union[Tuple[float, str, str], None] = None
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                name = futures[future]
+                finished[name] = time.perf_counter()
+                if (result := future.result()) is None:
+                    continue
+                text, confidence = result
+                if confidence is not None and confidence >= self.threshold:
+                    best = confidence, name, text
+                    break
+                if best is None or (confidence or 0) > best[0]:
+                    best = confidence or 0, name, text
+        except FutureTimeout:
+            logger.warning("Speech recognition timed out after %ds", self.timeout)
+        if best is None:
+            for future in futures:
+                future.cancel()
+            return
+        confidence, winner, text = best
+        won_at = finished[winner]
+        telemetry.increment(f"recognition.winner.{winner}")
+        for future, name in futures.items():
+            if name == winner:
+                continue
+            if name in finished:
+                telemetry.observe("recognition.margin", finished[name] - won_at)
+            elif not future.cancel():
+                # Lead over an abandoned engine is known once it returns
+                future.add_done_callback(
+                    lambda _: telemetry.observe(
+                        "recognition.margin", time.perf_counter() - won_at
+                    )
+                )
+        logger.info("Recognized by %s [confidence: %s]", winner, confidence)
+        return text
@@ -0,0 +1,257 @@
+"""Records interactions into a compact binary session log, to be replayed with ``replay.py``.
+
+>>> Recorder
+
+See Also:
+    - Each record has a fixed header with its type, wall clock time and length, followed by the payload.
+    - Audio records carry the sample rate, sample width and channels, followed by the raw PCM data.
+    - Frames heard before each wake word detection are kept in a bounded pre-roll buffer, and stored with the detection.
+    - Records of a follow up are held back until it is heard, so silent follow up windows don't show up as interactions.
+    - Session logs are rotated when they exceed their share of the size budget, and the oldest ones are removed.
+"""
+
+import glob
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from enum import IntEnum
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Tuple, Union
+
+HEADER = struct.Struct("<BdI")
+AUDIO = struct.Struct("<IHHh")
+
+
+class RecordType(IntEnum):
+    """Types of records in a session log.
+
+    >>> RecordType
+
+    """
+
+    session: int = 0
+    wake: int = 1
+    utterance: int = 2
+    text: int = 3
+    request: int = 4
+    response: int = 5
+    playback: int = 6
+    decision: int = 7
+
+
+AUDIO_RECORDS = (RecordType.wake, RecordType.utterance)
+
+
+def read(path: str) -> Iterator[Tuple[RecordType, float, Dict[str, Any]]]:
+    """Reads the records from a session log.
+
+    Args:
+        path: Path of the session log.
+
+    Yields:
+        Tuple[RecordType, float, Dict[str, Any]]:
+        Yields the type, timestamp and the decoded payload of each record.
+    """
+    with open(path, "rb") as file:
+        while header := file.read(HEADER.size):
+            if len(header) < HEADER.size:
+                return  # Truncated by a crash
+            record_type, timestamp, length = HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+            record_type = RecordType(record_type)
+            if record_type in AUDIO_RECORDS:
+                offset = AUDIO.size
+                sample_rate, sample_width, channels, keyword = AUDIO.unpack_from(
+                    payload
+                )
+                yield record_type, timestamp, dict(
+                    sample_rate=sample_rate,
+                    sample_width=sample_width,
+                    channels=channels,
+                    keyword=keyword,
+                    audio=payload[offset:],
+                )
+            else:
+                yield record_type, timestamp, json.loads(payload)
+
+
+class Recorder:
+    """Writes session logs within a bounded size.
+
+    >>> Recorder
+
+    """
+
+    files: int = 4
+    pre_roll: float = 1.5
+
+    def __init__(self, directory: str = os.path.join("logs", "sessions")):
+        """Instantiates the recorder in disabled state.
+
+        Args:
+            directory: Directory to store the session logs.
+        """
+        self.directory = directory
+        self.max_bytes = 0
+        self.header = 0
+        self.sample_rate = 0
+        self.frames: Deque[bytes] = deque(maxlen=0)
+        self.metadata: Dict[str, Any] = {}
+        self.file: Union[BinaryIO, None] = None
+        self.held: Union[List[Tuple[RecordType, float, bytes]], None] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Checks if the recorder has been started."""
+        return self.file is not None
+
+    def start(self, size: int, sample_rate: int, frame_length: int, **metadata) -> None:
+        """Starts recording into a new session log.
+
+        Args:
+            size: Size budget in bytes for all the session logs.
+            sample_rate: Sample rate of the frames fed to the wake word detector.
+            frame_length: Number of samples in each frame.
+            **metadata: Settings stored at the beginning of the session log.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = size // self.files
+        self.sample_rate = sample_rate
+        self.frames = deque(maxlen=int(self.pre_roll * sample_rate / frame_length))
+        self.metadata = dict(
+            metadata, sample_rate=sample_rate, frame_length=frame_length
+        )
+        with self._lock:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        """Opens a new session log and removes the oldest ones beyond the limit."""
+        if self.file:
+            self.file.close()
+        filename = os.path.join(
+            self.directory, f"session_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.bin"
+        )
+        self.file = open(filename, "wb")
+        for stale in sorted(
+            glob.glob(os.path.join(self.directory, "session_*.bin")),
+            key=os.path.getmtime,
+        )[: -self.files]:
+            os.remove(stale)
+        self._write(
+            RecordType.session, json.dumps(self.metadata).encode(), rotate=False
+        )
+        self.header = self.file.tell()
+
+    def _write(
+        self,
+        record_type: RecordType,
+        payload: bytes,
+        rotate: bool = True,
+        timestamp: float = None,
+    ) -> None:
+        """Writes a record, rotating the session log when it exceeds its size.
+
+        Args:
+            record_type: Type of the record.
+            payload: Encoded payload.
+            rotate: Boolean flag to allow rotating the session log.
+            timestamp: Time at which the record was made, defaults to now.
+        """
+        if self.held is not None:
+            self.held.append((record_type, time.time(), payload))
+            return
+        position = self.file.tell()
+        # A record larger than the limit is still written, instead of leaving a session log with just its header
+        if (
+            rotate
+            and position > self.header
+            and position + HEADER.size + len(payload) > self.max_bytes
+        ):
+            self._rotate()
+        self.file.write(
+            HEADER.pack(record_type, timestamp or time.time(), len(payload))
+        )
+        self.file.write(payload)
+        self.file.flush()
+
+    def frame(self, frame: bytes) -> None:
+        """Adds a frame to the pre-roll buffer.
+
+        Args:
+            frame: Frame read from the audio stream.
+        """
+        self.frames.append(frame)
+
+    def wake(self, keyword: int) -> None:
+        """Records the frames heard before a wake word was detected, followed by the records held back.
+
+        Args:
+            keyword: Index of the wake word detected, or ``-1`` for a follow up.
+        """
+        if not self.enabled:
+            return
+        audio = b"".join(self.frames)
+        self.frames.clear()
+        with self._lock:
+            held, self.held = self.held or [], None
+            self._write(
+                RecordType.wake, AUDIO.pack(self.sample_rate, 2, 1, keyword) + audio
+            )
+            for record_type, timestamp, payload in held:
+                self._write(record_type, payload, timestamp=timestamp)
+
+    def hold(self) -> None:
+        """Holds back the records that follow, until a wake is recorded or they are discarded."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.held = []
+
+    def discard(self) -> None:
+        """Discards the records held back."""
+        with self._lock:
+            self.held = None
+
+    def utterance(self, audio: bytes, sample_rate: int, sample_width: int) -> None:
+        """Records the audio captured by the listener.
+
+        Args:
+            audio: Raw PCM data.
+            sample_rate: Sample rate of the audio.
+            sample_width: Number of bytes per sample.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._write(
+                RecordType.utterance,
+                AUDIO.pack(sample_rate, sample_width, 1, -1) + audio,
+            )
+
+    def event(self, record_type: RecordType, **data) -> None:
+        """Records an event.
+
+        Args:
+            record_type: Type of the record.
+            **data: Data to be stored as JSON.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._write(record_type, json.dumps(data, default=str).encode())
+
+    def close(self) -> None:
+        """Closes the current session log."""
+        with self._lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+recorder = Recorder()
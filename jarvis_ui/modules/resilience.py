@@ -0,0 +1,241 @@
+"""Retry and circuit breaker policies for calls made to the server.
+
+>>> Resilience
+
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Iterable, Union
+
+from jarvis_ui.modules.telemetry import telemetry
+
+
+class BreakerState(str, Enum):
+    """Allowed states for a circuit breaker.
+
+    >>> BreakerState
+
+    """
+
+    closed: str = "closed"
+    open: str = "open"
+    half_open: str = "half_open"
+
+
+class CircuitBreaker:
+    """Fails fast while the server is down, and lets a single probe through once the reset timeout has passed.
+
+    >>> CircuitBreaker
+
+    See Also:
+        - ``closed``: Calls go through, consecutive failures are counted.
+        - ``open``: Calls fail immediately, until the reset timeout has passed since the breaker was opened.
+        - ``half_open``: A single probe is allowed, success closes the breaker and failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: int = 30):
+        """Instantiates the breaker in closed state.
+
+        Args:
+            name: Name of the breaker, used for metrics.
+            failure_threshold: Consecutive failures to open the breaker.
+            reset_timeout: Seconds to wait before allowing a probe.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Union[float, None] = None
+        self.probing = False
+        self._state = BreakerState.closed
+        self._lock = threading.Lock()
+        telemetry.gauge(f"breaker.{self.name}.state", self._state.value)
+
+    def _transition(self, state: BreakerState) -> None:
+        """Moves the breaker to a new state and records the transition."""
+        if state == self._state:
+            return
+        self._state = state
+        telemetry.gauge(f"breaker.{self.name}.state", state.value)
+        telemetry.increment(f"breaker.{self.name}.{state.value}")
+
+    @property
+    def state(self) -> BreakerState:
+        """Current state of the breaker, moving to half open once the reset timeout has passed."""
+        with self._lock:
+            if (
+                self._state == BreakerState.open
+                and time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                self._transition(BreakerState.half_open)
+            return self._state
+
+    def allow(self) -> bool:
+        """Checks if a call is allowed to go through.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the call may proceed.
+        """
+        state = self.state
+        with self._lock:
+            if state == BreakerState.closed:
+                return True
+            if state == BreakerState.half_open and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def success(self) -> None:
+        """Records a successful call and closes the breaker."""
+        with self._lock:
+            self.failures = 0
+            self.probing = False
+            self._transition(BreakerState.closed)
+
+    def failure(self) -> None:
+        """Records a failed call and opens the breaker when the threshold is reached, or when a probe fails."""
+        with self._lock:
+            self.failures += 1
+            if self._state == BreakerState.half_open or (
+                self.failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self.probing = False
+                self._transition(BreakerState.open)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff bounded by a deadline.
+
+    >>> RetryPolicy
+
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base: float = 0.25,
+        cap: float = 4,
+        deadline: float = 30,
+    ):
+        """Instantiates the policy.
+
+        Args:
+            attempts: Maximum number of attempts, including the first one.
+            base: Backoff in seconds for the first retry.
+            cap: Maximum backoff in seconds.
+            deadline: Seconds within which all the attempts should complete.
+        """
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Computes the delay before the next attempt, using full jitter.
+
+        Args:
+            attempt: Number of attempts made so far.
+
+        Returns:
+            float:
+            Returns the delay in seconds.
+        """
+        return random.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+
+class RestartBudget:
+    """Exponential backoff between restarts, and a limit on the number of restarts within a window.
+
+    >>> RestartBudget
+
+    See Also:
+        - Restarts are timestamped with the wall clock, so the history can be carried across ``os.execv`` in an env var.
+        - Backoff doubles with every restart within the window, and resets once the window is clear of restarts.
+        - Running out of the budget is a crash loop, in which restarting doesn't help.
+    """
+
+    variable: str = "JARVIS_UI_RESTARTS"
+
+    def __init__(
+        self,
+        budget: int = 5,
+        window: float = 600,
+        base: float = 2,
+        cap: float = 120,
+        history: Iterable[float] = (),
+    ):
+        """Instantiates the budget.
+
+        Args:
+            budget: Maximum number of restarts within the window.
+            window: Seconds over which the restarts are counted.
+            base: Backoff in seconds for the first restart.
+            cap: Maximum backoff in seconds.
+            history: Timestamps of the previous restarts.
+        """
+        self.budget = budget
+        self.window = window
+        self.base = base
+        self.cap = cap
+        self.history = deque(history)
+
+    @property
+    def recent(self) -> int:
+        """Number of restarts within the window."""
+        while self.history and self.history[0] < time.time() - self.window:
+            self.history.popleft()
+        return len(self.history)
+
+    def allow(self) -> bool:
+        """Checks if a restart is within the budget.
+
+        Returns:
+            bool:
+            Returns a boolean flag to indicate whether the restart may proceed.
+        """
+        return self.recent < self.budget
+
+    def record(self) -> float:
+        """Records a restart and computes the backoff before it.
+
+        Returns:
+            float:
+            Returns the delay in seconds.
+        """
+        delay = min(self.cap, self.base * 2**self.recent)
+        self.history.append(time.time() + delay)
+        return delay
+
+    @property
+    def last(self) -> Union[float, None]:
+        """Timestamp of the most recent restart."""
+        return self.history[-1] if self.history else None
+
+    def save_env(self) -> None:
+        """Stores the history in an env var, to be inherited across ``os.execv``."""
+        os.environ[self.variable] = ",".join(f"{value:.3f}" for value in self.history)
+
+    @classmethod
+    def load_env(cls, **kwargs) -> "RestartBudget":
+        """Instantiates the budget with the history stored in the env var.
+
+        Args:
+            **kwargs: Arguments for the budget.
+
+        Returns:
+            RestartBudget:
+            Returns the budget with the previous restarts.
+        """
+        history = [
+            float(value)
+            for value in os.environ.get(cls.variable, "").split(",")
+            if value
+        ]
+        return cls(history=history, **kwargs)
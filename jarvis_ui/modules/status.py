@@ -0,0 +1,235 @@
+"""Fixed layout status block in shared memory, shared between the main and the child process.
+
+>>> Status
+
+See Also:
+    - Replaces the manager process, so a read or write is a memory access instead of a socket round trip.
+    - Writes are guarded by a sequence counter, which is odd while a write is in progress.
+    - Readers retry until the counter is even and unchanged across the read, so they never take a lock.
+    - Writers are serialized with a thread lock within the process, the processes take turns as writers.
+    - The block has a well known name, so any process on the host can read it with ``jarvis_ui status``.
+"""
+
+import os
+import struct
+import threading
+import time
+from enum import IntEnum, IntFlag
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Union
+
+NAME = "jarvis_ui_status"
+VERSION = 1
+
+SEQUENCE = struct.Struct("<Q")
+LAYOUT = struct.Struct("<IiBBBxdddddQQQQ")
+PAYLOAD = slice(SEQUENCE.size, SEQUENCE.size + LAYOUT.size)
+FIELDS = (
+    "version",
+    "pid",
+    "lock",
+    "phase",
+    "flags",
+    "started",
+    "updated",
+    "last_wake",
+    "last_request",
+    "last_response",
+    "wakes",
+    "requests",
+    "failures",
+    "restarts",
+)
+TIMESTAMPS = ("started", "updated", "last_wake", "last_request", "last_response")
+COUNTERS = ("wakes", "requests", "failures", "restarts")
+
+
+class LockState(IntEnum):
+    """Lock states for the restart lock.
+
+    >>> LockState
+
+    """
+
+    unlocked: int = 0
+    locked: int = 1
+    restart: int = 2
+
+
+class Phase(IntEnum):
+    """Phases of an interaction.
+
+    >>> Phase
+
+    """
+
+    starting: int = 0
+    idle: int = 1
+    listening: int = 2
+    processing: int = 3
+    speaking: int = 4
+    restarting: int = 5
+    stopped: int = 6
+
+
+class Flag(IntFlag):
+    """Bits in the flags field.
+
+    >>> Flag
+
+    """
+
+    degraded: int = 1
+
+
+class StatusBlock:
+    """Reads and writes the status block in shared memory.
+
+    >>> StatusBlock
+
+    """
+
+    def __init__(self):
+        """Instantiates the object without a shared memory segment."""
+        self._memory: Union[shared_memory.SharedMemory, None] = None
+        self._lock = threading.Lock()
+
+    @property
+    def attached(self) -> bool:
+        """Checks if the block is backed by a shared memory segment."""
+        return self._memory is not None
+
+    @property
+    def name(self) -> Union[str, None]:
+        """Name of the shared memory segment."""
+        return self._memory.name if self._memory else None
+
+    def create(self, name: str = NAME) -> None:
+        """Creates the shared memory segment, reusing the one left behind by a previous run.
+
+        Args:
+            name: Name of the shared memory segment.
+        """
+        try:
+            self._memory = shared_memory.SharedMemory(
+                name=name, create=True, size=PAYLOAD.stop
+            )
+            self._untrack()
+        except FileExistsError:
+            self.attach(name=name)
+        values = dict.fromkeys(FIELDS, 0)
+        values.update(version=VERSION, pid=os.getpid(), started=time.time())
+        with self._lock:
+            self._write(values)
+
+    def attach(self, name: str = NAME) -> None:
+        """Attaches to an existing shared memory segment.
+
+        Args:
+            name: Name of the shared memory segment.
+
+        Raises:
+            FileNotFoundError:
+            If the segment doesn't exist.
+        """
+        self._memory = shared_memory.SharedMemory(name=name)
+        self._untrack()
+
+    def _untrack(self) -> None:
+        """Stops the resource tracker from removing the segment when a process exits.
+
+        See Also:
+            - Tracker would remove the segment when a reader exits, or when the process restarts itself on Linux.
+            - Segment is removed explicitly on exit, and a segment left behind by a crash is reused on next start.
+        """
+        if os.name == "nt":
+            return  # Windows releases the segment with its last handle
+        resource_tracker.unregister(self._memory._name, "shared_memory")  # noqa
+
+    def _payload(self) -> Dict[str, Union[int, float]]:
+        """Unpacks the payload without checking the sequence counter."""
+        return dict(zip(FIELDS, LAYOUT.unpack_from(self._memory.buf, SEQUENCE.size)))
+
+    def _write(self, values: Dict[str, Union[int, float]]) -> None:
+        """Writes the payload, guarded by the sequence counter.
+
+        Args:
+            values: All the fields in the payload.
+        """
+        (sequence,) = SEQUENCE.unpack_from(self._memory.buf, 0)
+        SEQUENCE.pack_into(self._memory.buf, 0, sequence + 1)
+        LAYOUT.pack_into(
+            self._memory.buf, SEQUENCE.size, *(values[field] for field in FIELDS)
+        )
+        SEQUENCE.pack_into(self._memory.buf, 0, sequence + 2)
+
+    def read(self) -> Dict[str, Union[int, float]]:
+        """Reads a consistent copy of the block without taking a lock.
+
+        Returns:
+            Dict[str, Union[int, float]]:
+            Returns all the fields in the block.
+        """
+        buffer = self._memory.buf
+        while True:
+            (before,) = SEQUENCE.unpack_from(buffer, 0)
+            if before % 2:
+                time.sleep(0)  # Yields to the writer
+                continue
+            payload = bytes(buffer[PAYLOAD])
+            (after,) = SEQUENCE.unpack_from(buffer, 0)
+            if before == after:
+                return dict(zip(FIELDS, LAYOUT.unpack(payload)))
+
+    def update(
+        self, counter: str = None, timestamp: str = None, **values: Union[int, float]
+    ) -> None:
+        """Updates the fields in the block, ignored when not attached.
+
+        Args:
+            counter: Name of the counter to be incremented.
+            timestamp: Name of the timestamp to be set to the current time.
+            **values: Fields to be updated.
+        """
+        if not self._memory:
+            return
+        with self._lock:
+            current = self._payload()
+            current.update(values, updated=time.time())
+            if counter:
+                current[counter] += 1
+            if timestamp:
+                current[timestamp] = current["updated"]
+            self._write(current)
+
+    @property
+    def lock(self) -> LockState:
+        """Current state of the restart lock."""
+        return LockState(self.read()["lock"])
+
+    @property
+    def degraded(self) -> bool:
+        """Checks if the restarts have been given up on, while the server is unavailable."""
+        return bool(self._memory and self.read()["flags"] & Flag.degraded)
+
+    def close(self, unlink: bool = False) -> None:
+        """Detaches from the shared memory segment.
+
+        Args:
+            unlink: Boolean flag to remove the segment as well.
+        """
+        if not self._memory:
+            return
+        self._memory.close()
+        if unlink:
+            if os.name != "nt":
+                # Unlinking unregisters the segment, which was untracked when attached
+                resource_tracker.register(self._memory._name, "shared_memory")  # noqa
+            try:
+                self._memory.unlink()
+            except FileNotFoundError:
+                pass
+        self._memory = None
+
+
+status = StatusBlock()
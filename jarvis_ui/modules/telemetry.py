@@ -0,0 +1,166 @@
+"""In-process metrics shared across modules.
+
+>>> Telemetry
+
+"""
+
+import json
+import math
+import threading
+from collections import deque
+from typing import Dict, Union
+
+
+class Histogram:
+    """Keeps the summary and a bounded window of recent observations for a metric.
+
+    >>> Histogram
+
+    """
+
+    def __init__(self, size: int = 1_024):
+        """Instantiates the histogram.
+
+        Args:
+            size: Number of recent observations to retain for percentiles.
+        """
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.samples = deque(maxlen=size)
+
+    def observe(self, value: float) -> None:
+        """Records an observation.
+
+        Args:
+            value: Value to be recorded.
+        """
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> Union[float, None]:
+        """Computes a percentile over the recent observations.
+
+        Args:
+            q: Percentile to compute, between 0 and 100.
+
+        Returns:
+            float:
+            Returns the value at the percentile, if any observations are available.
+        """
+        if not self.samples:
+            return
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def summary(self) -> Dict[str, Union[int, float, None]]:
+        """Summarizes the histogram.
+
+        Returns:
+            Dict[str, Union[int, float, None]]:
+            Returns the count, mean, extremes and common percentiles.
+        """
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "min": round(self.minimum, 4),
+            "max": round(self.maximum, 4),
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+        }
+
+
+class Telemetry:
+    """Thread safe store for counters, gauges and histograms.
+
+    >>> Telemetry
+
+    """
+
+    def __init__(self):
+        """Instantiates empty metric stores."""
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Union[int, float]] = {}
+        self.gauges: Dict[str, Union[int, float, str]] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: Union[int, float] = 1) -> None:
+        """Increments a counter.
+
+        Args:
+            name: Name of the counter.
+            value: Value to increment by.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: Union[int, float, str]) -> None:
+        """Sets a gauge to the current value.
+
+        Args:
+            name: Name of the gauge.
+            value: Current value.
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Records an observation in a histogram.
+
+        Args:
+            name: Name of the histogram.
+            value: Value to be recorded.
+        """
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    def histogram(self, name: str) -> Union[Histogram, None]:
+        """Gets a histogram by its name.
+
+        Args:
+            name: Name of the histogram.
+
+        Returns:
+            Histogram:
+            Returns the histogram if any observations were recorded.
+        """
+        return self.histograms.get(name)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Takes a snapshot of all the metrics.
+
+        Returns:
+            Dict[str, dict]:
+            Returns the counters, gauges and histogram summaries.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {
+                    name: histogram.summary()
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def dump(self, filename: str) -> None:
+        """Writes a snapshot of all the metrics into a JSON file.
+
+        Args:
+            filename: Name of the file.
+        """
+        with open(filename, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+            file.flush()
+
+
+telemetry = Telemetry()
@@ -1,54 +1,244 @@
-from threading import Timer
-from typing import Any, Callable, Dict, Tuple
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple, Union
 
+from jarvis_ui.logger import logger
+from jarvis_ui.modules.telemetry import telemetry
 
-class RepeatedTimer:
-    """Instantiates RepeatedTimer object to kick off the threading.Timer object with custom intervals.
 
-    >>> RepeatedTimer
+class Job:
+    """Instantiates Job object to hold a function that has to be triggered at a fixed interval.
+
+    >>> Job
 
     """
 
     def __init__(
         self,
-        interval: int,
+        name: str,
+        interval: Union[int, float],
         function: Callable,
         args: Tuple = None,
         kwargs: Dict[str, Any] = None,
+        jitter: Union[int, float] = 0,
+        timeout: Union[int, float, None] = None,
     ):
-        """Repeats the ``Timer`` object from threading.
+        """Holds the function and its schedule.
 
         Args:
+            name: Name of the job, used for logging and metrics.
             interval: Interval in seconds.
             function: Function to trigger with intervals.
             args: Arguments for the function.
             kwargs: Keyword arguments for the function.
+            jitter: Maximum seconds by which each run is randomly shifted, without shifting the schedule itself.
+            timeout: Seconds after which a run is reported as timed out.
         """
-        self._timer = None
+        self.name = name
         self.interval = interval
         self.function = function
         self.args = args or ()
         self.kwargs = kwargs or {}
-        self.is_running = False
-
-    def _run(self):
-        """Triggers the target function."""
-        self.is_running = False
-        self.start()
-        self.function(*self.args, **self.kwargs)
-
-    def start(self):
-        """Trigger target function if timer isn't running already."""
-        if not self.is_running:
-            self._timer = Timer(self.interval, self._run)
-            self._timer.start()
-            self.is_running = True
-
-    def stop(self):
-        """Stop the timer and cancel all futures."""
-        self._timer.cancel()
-        self.is_running = False
-
-    def cancel(self):
-        """Initiate cancellation."""
-        self.stop()
+        self.jitter = jitter
+        self.timeout = timeout
+        self.planned = time.monotonic() + interval
+        self.due = self.planned
+        self.future: Union[Future, None] = None
+        self.started: Union[float, None] = None
+        self.timed_out = False
+
+    def reschedule(self, now: float) -> None:
+        """Moves the job to its next slot on the fixed grid, skipping the slots that were missed.
+
+        Args:
+            now: Current monotonic time.
+        """
+        self.planned += self.interval
+        if self.planned <= now:
+            self.planned += (
+                math.ceil((now - self.planned) / self.interval) * self.interval
+            )
+        self.due = self.planned + random.uniform(-self.jitter, self.jitter)
+
+    def run(self) -> None:
+        """Triggers the target function and records its duration."""
+        start = time.monotonic()
+        try:
+            self.function(*self.args, **self.kwargs)
+        # Errors shouldn't stop the scheduler
+        except Exception as error:
+            telemetry.increment(f"scheduler.{self.name}.failures")
+            logger.error("Job %r failed: %s", self.name, error)
+        finally:
+            telemetry.increment(f"scheduler.{self.name}.runs")
+            telemetry.observe(
+                f"scheduler.{self.name}.duration", time.monotonic() - start
+            )
+
+
+class Scheduler:
+    """Instantiates Scheduler object to trigger all the recurring jobs from a single thread.
+
+    >>> Scheduler
+
+    See Also:
+        - Jobs are kept in a heap ordered by their next run time, which is based on a monotonic clock.
+        - Runs are planned on a fixed grid from the start time, so a slow run doesn't push the following runs.
+        - A job is never run concurrently with itself, a slot that comes up while it's still running is skipped.
+        - Runs are executed on a fixed pool of workers, so a slow job doesn't delay other jobs.
+        - Python threads cannot be killed, so a run that exceeds its timeout is reported and left to finish.
+    """
+
+    def __init__(self, workers: int = 2):
+        """Instantiates the scheduler.
+
+        Args:
+            workers: Number of threads to run the jobs.
+        """
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = workers
+        self._executor: Union[ThreadPoolExecutor, None] = None
+        self._thread: Union[threading.Thread, None] = None
+        self._running = False
+
+    @property
+    def jobs(self) -> List[Job]:
+        """List of scheduled jobs."""
+        with self._condition:
+            return [job for _, _, job in self._heap]
+
+    def add(
+        self,
+        name: str,
+        interval: Union[int, float],
+        function: Callable,
+        args: Tuple = None,
+        kwargs: Dict[str, Any] = None,
+        jitter: Union[int, float] = 0,
+        timeout: Union[int, float, None] = None,
+    ) -> Job:
+        """Adds a recurring job to the scheduler.
+
+        Args:
+            name: Name of the job, used for logging and metrics.
+            interval: Interval in seconds.
+            function: Function to trigger with intervals.
+            args: Arguments for the function.
+            kwargs: Keyword arguments for the function.
+            jitter: Maximum seconds by which each run is randomly shifted, without shifting the schedule itself.
+            timeout: Seconds after which a run is reported as timed out.
+
+        Returns:
+            Job:
+            Returns the job that was scheduled.
+        """
+        job = Job(
+            name=name,
+            interval=interval,
+            function=function,
+            args=args,
+            kwargs=kwargs,
+            jitter=jitter,
+            timeout=timeout,
+        )
+        with self._condition:
+            heapq.heappush(self._heap, (job.due, next(self._counter), job))
+            self._condition.notify()
+        return job
+
+    def remove(self, name: str) -> None:
+        """Removes a job from the scheduler.
+
+        Args:
+            name: Name of the job.
+        """
+        with self._condition:
+            self._heap = [entry for entry in self._heap if entry[2].name != name]
+            heapq.heapify(self._heap)
+
+    def start(self) -> None:
+        """Starts the scheduler thread if it isn't running already."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="scheduler"
+            )
+            self._thread = threading.Thread(
+                target=self._loop, name="scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the scheduler and cancels the runs that haven't started."""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=1)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _check_timeouts(self, now: float) -> Union[float, None]:
+        """Reports runs that exceeded their timeout.
+
+        Args:
+            now: Current monotonic time.
+
+        Returns:
+            float:
+            Returns the nearest timeout deadline among the runs in progress.
+        """
+        nearest = None
+        for _, _, job in self._heap:
+            if not job.timeout or not job.future or job.future.done() or job.timed_out:
+                continue
+            deadline = job.started + job.timeout
+            if now >= deadline:
+                job.timed_out = True
+                telemetry.increment(f"scheduler.{job.name}.timeouts")
+                logger.warning(
+                    "Job %r has been running for more than %s seconds",
+                    job.name,
+                    job.timeout,
+                )
+            elif nearest is None or deadline < nearest:
+                nearest = deadline
+        return nearest
+
+    def _loop(self) -> None:
+        """Waits for the next due job and dispatches it to the workers."""
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                deadline = self._check_timeouts(now)
+                if not self._heap:
+                    self._condition.wait(
+                        timeout=None if deadline is None else deadline - now
+                    )
+                    continue
+                due, _, job = self._heap[0]
+                if due > now:
+                    wait = due - now if deadline is None else min(due, deadline) - now
+                    self._condition.wait(timeout=wait)
+                    continue
+                heapq.heappop(self._heap)
+                if job.future and not job.future.done():
+                    telemetry.increment(f"scheduler.{job.name}.skipped")
+                else:
+                    job.started = now
+                    job.timed_out = False
+                    job.future = self._executor.submit(job.run)
+                job.reschedule(now)
+                heapq.heappush(self._heap, (job.due, next(self._counter), job))
+
+
+scheduler = Scheduler()
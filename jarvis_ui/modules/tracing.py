@@ -0,0 +1,232 @@
+"""Propagates a trace ID for each interaction, and breaks down the time taken by each request to the server.
+
+>>> Tracing
+
+See Also:
+    - Each request carries a W3C ``traceparent`` header, with the trace ID of the interaction and a span ID of its own.
+    - Trace ID is held in a context variable, so it has to be copied along with the context to the worker threads.
+    - Connections are timed for DNS, TCP connect and TLS handshake, reused connections skip these phases.
+    - ``Server-Timing`` headers are parsed when the server sends them, to tell the server's work from the network.
+
+References:
+    - `Trace Context <https://www.w3.org/TR/trace-context/>`__
+    - `Server Timing <https://www.w3.org/TR/server-timing/>`__
+"""
+
+import re
+import secrets
+import socket
+import time
+from contextvars import ContextVar
+from typing import Dict, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from jarvis_ui.logger import logger
+from jarvis_ui.modules.telemetry import telemetry
+
+trace_id: ContextVar[Union[str, None]] = ContextVar("trace_id", default=None)
+phases: ContextVar[Union[Dict[str, float], None]] = ContextVar("phases", default=None)
+
+
+def start_trace() -> str:
+    """Starts a new trace for an interaction, in the current context.
+
+    Returns:
+        str:
+        Returns the trace ID.
+    """
+    trace = secrets.token_hex(16)
+    trace_id.set(trace)
+    return trace
+
+
+def traceparent() -> str:
+    """Builds the ``traceparent`` header for a request, requests outside an interaction get a trace of their own.
+
+    Returns:
+        str:
+        Returns the header value with the version, trace ID, a new span ID and the sampled flag.
+    """
+    return f"00-{trace_id.get() or secrets.token_hex(16)}-{secrets.token_hex(8)}-01"
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Parses the ``Server-Timing`` header.
+
+    Args:
+        header: Value of the header, like ``db;dur=53, app;desc="Render";dur=47.2``
+
+    Returns:
+        Dict[str, float]:
+        Returns the duration in seconds for each metric that has one.
+    """
+    timings = {}
+    for metric in header.split(","):
+        name, *params = [part.strip() for part in metric.split(";")]
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() != "dur":
+                continue
+            try:
+                # Restricted to be safe as a metric name
+                timings[re.sub(r"[^\w.-]", "_", name)] = float(value.strip('" ')) / 1e3
+            except ValueError:
+                pass
+    return timings
+
+
+class TimedConnection:
+    """Records the time taken to resolve, connect and set up TLS, into the phases of the current request.
+
+    >>> TimedConnection
+
+    """
+
+    def _new_conn(self) -> socket.socket:
+        """Resolves the host before connecting, so that the resolution is timed on its own.
+
+        Returns:
+            socket.socket:
+            Returns the connected socket.
+        """
+        if (current := phases.get()) is None:
+            return super()._new_conn()
+        dns_host = self._dns_host
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(dns_host, self.port, type=socket.SOCK_STREAM)[
+                0
+            ][4][0]
+        except (OSError, IndexError):
+            # Fails the same way it would have, without the timing
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        current["dns"] = resolved - start
+        self._dns_host = address
+        try:
+            sock = super()._new_conn()
+        except NewConnectionError:
+            # Falls back to trying every address of the host, like an untimed connection would
+            self._dns_host = dns_host
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = dns_host
+        current["connect"] = time.perf_counter() - resolved
+        return sock
+
+    def connect(self) -> None:
+        """Connects, and records the time beyond the TCP connect as the TLS handshake."""
+        start = time.perf_counter()
+        super().connect()
+        if (current := phases.get()) is not None and isinstance(self, HTTPSConnection):
+            current["tls"] = max(
+                time.perf_counter()
+                - start
+                - current.get("dns", 0)
+                - current.get("connect", 0),
+                0,
+            )
+
+
+class TimedHTTPConnection(TimedConnection, HTTPConnection):
+    """HTTP connection that records its set up time."""
+
+
+class TimedHTTPSConnection(TimedConnection, HTTPSConnection):
+    """HTTPS connection that records its set up time."""
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """Pool of timed HTTP connections."""
+
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """Pool of timed HTTPS connections."""
+
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """Transport adapter for ``requests``, that opens timed connections.
+
+    >>> TimedAdapter
+
+    """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        """Initializes the pool manager with the timed connection pools."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def begin() -> Dict[str, float]:
+    """Starts collecting the phases of a request, in the current context.
+
+    Returns:
+        Dict[str, float]:
+        Returns the phases, filled in by the connection if a new one is opened.
+    """
+    current = {}
+    phases.set(current)
+    return current
+
+
+def report(
+    method: str,
+    path: str,
+    response: requests.Response,
+    timed: Dict[str, float],
+    total: float,
+) -> Dict[str, float]:
+    """Breaks down the time taken by a request, and records each phase as telemetry.
+
+    Args:
+        method: HTTP method.
+        path: Path of the api call.
+        response: Response received.
+        timed: Phases collected for the request.
+        total: Seconds taken by the request, including the download of the body unless it is streamed.
+
+    Returns:
+        Dict[str, float]:
+        Returns the seconds spent in each phase.
+
+    See Also:
+        - ``server`` is the ``total`` metric of the ``Server-Timing`` header, or the sum of its metrics.
+        - ``network`` is the rest of the time until the headers arrived, which includes the server's queueing.
+        - ``download`` is the time taken to read the body, after the headers arrived.
+    """
+    timings = parse_server_timing(response.headers.get("Server-Timing", ""))
+    for name, duration in timings.items():
+        telemetry.observe(f"api.server_timing.{name}", duration)
+    headers = response.elapsed.total_seconds()
+    breakdown = dict(
+        dns=timed.get("dns", 0),
+        connect=timed.get("connect", 0),
+        tls=timed.get("tls", 0),
+        server=timings.get("total", sum(timings.values())),
+    )
+    breakdown["network"] = max(headers - sum(breakdown.values()), 0)
+    breakdown["download"] = max(total - headers, 0)
+    for phase, duration in breakdown.items():
+        telemetry.observe(f"api.phase.{phase}", duration)
+    logger.info(
+        "%s /%s [trace: %s] %s",
+        method,
+        path,
+        response.request.headers.get("traceparent", "-").split("-")[1],
+        ", ".join(
+            f"{phase}: {duration * 1e3:.1f}ms" for phase, duration in breakdown.items()
+        ),
+    )
+    return breakdown
@@ -0,0 +1,476 @@
+"""Replays recorded sessions through the wake word detector, listener and processor against a mock server.
+
+>>> Replay
+
+See Also:
+    - Sessions are recorded by setting ``RECORD_SESSIONS`` to a size budget in MB.
+    - Recorded audio is read by the activator and the listener through a stand-in for the microphone's stream, so the
+      wake word loop, the listener, follow ups and the processor run as they do live.
+    - Detector is created with the recorded settings, and the recognized text is fed to the processor.
+    - Action decided by the processor is compared, but restarts and stops are not carried out.
+    - Mock server replies with the recorded responses, and audio playback is skipped.
+    - Streamed responses are sent back in chunks, with the same gaps as they were received.
+    - Wake words, recognized text, requests and the action taken are compared against the recording.
+    - Recognition and request latencies are compared against the recording.
+
+Usage:
+    python replay.py logs/sessions/session_*.bin
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Tuple, Union
+
+import numpy
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(logging.StreamHandler())
+
+
+def load_interactions(
+    paths: List[str],
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Groups the records into interactions, each starting with a wake word detection.
+
+    Args:
+        paths: Paths of the session logs.
+
+    Returns:
+        Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        Returns the settings of the session and the list of interactions.
+    """
+    from jarvis_ui.modules.recorder import RecordType, read
+
+    metadata, interactions = {}, []
+    current = None
+    for path in sorted(paths):
+        for record_type, timestamp, payload in read(path):
+            if record_type == RecordType.session:
+                metadata.update(payload)
+                continue
+            if record_type == RecordType.wake or current is None:
+                current = dict(timestamp=timestamp, exchanges=[], playbacks=[])
+                interactions.append(current)
+            if record_type == RecordType.request:
+                current["exchanges"].append(dict(request=payload))
+            elif record_type == RecordType.response:
+                current["exchanges"][-1]["response"] = payload
+            elif record_type == RecordType.playback:
+                current["playbacks"].append(payload)
+            else:
+                current[record_type.name] = payload
+    return metadata, interactions
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Replies with the recorded responses, in the order they were recorded for each command.
+
+    >>> MockHandler
+
+    """
+
+    server: "MockServer"
+    # Chunked transfer encoding is required to stream the responses
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        """Silences the access logs."""
+
+    def reply(self, status: int, content_type: str, body: bytes) -> None:
+        """Sends a response.
+
+        Args:
+            status: Status code.
+            content_type: Content type of the body.
+            body: Body of the response.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, chunks: List[str], offsets: List[float]) -> None:
+        """Sends the chunks of a streamed response as NDJSON.
+
+        Args:
+            chunks: Text of each chunk.
+            offsets: Seconds after the request at which each chunk was received.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        start = time.monotonic()
+        for chunk, offset in zip(chunks, offsets):
+            if (delay := offset - (time.monotonic() - start)) > 0:
+                time.sleep(delay)
+            line = json.dumps({"detail": chunk}).encode() + b"\n"
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        """Replies to health checks."""
+        self.reply(200, "application/json", b"{}")
+
+    def do_POST(self) -> None:
+        """Replies with the next recorded response for the command."""
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        key = (self.path.strip("/"), data.get("command"))
+        self.server.received.append(key)
+        try:
+            response = self.server.responses[key].popleft()
+        except IndexError:
+            self.reply(404, "application/json", b'{"detail": "Not recorded"}')
+            return
+        if not response.get("ok"):
+            self.reply(503, "application/json", b'{"detail": "Recorded failure"}')
+        elif "chunks" in response:
+            self.stream(chunks=response["chunks"], offsets=response["offsets"])
+        elif response["content_type"] == "application/octet-stream":
+            self.reply(
+                response["status"], response["content_type"], bytes(response["body"])
+            )
+        else:
+            self.reply(
+                response["status"], response["content_type"], response["body"].encode()
+            )
+
+
+class MockServer(ThreadingHTTPServer):
+    """Serves the recorded responses on the loopback interface.
+
+    >>> MockServer
+
+    """
+
+    def __init__(self):
+        """Binds to a free port on the loopback interface."""
+        super().__init__(("127.0.0.1", 0), MockHandler)
+        self.responses: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = defaultdict(
+            deque
+        )
+        self.received: List[Tuple[str, str]] = []
+
+    def load(self, interactions: List[Dict[str, Any]]) -> None:
+        """Indexes the recorded responses by path and command.
+
+        Args:
+            interactions: Recorded interactions.
+        """
+        for interaction in interactions:
+            for exchange in interaction["exchanges"]:
+                request = exchange["request"]
+                key = (
+                    request["path"].strip("/"),
+                    (request["data"] or {}).get("command"),
+                )
+                self.responses[key].append(exchange.get("response", {}))
+
+
+class Exhausted(Exception):
+    """Raised when every recorded frame has been read, to end the wake word loop."""
+
+
+class FakeStream:
+    """Stands in for the microphone's stream, and reads the recorded audio in the order it was heard.
+
+    >>> FakeStream
+
+    See Also:
+        - Frames before each wake word detection are followed by the utterance, and the follow ups right after it.
+        - Silence ends each phrase, and the conversation before the next wake word.
+        - Audio is read as fast as it is asked for, the listener measures its timeouts in the length of audio read.
+    """
+
+    def __init__(self, sample_rate: int):
+        """Instantiates an empty stream.
+
+        Args:
+            sample_rate: Sample rate of the wake word detector.
+        """
+        self.sample_rate = sample_rate
+        self.audio = bytearray()
+        self.offsets: List[Tuple[int, int]] = []
+        self.position = 0
+
+    def append(self, index: int, audio: bytes) -> None:
+        """Adds the audio of an interaction.
+
+        Args:
+            index: Index of the interaction.
+            audio: 16-bit mono PCM data at the detector's sample rate.
+        """
+        self.offsets.append((len(self.audio), index))
+        self.audio.extend(audio)
+
+    def silence(self, seconds: float) -> None:
+        """Adds silence, which is part of the last interaction.
+
+        Args:
+            seconds: Length of the silence.
+        """
+        self.audio.extend(bytes(2 * int(seconds * self.sample_rate)))
+
+    @property
+    def current(self) -> int:
+        """Index of the interaction whose audio is being read."""
+        return max(
+            (index for offset, index in self.offsets if offset <= self.position),
+            default=0,
+        )
+
+    def read(self, num_frames: int, exception_on_overflow: bool = True) -> bytes:
+        """Reads the next frames.
+
+        Args:
+            num_frames: Number of samples to read.
+            exception_on_overflow: Unused, the recorded audio never overflows.
+
+        Returns:
+            bytes:
+            Returns the raw frames.
+        """
+        start, end = self.position, self.position + 2 * num_frames
+        if end > len(self.audio):
+            raise Exhausted
+        self.position = end
+        return bytes(self.audio[start:end])
+
+    @staticmethod
+    def get_read_available() -> int:
+        """Nothing is buffered while a response is played back, since it is not played."""
+        return 0
+
+
+def silent(*args, **kwargs) -> None:
+    """Stands in for audio playback and volume control."""
+
+
+def main() -> None:
+    """Replays the interactions and reports the mismatches and latencies."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="+", help="Session logs to be replayed")
+    parser.add_argument(
+        "--recognizer",
+        help="Same as test_listener.py, defaults to the recognizer used by the listener",
+    )
+    parser.add_argument(
+        "--access-key",
+        default=os.environ.get("PORCUPINE_KEY"),
+        help="Same as PORCUPINE_KEY",
+    )
+    args = parser.parse_args()
+
+    server = MockServer()
+    # Env vars have to be set before the env config is loaded, when any module in jarvis_ui is imported
+    os.environ["SERVER_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SERVER_URLS"] = "[]"
+    # Recorded responses that were not streamed are sent back as JSON either way
+    os.environ["STREAM_RESPONSES"] = "true"
+    os.environ.setdefault("TOKEN", "replay")
+
+    import pvporcupine
+    from speech_recognition import AudioData
+
+    from jarvis_ui.executables import api_handler, listener, processor, speaker, starter
+    from jarvis_ui.modules.models import env
+    from jarvis_ui.modules.peripherals import registry
+
+    metadata, interactions = load_interactions(args.sessions)
+    logger.info(
+        "Replaying %d interactions from %d sessions",
+        len(interactions),
+        len(args.sessions),
+    )
+    server.load(interactions=interactions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Audio is neither played nor spoken, and the volume is left as is
+    processor.playsound = silent
+    processor.pyvolume = SimpleNamespace(custom=silent)
+    starter.playsound = silent
+    speaker.speak = silent
+    if processor.config is None:
+        processor.config = SimpleNamespace(keywords=[])
+    processor.config.keywords = processor.config.keywords or ["replay"]
+    if "follow_up" in metadata:
+        env.follow_up = metadata["follow_up"]
+
+    arguments = dict(
+        keywords=metadata["wake_words"], sensitivities=metadata["sensitivity"]
+    )
+    if args.access_key:
+        arguments["access_key"] = args.access_key
+    detector = pvporcupine.create(**arguments)
+    stream = FakeStream(sample_rate=detector.sample_rate)
+    # Conversation ends once nothing is heard while the listener waits, or within the follow up window
+    gap = max(env.listener_timeout, env.follow_up or 0) + 1
+    for index, interaction in enumerate(interactions):
+        # Follow ups are recorded without a wake word, and are heard right after the previous response
+        if (wake := interaction.get("wake")) and wake["keyword"] >= 0:
+            stream.silence(seconds=gap)
+            stream.append(index=index, audio=wake["audio"])
+        if utterance := interaction.get("utterance"):
+            stream.append(
+                index=index,
+                audio=AudioData(
+                    utterance["audio"],
+                    utterance["sample_rate"],
+                    utterance["sample_width"],
+                ).get_raw_data(convert_rate=detector.sample_rate, convert_width=2),
+            )
+            # Ends the phrase
+            stream.silence(seconds=listener.recognizer.pause_threshold + 0.5)
+    stream.silence(seconds=gap)
+
+    # Activator and listener read the recorded audio, which was recorded after the pipeline
+    registry.bind = silent
+    registry.open_stream = lambda **kwargs: stream
+    registry.close_stream = silent
+    registry.terminate = silent
+    listener.pipeline = None
+    listener.microphone = listener.StreamSource(
+        stream=stream,
+        sample_rate=detector.sample_rate,
+        frame_length=detector.frame_length,
+    )
+    activator = starter.Activator(detector=detector)
+    # Replay shouldn't overwrite the calibration of the device
+    activator.calibrator = None
+
+    mismatches = 0
+    replayed: Dict[int, Dict[str, Any]] = defaultdict(dict)
+    recorded_latency, replayed_latency = defaultdict(list), defaultdict(list)
+    latencies = []
+    detect = activator.detect
+
+    def timed_detect(frame: bytes) -> int:
+        """Measures the CPU time for each frame, and notes the wake words detected."""
+        start = time.process_time()
+        result = detect(frame)
+        replayed_latency["detector"].append(time.process_time() - start)
+        if result >= 0:
+            replayed[stream.current].setdefault("wake", result)
+        return result
+
+    activator.detect = timed_detect
+    if args.recognizer:
+        from jarvis_ui.test_listener import load_recognizer
+
+        recognize = load_recognizer(args.recognizer)
+    elif listener.hedged:
+        recognize = listener.hedged.recognize
+    else:
+
+        def recognize(recognizer, audio):
+            """Uses the same recognizer as the listener."""
+            return recognizer.recognize_google(audio_data=audio)
+
+    def timed_recognize(recognizer, audio) -> Union[str, None]:
+        """Measures the time taken for recognition, and notes the text recognized."""
+        start = time.perf_counter()
+        try:
+            recognized = recognize(recognizer, audio)
+        # Recognizers raise their own errors
+        except Exception as error:
+            logger.debug(error)
+            recognized = None
+        replayed_latency["recognition"].append(time.perf_counter() - start)
+        replayed[stream.current]["text"] = recognized
+        return recognized
+
+    listener.hedged = SimpleNamespace(recognize=timed_recognize)
+    make_request = api_handler.make_request
+
+    def timed_request(*arguments, **kwargs):
+        """Measures the time taken for each request."""
+        start = time.perf_counter()
+        try:
+            return make_request(*arguments, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    api_handler.make_request = timed_request
+    process_request = processor.process_request
+
+    def noted_request(phrase: str) -> None:
+        """Notes the requests sent and the action taken, which is not carried out."""
+        received = len(server.received)
+        latencies.clear()
+        action = process_request(phrase)
+        replayed[stream.current].update(
+            requests=[command for _, command in server.received[received:]],
+            action=action,
+        )
+        replayed_latency["request"].extend(latencies)
+
+    processor.process_request = noted_request
+    try:
+        activator.start()
+    except Exhausted:
+        pass
+    finally:
+        activator.at_exit()
+
+    for index, interaction in enumerate(interactions):
+        outcome = []
+        result = replayed[index]
+        if (wake := interaction.get("wake")) and wake["keyword"] >= 0:
+            detected = result.get("wake", -1)
+            outcome.append(f"wake={'ok' if detected == wake['keyword'] else 'MISS'}")
+            mismatches += detected != wake["keyword"]
+        text = (interaction.get("text") or {}).get("text")
+        if interaction.get("utterance"):
+            if elapsed := (interaction.get("text") or {}).get("elapsed"):
+                recorded_latency["recognition"].append(elapsed)
+            recognized = result.get("text")
+            matched = (recognized or "").lower() == (text or "").lower()
+            outcome.append(f"text={'ok' if matched else repr(recognized)}")
+            mismatches += not matched
+        if decision := interaction.get("decision"):
+            requests = result.get("requests", [])
+            expected = [
+                (exchange["request"]["data"] or {}).get("command")
+                for exchange in interaction["exchanges"]
+            ]
+            action = result.get("action")
+            outcome.append(f"requests={'ok' if requests == expected else requests}")
+            outcome.append(
+                f"action={'ok' if action == decision.get('action') else action}"
+            )
+            mismatches += requests != expected
+            mismatches += action != decision.get("action")
+            recorded_latency["request"].extend(
+                exchange["response"]["elapsed"]
+                for exchange in interaction["exchanges"]
+                if exchange.get("response")
+            )
+        logger.info("[%d] %s: %s", index, text or "-", ", ".join(outcome))
+
+    logger.info("%-12s %-18s %s", "Stage", "Recorded p50/p95", "Replayed p50/p95")
+    for stage in ("detector", "recognition", "request"):
+        cells = []
+        for values in (recorded_latency[stage], replayed_latency[stage]):
+            cells.append(
+                f"{numpy.percentile(values, 50) * 1e3:.1f}/{numpy.percentile(values, 95) * 1e3:.1f} ms"
+                if values
+                else "-"
+            )
+        logger.info("%-12s %-18s %s", stage, *cells)
+    logger.info("%d mismatches in %d interactions", mismatches, len(interactions))
+    server.shutdown()
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
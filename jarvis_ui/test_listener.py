@@ -1,6 +1,28 @@
-import asyncio
+"""Benchmarks speech recognition settings against a directory of labeled utterances.
+
+>>> TestListener
+
+See Also:
+    - Each utterance is a ``.wav`` file with its transcript in a ``.txt`` file of the same name.
+    - Every combination in the grid of recognizer settings is evaluated on a separate worker process.
+    - The best performing settings are written as ``RECOGNIZER_SETTINGS`` into an env file loadable by ``EnvConfig``.
+
+Usage:
+    python test_listener.py --samples utterances --grid grid.yaml --recognizer sphinx --output .env
+"""
+
+import argparse
+import importlib
+import itertools
+import json
 import logging
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple, Union
 
+import numpy
 import speech_recognition
 import yaml
 
@@ -8,7 +30,6 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 logger.addHandler(logging.StreamHandler())
 
-RECOGNIZER = speech_recognition.Recognizer()
 ERROR_TUPLE = (
     speech_recognition.UnknownValueError,
     speech_recognition.RequestError,
@@ -17,51 +38,287 @@ ERROR_TUPLE = (
     ConnectionError,
 )
 
-defaults = dict(
-    energy_threshold=RECOGNIZER.energy_threshold,
-    dynamic_energy_threshold=RECOGNIZER.dynamic_energy_threshold,
-    pause_threshold=RECOGNIZER.pause_threshold,
-    phrase_threshold=RECOGNIZER.phrase_threshold,
+# Mirrors the defaults in RecognizerSettings
+DEFAULT_GRID = dict(
+    energy_threshold=[300, 700, 1100, 1500],
+    pause_threshold=[0.5, 0.8, 1],
+    phrase_threshold=[0.1, 0.3],
+    non_speaking_duration=[0.5, 1],
 )
 
-RECOGNIZER.energy_threshold = 1100
-RECOGNIZER.pause_threshold = 1
-RECOGNIZER.phrase_threshold = 0.1
-RECOGNIZER.dynamic_energy_threshold = False
-RECOGNIZER.non_speaking_duration = 1
-
-changed = dict(
-    energy_threshold=RECOGNIZER.energy_threshold,
-    dynamic_energy_threshold=RECOGNIZER.dynamic_energy_threshold,
-    pause_threshold=RECOGNIZER.pause_threshold,
-    phrase_threshold=RECOGNIZER.phrase_threshold,
+# Recognizers that run locally without a network connection
+RECOGNIZERS = dict(
+    sphinx="recognize_sphinx",  # Requires pocketsphinx module
+    vosk="recognize_vosk",  # Requires vosk module and a model
+    whisper="recognize_whisper",  # Requires openai-whisper module
 )
 
 
-async def save_for_reference():
-    """Saves the original config and new config in a yaml file."""
-    with open("speech_recognition_values.yaml", "w") as file:
-        yaml.dump(data={"defaults": defaults, "modified": changed}, stream=file)
+def load_recognizer(
+    spec: str,
+) -> Callable[[speech_recognition.Recognizer, speech_recognition.AudioData], str]:
+    """Loads the recognizer to be used for evaluation.
+
+    Args:
+        spec: Name of a built-in local recognizer or a custom one as ``module:function``
+
+    Returns:
+        Callable:
+        Returns a function that takes the recognizer and the captured audio, and returns the recognized text.
+    """
+    if spec in RECOGNIZERS:
+        method = RECOGNIZERS[spec]
+        return lambda recognizer, audio: getattr(recognizer, method)(audio_data=audio)
+    module, function = spec.split(":")
+    custom = getattr(importlib.import_module(module), function)
+    return lambda recognizer, audio: custom(audio)
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """Computes the word level edit distance between the transcript and the recognized text.
+
+    Args:
+        reference: Expected transcript.
+        hypothesis: Recognized text.
+
+    Returns:
+        Tuple[int, int]:
+        Returns the number of word errors and the number of words in the transcript.
+    """
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    distance = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        previous, distance[0] = distance[0], i
+        for j, hyp_word in enumerate(hyp, start=1):
+            previous, distance[j] = distance[j], min(
+                distance[j] + 1,
+                distance[j - 1] + 1,
+                previous + (ref_word != hyp_word),
+            )
+    return distance[-1], len(ref)
+
+
+def load_samples(directory: str) -> List[Tuple[str, str]]:
+    """Loads the labeled utterances from a directory.
+
+    Args:
+        directory: Directory with ``.wav`` files and their ``.txt`` transcripts.
+
+    Returns:
+        List[Tuple[str, str]]:
+        Returns a list of audio file paths and their transcripts.
+    """
+    samples = []
+    for wav in sorted(pathlib.Path(directory).glob("*.wav")):
+        label = wav.with_suffix(".txt")
+        if not label.is_file():
+            logger.warning("Skipping %s, no transcript found", wav.name)
+            continue
+        samples.append((str(wav), label.read_text().strip()))
+    return samples
 
 
-async def main():
-    """Initiates yaml dump in an asynchronous call and initiates listener in a never ending loop."""
-    asyncio.create_task(save_for_reference())
-    with speech_recognition.Microphone() as source:
-        while True:
+def has_residual_speech(
+    source: speech_recognition.AudioFile, energy_threshold: int
+) -> bool:
+    """Checks if there is any speech left in the audio file after the listener has stopped.
+
+    Args:
+        source: Audio file source that has been listened to.
+        energy_threshold: Energy threshold that qualifies as speech.
+
+    Returns:
+        bool:
+        Returns a boolean flag to indicate that the captured phrase was truncated.
+    """
+    remaining = source.stream.read(-1)
+    if not remaining:
+        return False
+    samples = numpy.frombuffer(remaining, dtype=f"<i{source.SAMPLE_WIDTH}")
+    chunks = samples[: len(samples) // source.CHUNK * source.CHUNK].reshape(
+        -1, source.CHUNK
+    )
+    if not len(chunks):
+        return False
+    energy = numpy.sqrt(numpy.mean(chunks.astype(numpy.float64) ** 2, axis=1))
+    return bool((energy > energy_threshold).any())
+
+
+def evaluate(
+    settings: Dict[str, Union[int, float]],
+    samples: List[Tuple[str, str]],
+    recognizer_spec: str,
+    timeout: float,
+    phrase_limit: float,
+) -> Dict[str, Union[int, float, dict]]:
+    """Evaluates a single combination of recognizer settings against all the samples.
+
+    Args:
+        settings: Recognizer settings to be evaluated.
+        samples: Labeled utterances.
+        recognizer_spec: Recognizer to be used.
+        timeout: Time in seconds to wait for a phrase to begin.
+        phrase_limit: Time in seconds after which the phrase is cut off.
+
+    Returns:
+        Dict[str, Union[int, float, dict]]:
+        Returns the latency, truncation and word error rate for the settings.
+    """
+    recognize = load_recognizer(spec=recognizer_spec)
+    recognizer = speech_recognition.Recognizer()
+    recognizer.dynamic_energy_threshold = False
+    for key, value in settings.items():
+        setattr(recognizer, key, value)
+    latencies, errors, words, truncated, failures = [], 0, 0, 0, 0
+    for path, transcript in samples:
+        hypothesis = ""
+        with speech_recognition.AudioFile(path) as source:
+            try:
+                audio = recognizer.listen(
+                    source=source, timeout=timeout, phrase_time_limit=phrase_limit
+                )
+            except speech_recognition.WaitTimeoutError:
+                audio = None
+            else:
+                truncated += has_residual_speech(
+                    source=source, energy_threshold=recognizer.energy_threshold
+                )
+        if audio:
+            # Latency is the captured audio (real-time when listening) and the time taken to recognize it
+            captured = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            start = time.perf_counter()
             try:
-                logger.info("Listening..")
-                audio = RECOGNIZER.listen(source)
-                logger.info("Recognizing..")
-                recognized = RECOGNIZER.recognize_google(
-                    audio_data=audio
-                )  # Requires stable internet connection
-                # recognized = RECOGNIZER.recognize_sphinx(audio_data=audio)  # Requires pocketsphinx module
-                if "stop" in recognized.lower().split():
-                    break
+                hypothesis = recognize(recognizer, audio)
             except ERROR_TUPLE:
-                continue
+                failures += 1
+            latencies.append(captured + time.perf_counter() - start)
+        else:
+            failures += 1
+        err, count = word_errors(reference=transcript, hypothesis=hypothesis or "")
+        errors += err
+        words += count
+    return dict(
+        settings=settings,
+        latency=round(float(numpy.mean(latencies)), 3) if latencies else None,
+        p95_latency=round(float(numpy.percentile(latencies, 95)), 3)
+        if latencies
+        else None,
+        truncation=round(truncated / len(samples), 3),
+        failures=failures,
+        wer=round(errors / max(words, 1), 4),
+    )
+
+
+def save_env(filename: str, settings: Dict[str, Union[int, float]]) -> None:
+    """Writes the settings as ``RECOGNIZER_SETTINGS`` into an env file, retaining any other env vars.
+
+    Args:
+        filename: Name of the env file.
+        settings: Recognizer settings to be stored.
+    """
+    value = json.dumps({**settings, "dynamic_energy_threshold": False})
+    lines = []
+    if os.path.isfile(filename):
+        with open(filename) as file:
+            lines = [
+                line.rstrip("\n")
+                for line in file
+                if not line.upper().startswith("RECOGNIZER_SETTINGS")
+            ]
+    lines.append(f"RECOGNIZER_SETTINGS='{value}'")
+    with open(filename, "w") as file:
+        file.write("\n".join(lines) + "\n")
+        file.flush()
+
+
+def main() -> None:
+    """Evaluates the grid of settings across a process pool and saves the best configuration."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--samples", required=True, help="Directory of labeled .wav files"
+    )
+    parser.add_argument(
+        "--grid", help="YAML file mapping each setting to a list of values"
+    )
+    parser.add_argument(
+        "--recognizer",
+        default="sphinx",
+        help="sphinx, vosk, whisper or module:function",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--timeout", type=float, default=2, help="Same as LISTENER_TIMEOUT"
+    )
+    parser.add_argument(
+        "--phrase-limit", type=float, default=5, help="Same as LISTENER_PHRASE_LIMIT"
+    )
+    parser.add_argument(
+        "--output", default="recognizer.env", help="Env file to store the best settings"
+    )
+    args = parser.parse_args()
+
+    samples = load_samples(directory=args.samples)
+    assert samples, f"No labeled samples found in {args.samples!r}"
+    if args.grid:
+        with open(args.grid) as file:
+            grid = yaml.safe_load(file)
+    else:
+        grid = DEFAULT_GRID
+    combinations = [
+        dict(zip(grid, values)) for values in itertools.product(*grid.values())
+    ]
+    defaults = speech_recognition.Recognizer()
+    # Recognizer requires the pause threshold to be no shorter than the non-speaking duration
+    combinations = [
+        settings
+        for settings in combinations
+        if settings.get("pause_threshold", defaults.pause_threshold)
+        >= settings.get("non_speaking_duration", defaults.non_speaking_duration)
+    ]
+    logger.info(
+        "Evaluating %d combinations on %d samples", len(combinations), len(samples)
+    )
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(
+                evaluate,
+                settings,
+                samples,
+                args.recognizer,
+                args.timeout,
+                args.phrase_limit,
+            )
+            for settings in combinations
+        ]
+        for future in as_completed(futures):
+            results.append(result := future.result())
+            logger.debug(result)
+    results.sort(
+        key=lambda res: (res["wer"], res["truncation"], res["latency"] or float("inf"))
+    )
+    logger.info(
+        "%-8s %-10s %-12s %-10s %s",
+        "WER",
+        "Latency",
+        "Truncation",
+        "Failures",
+        "Settings",
+    )
+    for result in results:
+        logger.info(
+            "%-8s %-10s %-12s %-10s %s",
+            result["wer"],
+            result["latency"],
+            result["truncation"],
+            result["failures"],
+            result["settings"],
+        )
+    save_env(filename=args.output, settings=results[0]["settings"])
+    logger.info("Best settings stored in %s", args.output)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
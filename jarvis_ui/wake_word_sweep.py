@@ -0,0 +1,308 @@
+"""Replays recordings through the wake word detector at various sensitivities.
+
+>>> WakeWordSweep
+
+See Also:
+    - Recordings are described in a YAML manifest, along with the onset of every wake word spoken in them.
+    - Recordings without any events are treated as background audio, which only contribute to false alarms.
+    - Each recording and sensitivity pair is replayed on a separate worker process.
+    - Miss rate, false alarms per hour and detector CPU time per hour of audio are reported for each keyword.
+    - ``--gate`` replays every pair once more behind the energy gate, to compare the detections and the CPU time.
+
+Manifest:
+    .. code-block:: yaml
+
+        recordings:
+          - path: commands.wav
+            events:
+              - keyword: jarvis
+                time: 12.4
+          - path: kitchen_noise.wav
+
+Usage:
+    python wake_word_sweep.py --manifest manifest.yaml --keywords jarvis --steps 9
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import pathlib
+import time
+import wave
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import ModuleType
+from typing import Dict, List, Tuple, Union
+
+import numpy
+import pvporcupine
+import yaml
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+logger.addHandler(logging.StreamHandler())
+
+
+def read_frames(path: str, sample_rate: int, frame_length: int) -> numpy.ndarray:
+    """Reads a recording as frames that can be fed to the detector.
+
+    Args:
+        path: Path of the recording.
+        sample_rate: Sample rate expected by the detector.
+        frame_length: Number of samples per frame expected by the detector.
+
+    Returns:
+        numpy.ndarray:
+        Returns a two-dimensional array, with a frame on each row.
+    """
+    with wave.open(path, "rb") as file:
+        assert (
+            file.getframerate() == sample_rate
+            and file.getnchannels() == 1
+            and file.getsampwidth() == 2
+        ), f"{path!r} should be 16-bit mono audio sampled at {sample_rate} Hz"
+        samples = numpy.frombuffer(
+            file.readframes(file.getnframes()), dtype=numpy.int16
+        )
+    return samples[: len(samples) // frame_length * frame_length].reshape(
+        -1, frame_length
+    )
+
+
+def load_dsp() -> ModuleType:
+    """Loads the DSP module from its file, since importing it from the package would load the whole app.
+
+    Returns:
+        ModuleType:
+        Returns the module with ``EnergyGate``.
+
+    See Also:
+        - Importing anything from ``jarvis_ui`` loads the env config, the logger and the audio engine.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "jarvis_ui_dsp", pathlib.Path(__file__).parent / "modules" / "dsp.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def replay(
+    path: str,
+    keywords: List[str],
+    sensitivity: float,
+    access_key: Union[str, None],
+    gate: Union[float, None] = None,
+) -> Dict[str, Union[str, float, List[Tuple[str, float]]]]:
+    """Replays a recording through the detector.
+
+    Args:
+        path: Path of the recording.
+        keywords: Wake words to be detected.
+        sensitivity: Sensitivity for all the wake words.
+        access_key: Access key for porcupine.
+        gate: Same as ``ENERGY_GATE``, to skip the detector while the recording is silent.
+
+    Returns:
+        Dict[str, Union[str, float, List[Tuple[str, float]]]]:
+        Returns the detections, duration of the recording and the CPU time spent by the detector.
+    """
+    arguments = dict(keywords=keywords, sensitivities=[sensitivity] * len(keywords))
+    if access_key:
+        arguments["access_key"] = access_key
+    detector = pvporcupine.create(**arguments)
+    frames = read_frames(
+        path=path,
+        sample_rate=detector.sample_rate,
+        frame_length=detector.frame_length,
+    )
+    if gate:
+        energy_gate = load_dsp().EnergyGate(
+            frame_length=detector.frame_length, ratio=gate
+        )
+    else:
+        energy_gate = None
+    detections = []
+    cpu = 0.0
+    try:
+        for index, frame in enumerate(frames):
+            start = time.process_time()
+            if energy_gate:
+                # Gate's own CPU time is included, as it runs for every frame
+                gated = [
+                    numpy.frombuffer(raw, dtype=numpy.int16)
+                    for raw in energy_gate.feed(frame.tobytes())
+                ]
+            else:
+                gated = [frame]
+            result = -1
+            for pcm in gated:
+                result = detector.process(pcm=pcm.tolist())
+                if result is not False and result >= 0:
+                    break
+            cpu += time.process_time() - start
+            if result is not False and result >= 0:
+                detections.append(
+                    (
+                        keywords[result],
+                        index * detector.frame_length / detector.sample_rate,
+                    )
+                )
+    finally:
+        detector.delete()
+    return dict(
+        path=path,
+        sensitivity=sensitivity,
+        gate=gate,
+        detections=detections,
+        duration=len(frames) * detector.frame_length / detector.sample_rate,
+        cpu=cpu,
+    )
+
+
+def score(
+    events: List[Dict[str, Union[str, float]]],
+    detections: List[Tuple[str, float]],
+    tolerance: float,
+) -> Dict[str, Dict[str, int]]:
+    """Matches detections against the labeled events of a recording.
+
+    Args:
+        events: Labeled wake word onsets.
+        detections: Wake words reported by the detector.
+        tolerance: Seconds after the onset within which a detection is considered a hit.
+
+    Returns:
+        Dict[str, Dict[str, int]]:
+        Returns the number of events, misses and false alarms for each keyword.
+    """
+    counts = defaultdict(lambda: dict(events=0, misses=0, false_alarms=0))
+    pending = list(detections)
+    for event in events:
+        counts[event["keyword"]]["events"] += 1
+        for detection in pending:
+            keyword, at = detection
+            if keyword == event["keyword"] and 0 <= at - event["time"] <= tolerance:
+                pending.remove(detection)
+                break
+        else:
+            counts[event["keyword"]]["misses"] += 1
+    for keyword, _ in pending:
+        counts[keyword]["false_alarms"] += 1
+    return counts
+
+
+def main() -> None:
+    """Sweeps the sensitivities across a process pool and reports the metrics for each keyword."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--manifest", required=True, help="YAML file describing the recordings"
+    )
+    parser.add_argument(
+        "--keywords", nargs="+", default=["jarvis"], help="Same as WAKE_WORDS"
+    )
+    parser.add_argument(
+        "--sensitivities", nargs="+", type=float, help="Sensitivities to evaluate"
+    )
+    parser.add_argument(
+        "--steps",
+        type=int,
+        default=9,
+        help="Evenly spaced sensitivities when not specified",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2,
+        help="Seconds after an onset to accept a detection",
+    )
+    parser.add_argument(
+        "--access-key",
+        default=os.environ.get("PORCUPINE_KEY"),
+        help="Same as PORCUPINE_KEY",
+    )
+    parser.add_argument(
+        "--gate", type=float, help="Same as ENERGY_GATE, to compare with the gate"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with open(args.manifest) as file:
+        manifest = yaml.safe_load(file)
+    base = pathlib.Path(args.manifest).parent
+    recordings = {
+        str(base / recording["path"]): recording.get("events") or []
+        for recording in manifest["recordings"]
+    }
+    sensitivities = args.sensitivities or [
+        round(float(value), 3) for value in numpy.linspace(0.1, 0.9, args.steps)
+    ]
+    gates = [None, args.gate] if args.gate else [None]
+    logger.info(
+        "Replaying %d recordings at %d sensitivities",
+        len(recordings),
+        len(sensitivities),
+    )
+
+    # (sensitivity, gate) -> keyword -> counts
+    results = defaultdict(
+        lambda: defaultdict(lambda: dict(events=0, misses=0, false_alarms=0))
+    )
+    hours, cpu = defaultdict(float), defaultdict(float)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(
+                replay, path, args.keywords, sensitivity, args.access_key, gate
+            )
+            for path in recordings
+            for sensitivity in sensitivities
+            for gate in gates
+        ]
+        for future in as_completed(futures):
+            replayed = future.result()
+            key = replayed["sensitivity"], replayed["gate"]
+            hours[key] += replayed["duration"] / 3_600
+            cpu[key] += replayed["cpu"]
+            counts = score(
+                events=recordings[replayed["path"]],
+                detections=replayed["detections"],
+                tolerance=args.tolerance,
+            )
+            for keyword, count in counts.items():
+                for metric, value in count.items():
+                    results[key][keyword][metric] += value
+
+    logger.info(
+        "%-10s %-12s %-6s %-10s %-10s %-8s %s",
+        "Keyword",
+        "Sensitivity",
+        "Gate",
+        "Miss rate",
+        "FA/hour",
+        "Events",
+        "CPU sec/hour",
+    )
+    for keyword in args.keywords:
+        for sensitivity in sensitivities:
+            for gate in gates:
+                key = sensitivity, gate
+                count = results[key][keyword]
+                logger.info(
+                    "%-10s %-12s %-6s %-10s %-10s %-8s %s",
+                    keyword,
+                    sensitivity,
+                    gate or "-",
+                    (
+                        round(count["misses"] / count["events"], 3)
+                        if count["events"]
+                        else "-"
+                    ),
+                    round(count["false_alarms"] / hours[key], 2),
+                    count["events"],
+                    round(cpu[key] / hours[key], 2),
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Shared set up for the tests, which run against stand-in servers on the loopback interface."""
+
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator
+
+import pytest
+
+# Env config is loaded when any module in jarvis_ui is imported, the server URL is replaced by each test
+os.environ.setdefault("TOKEN", "test")
+os.environ.setdefault("SERVER_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SERVER_URLS", "[]")
+# Logs directory is created relative to the working directory, and is kept out of the tree
+_cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="jarvis_ui_tests_"))
+import jarvis_ui  # noqa: E402,F401
+
+# Collection resolves the test paths relative to the working directory
+os.chdir(_cwd)
+
+
+@pytest.fixture
+def serve() -> Iterator[Callable[[type], str]]:
+    """Starts servers on the loopback interface, and shuts them down after the test.
+
+    Yields:
+        Callable[[type], str]:
+        Yields a function that takes a request handler and returns the base URL of the server.
+    """
+    servers = []
+
+    def start(handler: type) -> str:
+        """Starts a server with the request handler."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def backend(monkeypatch: pytest.MonkeyPatch) -> Callable[[str], None]:
+    """Points the UI's requests at a stand-in server.
+
+    Returns:
+        Callable[[str], None]:
+        Returns a function that takes the base URL of the server.
+    """
+    from jarvis_ui.executables import api_handler
+
+    def point(url: str) -> None:
+        """Replaces the backend pool with a single backend."""
+        monkeypatch.setattr(api_handler, "pool", api_handler.BackendPool(urls=[url]))
+
+    return point
+
+
+class SilentHandler(BaseHTTPRequestHandler):
+    """Request handler without the access logs."""
+
+    def log_message(self, *args) -> None:
+        """Silences the access logs."""
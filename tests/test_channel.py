@@ -0,0 +1,149 @@
+"""Tests for the push channel, against a stand-in server that sends server-sent events."""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from conftest import SilentHandler
+
+from jarvis_ui.executables import channel, helper
+from jarvis_ui.modules import config
+from jarvis_ui.modules.models import env
+from jarvis_ui.modules.telemetry import telemetry
+
+
+def sse_handler(body: bytes, status: int = 200) -> type:
+    """Builds a handler that sends the events and then closes the stream.
+
+    Args:
+        body: Events as they are written to the stream.
+        status: Status code of the response.
+
+    Returns:
+        type:
+        Returns the request handler.
+    """
+
+    class Handler(SilentHandler):
+        def do_GET(self) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def counter(name: str) -> int:
+    """Reads a counter from telemetry."""
+    return telemetry.snapshot()["counters"].get(name, 0)
+
+
+@pytest.fixture
+def push_channel(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Prepares the channel's state, and records the health checks it triggers."""
+    state = SimpleNamespace(checks=[])
+    monkeypatch.setattr(env, "push_channel", "events")
+    monkeypatch.setattr(helper, "PUSH_CHANNEL", {"connected": False})
+    monkeypatch.setattr(
+        helper, "heart_beat", lambda: state.checks.append(time.monotonic())
+    )
+    monkeypatch.setattr(config, "config", SimpleNamespace(keywords=[]))
+    return state
+
+
+def run_channel(state: SimpleNamespace, timeout: float = 5) -> channel.PushChannel:
+    """Runs the channel until it has handled the first disconnect, or it has given up."""
+    push = channel.PushChannel()
+    push.start()
+    deadline = time.monotonic() + timeout
+    while push.is_alive() and not state.checks and time.monotonic() < deadline:
+        time.sleep(0.01)
+    push.stop()
+    push.join(timeout=timeout)
+    return push
+
+
+def test_parse_events(serve):
+    """Events are split on blank lines, with their type, multi-line data and comments as pings."""
+    body = (
+        b": keep-alive\n\n"
+        b'event: keywords\ndata: {"a": ["lights"]}\n\n'
+        b"data: first line\ndata: second line\n\n"
+        b"event: done\ndata:\n\n"
+    )
+    url = serve(sse_handler(body))
+    with requests.get(url, stream=True) as response:
+        events = list(channel.parse_events(response=response))
+    assert events == [
+        ("ping", "keep-alive"),
+        ("keywords", '{"a": ["lights"]}'),
+        ("message", "first line\nsecond line"),
+        ("done", ""),
+    ]
+
+
+def test_keyword_updates(push_channel):
+    """Keywords pushed by the server replace the loaded keywords."""
+    channel.PushChannel.dispatch(
+        event="keywords", data=json.dumps({"lights": ["lights"], "tv": ["tv", "tele"]})
+    )
+    assert config.config.keywords == ["lights", "tv", "tele"]
+    channel.PushChannel.dispatch(event="keywords", data="not json")
+    assert config.config.keywords == ["lights", "tv", "tele"]
+
+
+def test_disconnect_triggers_health_check(serve, backend, push_channel):
+    """Stream is proof of liveness while connected, and a disconnect checks health right away."""
+    body = (
+        b": ping\n\n"
+        b"event: keywords\ndata: " + json.dumps({"x": ["lights"]}).encode() + b"\n\n"
+    )
+    backend(serve(sse_handler(body)))
+    disconnects = counter("channel.disconnects")
+    run_channel(state=push_channel)
+    assert config.config.keywords == ["lights"]
+    assert counter("channel.disconnects") == disconnects + 1
+    assert telemetry.snapshot()["gauges"]["channel.connected"] == 0
+    assert helper.PUSH_CHANNEL["connected"] is False
+    assert push_channel.checks
+
+
+def test_unsupported_falls_back_to_polling(serve, backend, push_channel):
+    """Channel gives up when the server doesn't support it, leaving heart beat to poll."""
+    backend(serve(sse_handler(b"", status=404)))
+    push = run_channel(state=push_channel)
+    assert not push.is_alive()
+    assert helper.PUSH_CHANNEL["connected"] is False
+    assert not push_channel.checks
+
+
+def test_heart_beat_skips_polling_while_connected(monkeypatch):
+    """Heart beat doesn't poll while the channel is connected, and polls once it is not."""
+    from jarvis_ui.executables import api_handler
+
+    probes = []
+    pool = api_handler.BackendPool(urls=["http://127.0.0.1:1/"])
+    monkeypatch.setattr(api_handler, "pool", pool)
+    monkeypatch.setattr(pool.backends[0], "probe", lambda: probes.append(True) or True)
+    monkeypatch.setattr(helper, "PUSH_CHANNEL", {"connected": True})
+    helper.heart_beat()
+    assert not probes
+    helper.PUSH_CHANNEL["connected"] = False
+    helper.heart_beat()
+    assert probes
+
+
+def test_stop_ends_reconnects(monkeypatch, push_channel):
+    """Channel stops reconnecting once stopped, even while backing off."""
+    monkeypatch.setattr(
+        channel.api_handler,
+        "pool",
+        channel.api_handler.BackendPool(urls=["http://127.0.0.1:1/"]),
+    )
+    push = run_channel(state=push_channel)
+    assert push_channel.checks
+    assert not push.is_alive()
@@ -0,0 +1,120 @@
+"""Tests for the hedged recognizer, with stand-in engines loaded from this module as ``module:function``."""
+
+import re
+import threading
+import time
+
+import pytest
+
+from jarvis_ui.modules.recognition import HedgedRecognizer
+from jarvis_ui.modules.telemetry import telemetry
+
+# Releases the slow engine, so that it returns after the race is decided
+release = threading.Event()
+recognizers = []
+
+
+def confident(audio: bytes) -> tuple:
+    """Returns right away with a confident result."""
+    return "turn on the lights", 0.95
+
+
+def unsure(audio: bytes) -> tuple:
+    """Returns right away with a result below the threshold."""
+    return "turn on the nights", 0.4
+
+
+def plain(audio: bytes) -> str:
+    """Returns a little later, without a confidence."""
+    time.sleep(0.05)
+    return "turn on the lights"
+
+
+def failing(audio: bytes) -> str:
+    """Fails, as an engine would when it can't make out the speech."""
+    raise ValueError("unintelligible")
+
+
+def slow(audio: bytes) -> str:
+    """Returns once released, or after a second."""
+    release.wait(timeout=1)
+    return "too late"
+
+
+def recognizer(*engines: str, timeout: float = 5) -> HedgedRecognizer:
+    """Builds a recognizer with the stand-in engines of this module."""
+    hedged = HedgedRecognizer(
+        specs=[f"{__name__}:{engine}" for engine in engines],
+        threshold=0.8,
+        timeout=timeout,
+    )
+    recognizers.append(hedged)
+    return hedged
+
+
+def engine(name: str) -> str:
+    """Name of a stand-in engine, as it is recorded in the telemetry."""
+    return re.sub(r"[^\w.-]", "_", f"{__name__}:{name}")
+
+
+def counter(name: str) -> int:
+    """Reads a counter from telemetry."""
+    return telemetry.snapshot()["counters"].get(name, 0)
+
+
+def margins() -> int:
+    """Number of margins recorded in telemetry."""
+    return (
+        telemetry.snapshot()["histograms"].get("recognition.margin", {}).get("count", 0)
+    )
+
+
+@pytest.fixture(autouse=True)
+def released():
+    """Releases the slow engine after each test, and waits for the workers so their telemetry stays in the test."""
+    release.clear()
+    yield
+    release.set()
+    while recognizers:
+        recognizers.pop().executor.shutdown(wait=True)
+
+
+def test_confident_result_wins_early():
+    """A confident result is taken without waiting for the slow engine."""
+    hedged = recognizer("slow", "confident")
+    wins = counter(f"recognition.winner.{engine('confident')}")
+    start = time.perf_counter()
+    assert hedged.recognize(recognizer=None, audio=b"") == "turn on the lights"
+    assert time.perf_counter() - start < 0.5
+    assert counter(f"recognition.winner.{engine('confident')}") == wins + 1
+
+
+def test_low_confidence_falls_back_to_best():
+    """Results below the threshold are compared once all the engines have finished."""
+    hedged = recognizer("unsure", "plain", "failing")
+    failures = counter(f"recognition.{engine('failing')}.failures")
+    assert hedged.recognize(recognizer=None, audio=b"") == "turn on the nights"
+    assert counter(f"recognition.{engine('failing')}.failures") == failures + 1
+
+
+def test_timeout_returns_nothing():
+    """Nothing is recognized when no engine returns within the timeout."""
+    hedged = recognizer("slow", "failing", timeout=0.1)
+    start = time.perf_counter()
+    assert hedged.recognize(recognizer=None, audio=b"") is None
+    assert time.perf_counter() - start < 0.5
+
+
+def test_abandoned_engine_records_margin():
+    """Lead over an abandoned engine is recorded once it returns, and it doesn't hold up the result."""
+    # Slow engine is queued first, so it is running and can't be cancelled by the time the confident one returns
+    hedged = recognizer("slow", "confident")
+    before = margins()
+    assert hedged.recognize(recognizer=None, audio=b"") == "turn on the lights"
+    assert margins() == before
+    release.set()
+    deadline = time.monotonic() + 2
+    while margins() == before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert margins() == before + 1
+    assert telemetry.snapshot()["histograms"]["recognition.margin"]["max"] > 0
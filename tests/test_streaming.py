@@ -0,0 +1,155 @@
+"""Tests for the streamed responses, against the replay's mock server and a stand-in server that sends events."""
+
+import threading
+import time
+from typing import List
+
+import pytest
+from conftest import SilentHandler
+
+from jarvis_ui.executables import api_handler, processor
+from jarvis_ui.replay import MockServer
+
+
+@pytest.fixture
+def mock_server(backend):
+    """Starts the replay's mock server, and points the UI's requests at it."""
+    server = MockServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backend(f"http://127.0.0.1:{server.server_port}/")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def interaction(command: str, chunks: List[str]) -> dict:
+    """Builds a recorded interaction with a streamed response.
+
+    Args:
+        command: Command sent to the server.
+        chunks: Text of each chunk.
+
+    Returns:
+        dict:
+        Returns the interaction, as the replay loads it from the session logs.
+    """
+    return dict(
+        exchanges=[
+            dict(
+                request=dict(path="offline-communicator", data=dict(command=command)),
+                response=dict(
+                    ok=True,
+                    chunks=chunks,
+                    offsets=[0.01 * i for i in range(len(chunks))],
+                ),
+            )
+        ]
+    )
+
+
+def event_stream(body: bytes) -> type:
+    """Builds a handler that replies to every command with the events.
+
+    Args:
+        body: Events as they are written to the stream.
+
+    Returns:
+        type:
+        Returns the request handler.
+    """
+
+    class Handler(SilentHandler):
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def test_ndjson_chunks(mock_server):
+    """Chunks of an NDJSON response are yielded in order, as the text of each line."""
+    mock_server.load([interaction("weather", ["It is ", "sunny. ", "Enjoy!"])])
+    response = api_handler.make_request(
+        path="offline-communicator", data=dict(command="weather"), stream=True
+    )
+    assert not isinstance(response, (dict, bool))
+    assert list(response) == ["It is ", "sunny. ", "Enjoy!"]
+    assert mock_server.received == [("offline-communicator", "weather")]
+
+
+def test_sse_chunks_until_done(serve, backend):
+    """Server-sent events are read until the ``done`` event, skipping pings and other events."""
+    backend(
+        serve(
+            event_stream(
+                b": ping\n\n"
+                b'data: {"detail": "Hello"}\n\n'
+                b"event: progress\ndata: 50\n\n"
+                b"data: world\n\n"
+                b"event: done\ndata:\n\n"
+                b"data: ignored\n\n"
+            )
+        )
+    )
+    response = api_handler.make_request(
+        path="offline-communicator", data=dict(command="hi"), stream=True
+    )
+    assert list(response) == ["Hello", "world"]
+
+
+def test_sse_error_ends_stream(serve, backend):
+    """An ``error`` event ends the stream, keeping the chunks that arrived before it."""
+    backend(
+        serve(
+            event_stream(
+                b"data: partial\n\n"
+                b"event: error\ndata: model crashed\n\n"
+                b"data: ignored\n\n"
+            )
+        )
+    )
+    response = api_handler.make_request(
+        path="offline-communicator", data=dict(command="hi"), stream=True
+    )
+    assert list(response) == ["partial"]
+
+
+@pytest.fixture
+def spoken(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """Records the sentences spoken, and keeps the display quiet."""
+    sentences = []
+    monkeypatch.setattr(processor.speaker, "speak", lambda text: sentences.append(text))
+    monkeypatch.setattr(processor.display, "write_screen", lambda text: None)
+    monkeypatch.setattr(processor.display, "append_screen", lambda text: None)
+    return sentences
+
+
+def test_sentences_span_chunks(spoken):
+    """Sentences are spoken once complete, however the chunks split them, along with the trailing partial one."""
+    chunks = [
+        "The weather",
+        " is sunny. It is",
+        " 72 degrees! How",
+        " about",
+        " tomorrow",
+    ]
+    processor.speak_stream(chunks=iter(chunks), submitted=time.perf_counter())
+    assert spoken == [
+        "The weather is sunny.",
+        "It is 72 degrees!",
+        "How about tomorrow",
+    ]
+
+
+def test_streamed_response_is_spoken(mock_server, spoken):
+    """Chunks streamed by the server are spoken as sentences, without a trailing empty one."""
+    mock_server.load([interaction("news", ["Headlines. ", "Markets are up.", " "])])
+    response = api_handler.make_request(
+        path="offline-communicator", data=dict(command="news"), stream=True
+    )
+    processor.process_response(response=response, submitted=time.perf_counter())
+    assert spoken == ["Headlines.", "Markets are up."]